@@ -4,26 +4,188 @@ pragma solidity ^0.8.0;
 contract Election {
     // Store vote counts for ANY candidate ID
     mapping(uint256 => uint256) public votes;
-    
+
     // Total votes cast
     uint256 public totalVotes;
-    
+
+    // Registered candidate range for getAllVotes(): IDs 1..candidateCount
+    uint256 public candidateCount;
+
     // Event to log votes for the frontend/backend listener
     event Voted(uint256 indexed candidateId);
 
+    // Off-chain ledger mode: Merkle roots of ballot batches (root -> block it was anchored in)
+    event RootAnchored(bytes32 indexed root, uint256 count);
+    mapping(bytes32 => uint256) public anchoredAt;
+    uint256 public anchoredBallots;
+
+    // Deployer manages the relayer (backend hot wallet) list
+    address public owner;
+    mapping(address => bool) public relayers;
+
+    // Replay protection for signed ballots (one-vote-per-student is enforced by the backend)
+    mapping(address => uint256) public nonces;
+
+    // EIP-712 typed data for signed ballots
+    bytes32 public constant BALLOT_TYPEHASH = keccak256("Ballot(uint256 candidateId,uint256 nonce)");
+    bytes32 public constant MULTI_BALLOT_TYPEHASH = keccak256("MultiBallot(uint256[] candidateIds,uint256 nonce)");
+    bytes32 public immutable DOMAIN_SEPARATOR;
+
+    modifier onlyOwner() {
+        require(msg.sender == owner, "Only owner");
+        _;
+    }
+
+    modifier onlyRelayer() {
+        require(relayers[msg.sender], "Only relayer");
+        _;
+    }
+
+    constructor() {
+        owner = msg.sender;
+        relayers[msg.sender] = true;
+        DOMAIN_SEPARATOR = keccak256(abi.encode(
+            keccak256("EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"),
+            keccak256(bytes("Election")),
+            keccak256(bytes("1")),
+            block.chainid,
+            address(this)
+        ));
+    }
+
+    function setRelayer(address relayer, bool allowed) public onlyOwner {
+        relayers[relayer] = allowed;
+    }
+
+    function setCandidateCount(uint256 count) public onlyOwner {
+        candidateCount = count;
+    }
+
     // Dynamic Vote Function
     // Accepts ANY positive integer as candidateId
     function vote(uint256 candidateId) public {
+        _record(candidateId);
+    }
+
+    // Meta-transaction vote: the ballot is signed by an ephemeral key and
+    // submitted (and paid for) by a relayer, so no funding transaction is needed
+    function voteFor(uint256 candidateId, uint256 nonce, bytes calldata signature) public onlyRelayer {
+        bytes32 digest = keccak256(abi.encodePacked(
+            "\x19\x01",
+            DOMAIN_SEPARATOR,
+            keccak256(abi.encode(BALLOT_TYPEHASH, candidateId, nonce))
+        ));
+        address voter = _recover(digest, signature);
+        require(voter != address(0), "Invalid signature");
+        require(nonces[voter] == nonce, "Invalid nonce");
+
+        nonces[voter] = nonce + 1;
+        _record(candidateId);
+    }
+
+    // Full ballot in one transaction: one candidate per position
+    // (one-choice-per-position is validated by the backend, the contract only counts)
+    function voteBallot(uint256[] calldata candidateIds) public {
+        require(candidateIds.length > 0, "Empty ballot");
+
+        for (uint256 i = 0; i < candidateIds.length; i++) {
+            _record(candidateIds[i]);
+        }
+    }
+
+    // Relayed version of voteBallot(): the ballot is signed as EIP-712 MultiBallot
+    function voteBallotFor(uint256[] calldata candidateIds, uint256 nonce, bytes calldata signature) public onlyRelayer {
+        require(candidateIds.length > 0, "Empty ballot");
+
+        bytes32 digest = keccak256(abi.encodePacked(
+            "\x19\x01",
+            DOMAIN_SEPARATOR,
+            keccak256(abi.encode(MULTI_BALLOT_TYPEHASH, keccak256(abi.encodePacked(candidateIds)), nonce))
+        ));
+        address voter = _recover(digest, signature);
+        require(voter != address(0), "Invalid signature");
+        require(nonces[voter] == nonce, "Invalid nonce");
+
+        nonces[voter] = nonce + 1;
+        for (uint256 i = 0; i < candidateIds.length; i++) {
+            _record(candidateIds[i]);
+        }
+    }
+
+    // Batched votes from the backend batcher: candidateIds[i] receives counts[i] votes.
+    // One Voted event is still emitted per vote so listeners see every ballot.
+    function voteBatch(uint256[] calldata candidateIds, uint256[] calldata counts) public onlyRelayer {
+        require(candidateIds.length == counts.length, "Length mismatch");
+
+        for (uint256 i = 0; i < candidateIds.length; i++) {
+            uint256 candidateId = candidateIds[i];
+            require(candidateId > 0, "Invalid Candidate ID");
+
+            votes[candidateId] += counts[i];
+            totalVotes += counts[i];
+
+            for (uint256 j = 0; j < counts[i]; j++) {
+                emit Voted(candidateId);
+            }
+        }
+    }
+
+    // Anchors the Merkle root of a batch of off-chain ballots (tamper evidence for the ledger)
+    function anchorRoot(bytes32 root, uint256 count) public onlyRelayer {
+        require(root != bytes32(0), "Empty root");
+        require(anchoredAt[root] == 0, "Root already anchored");
+
+        anchoredAt[root] = block.number;
+        anchoredBallots += count;
+
+        emit RootAnchored(root, count);
+    }
+
+    // Helper to get votes for a specific candidate
+    function getVotes(uint256 candidateId) public view returns (uint256) {
+        return votes[candidateId];
+    }
+
+    // Votes for many candidates in one call (counts[i] belongs to ids[i])
+    function getVotesBatch(uint256[] calldata ids) external view returns (uint256[] memory counts) {
+        counts = new uint256[](ids.length);
+        for (uint256 i = 0; i < ids.length; i++) {
+            counts[i] = votes[ids[i]];
+        }
+    }
+
+    // Votes for every registered candidate: counts[i] belongs to candidate ID i + 1
+    function getAllVotes() external view returns (uint256[] memory counts) {
+        counts = new uint256[](candidateCount);
+        for (uint256 i = 0; i < candidateCount; i++) {
+            counts[i] = votes[i + 1];
+        }
+    }
+
+    function _record(uint256 candidateId) internal {
         require(candidateId > 0, "Invalid Candidate ID");
-        
+
         votes[candidateId] += 1;
         totalVotes += 1;
-        
+
         emit Voted(candidateId);
     }
 
-    // Helper to get votes for a specific candidate
-    function getVotes(uint256 candidateId) public view returns (uint256) {
-        return votes[candidateId];
+    function _recover(bytes32 digest, bytes memory signature) internal pure returns (address) {
+        if (signature.length != 65) return address(0);
+
+        bytes32 r;
+        bytes32 s;
+        uint8 v;
+        assembly {
+            r := mload(add(signature, 0x20))
+            s := mload(add(signature, 0x40))
+            v := byte(0, mload(add(signature, 0x60)))
+        }
+        if (v < 27) v += 27;
+
+        // Reject malleable signatures (s in the upper half of the curve order)
+        if (uint256(s) > 0x7FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF5D576E7357A4501DDFE92F46681B20A0) return address(0);
+        return ecrecover(digest, v, r, s);
     }
 }
@@ -1,19 +1,27 @@
 from flask import Blueprint, request, jsonify
+from eth_utils import to_checksum_address
+
+from sim_chain import SimulatedChain, Revert
 
 local_api = Blueprint("local_api", __name__)
 
-# Fake memory blockchain
-local_votes = {1: 0, 2: 0, 3: 0}
+# Fake memory blockchain (instant blocks, same contract rules as Election.sol)
+local_chain = SimulatedChain(block_time=0)
+LOCAL_CANDIDATES = (1, 2, 3)
+# The contract no longer tracks voters, so the mock API does (like the backend would)
 local_voters = set()
 
 
+def _has_voted(wallet):
+    try:
+        return to_checksum_address(wallet) in local_voters
+    except (TypeError, ValueError):
+        return False
+
+
 @local_api.route("/results", methods=["GET"])
 def local_results():
-    return jsonify({
-        "1": local_votes[1],
-        "2": local_votes[2],
-        "3": local_votes[3]
-    })
+    return jsonify({str(cid): local_chain.votes[cid] for cid in LOCAL_CANDIDATES})
 
 
 @local_api.route("/vote", methods=["POST"])
@@ -22,18 +30,22 @@ def local_vote():
     wallet = data.get("wallet")
     cid = int(data.get("candidateId"))
 
-    if wallet in local_voters:
+    if _has_voted(wallet):
         return jsonify({"error": "Already voted"}), 400
 
-    local_voters.add(wallet)
-    local_votes[cid] += 1
+    try:
+        tx_hash = local_chain.impersonate(wallet, "vote", [cid])
+    except (Revert, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify({"success": True})
+    receipt = local_chain.receipts[tx_hash]
+    if receipt["status"] != "0x1":
+        return jsonify({"error": "Vote reverted"}), 400
+    local_voters.add(to_checksum_address(wallet))
+    return jsonify({"success": True, "txHash": tx_hash})
 
 
 @local_api.route("/hasVoted", methods=["GET"])
 def local_has_voted():
     wallet = request.args.get("wallet")
-    return jsonify({"hasVoted": wallet in local_voters})
-
-
+    return jsonify({"hasVoted": _has_voted(wallet)})
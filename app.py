@@ -1,18 +1,40 @@
 import os
+import hmac
 import json
+import hashlib
 import time
 import time
 import logging
-import threading
-from flask import Flask, render_template, request, redirect, session, jsonify, make_response
+from markupsafe import Markup
+from flask import Flask, render_template, request, redirect, session, jsonify, make_response, g, has_request_context, send_from_directory, url_for
 import firebase_admin
-from firebase_admin import credentials, auth
+from firebase_admin import credentials
 from web3 import Web3
 from dotenv import load_dotenv
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
 from database_init import init_db
+from vote_queue import VoteQueue, VoteWorkerPool, FINAL_STATUSES, job_choices
+from relayer import RelayerLane, LaneScheduler, load_relayer_keys
+from ballots import sign_ballot, sign_multi_ballot
+from vote_batcher import VoteBatcher
+from ballot_ledger import BallotLedger, LedgerAnchorer
+from collections import Counter
+from wallet_pool import WalletPool, WalletPoolReplenisher
+from results_cache import SharedTTLCache
+from event_indexer import VoteIndexer
+from election_state import ElectionState, bump_generation
+from candidate_cache import CandidateCache, bump_candidates_version, make_etag
+from static_assets import AssetManifest, IMMUTABLE_CACHE_CONTROL
+from candidate_images import CandidateImageProcessor
+from werkzeug.utils import secure_filename
+from fee_oracle import FeeOracle, bump_fees
+from receipt_watcher import ReceiptWatcher
+from rpc_pool import PooledHTTPProvider
+from token_verifier import FirebaseTokenVerifier, GOOGLE_CERTS_URL, firebase_user_states, http_user_states
+from chain_backend import Web3Backend, SimulatedBackend
+from sim_chain import SimulatedChain, SimulatedProvider, DEFAULT_CONTRACT_ADDRESS
 
 # Load environment variables from .env file
 # Load environment variables from .env file
@@ -20,7 +42,7 @@ load_dotenv()
 
 # FIX: Use absolute path so the file is ALWAYS found
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "election.db")
+DB_PATH = os.getenv("DB_PATH", os.path.join(BASE_DIR, "election.db"))
 
 
 app = Flask(__name__)
@@ -49,10 +71,35 @@ logger = logging.getLogger(__name__)
 
 # 1. Connect to Sepolia (Using a fast public node + 60s timeout)
 RPC_URL = os.getenv("RPC_URL", "https://ethereum-sepolia.publicnode.com")
-w3 = Web3(Web3.HTTPProvider(RPC_URL, request_kwargs={'timeout': 60}))
+# Several comma-separated endpoints -> pooled provider (failover, hedged reads, broadcast sends)
+RPC_URLS = [u.strip() for u in os.getenv("RPC_URLS", RPC_URL).split(",") if u.strip()]
+CHAIN_ID = int(os.getenv("CHAIN_ID", "11155111"))  # Sepolia
+# web3 -> the RPC node(s) above; simulated -> in-process chain for offline runs (see sim_chain.py)
+CHAIN_BACKEND = os.getenv("CHAIN_BACKEND", "web3").lower()
+if CHAIN_BACKEND == "simulated":
+    sim_chain = SimulatedChain(
+        os.getenv("CONTRACT_ADDRESS", DEFAULT_CONTRACT_ADDRESS), chain_id=CHAIN_ID,
+        block_time=float(os.getenv("SIM_BLOCK_TIME", "12")),
+        revert_rate=float(os.getenv("SIM_REVERT_RATE", "0"))
+    )
+    w3 = Web3(SimulatedProvider(sim_chain,
+                                latency=float(os.getenv("SIM_LATENCY_MS", "50")) / 1000,
+                                jitter=float(os.getenv("SIM_JITTER_MS", "20")) / 1000,
+                                failure_rate=float(os.getenv("SIM_FAILURE_RATE", "0"))))
+    logger.info(f"🧪 Simulated chain: {sim_chain.block_time}s blocks, no RPC node needed")
+elif len(RPC_URLS) > 1:
+    w3 = Web3(PooledHTTPProvider(RPC_URLS, timeout=60,
+                                 broadcast=int(os.getenv("RPC_BROADCAST", "3")),
+                                 hedge_max=float(os.getenv("RPC_HEDGE_MAX_MS", "2000")) / 1000))
+    logger.info(f"🌐 RPC pool: {RPC_URLS}")
+else:
+    w3 = Web3(Web3.HTTPProvider(RPC_URLS[0], request_kwargs={'timeout': 60}))
 
 # 2. Your Admin Wallet (Loaded from .env file)
 ADMIN_PRIVATE_KEY = os.getenv("ADMIN_PRIVATE_KEY")
+if CHAIN_BACKEND == "simulated" and not ADMIN_PRIVATE_KEY:
+    # Offline runs need no real wallet: a throwaway key is funded on the simulated chain
+    ADMIN_PRIVATE_KEY = w3.eth.account.create().key.hex()
 
 try:
     ADMIN_ADDRESS = w3.eth.account.from_key(ADMIN_PRIVATE_KEY).address
@@ -62,9 +109,6 @@ except Exception as e:
     logger.warning("⚠️ WARNING: Private Key not set correctly yet.")
     ADMIN_ADDRESS = None
 
-# 🔒 MUTEX LOCK for Admin Nonce (Prevents race conditions)
-NONCE_LOCK = threading.Lock()
-
 
 # 3. Your Contract Details (Loaded from .env file)
 CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS", "0x585a1801372e73BabAf4144D306bAF80A7496ae9")
@@ -83,65 +127,217 @@ CONTRACT_ABI = [
         "stateMutability": "view",
         "type": "function"
     },
+    {
+        "inputs": [{"internalType": "uint256[]","name": "ids","type": "uint256[]"}],
+        "name": "getVotesBatch",
+        "outputs": [{"internalType": "uint256[]","name": "counts","type": "uint256[]"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getAllVotes",
+        "outputs": [{"internalType": "uint256[]","name": "counts","type": "uint256[]"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "candidateCount",
+        "outputs": [{"internalType": "uint256","name": "","type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "uint256","name": "count","type": "uint256"}],
+        "name": "setCandidateCount",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "uint256","name": "candidateId","type": "uint256"},
+            {"internalType": "uint256","name": "nonce","type": "uint256"},
+            {"internalType": "bytes","name": "signature","type": "bytes"}
+        ],
+        "name": "voteFor",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "uint256[]","name": "candidateIds","type": "uint256[]"}],
+        "name": "voteBallot",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "uint256[]","name": "candidateIds","type": "uint256[]"},
+            {"internalType": "uint256","name": "nonce","type": "uint256"},
+            {"internalType": "bytes","name": "signature","type": "bytes"}
+        ],
+        "name": "voteBallotFor",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "uint256[]","name": "candidateIds","type": "uint256[]"},
+            {"internalType": "uint256[]","name": "counts","type": "uint256[]"}
+        ],
+        "name": "voteBatch",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "bytes32","name": "root","type": "bytes32"},
+            {"internalType": "uint256","name": "count","type": "uint256"}
+        ],
+        "name": "anchorRoot",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "bytes32","name": "","type": "bytes32"}],
+        "name": "anchoredAt",
+        "outputs": [{"internalType": "uint256","name": "","type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address","name": "","type": "address"}],
+        "name": "nonces",
+        "outputs": [{"internalType": "uint256","name": "","type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
     {
         "inputs": [{"internalType": "address","name": "","type": "address"}],
-        "name": "hasVoted",
+        "name": "relayers",
         "outputs": [{"internalType": "bool","name": "","type": "bool"}],
         "stateMutability": "view",
         "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "address","name": "relayer","type": "address"},
+            {"internalType": "bool","name": "allowed","type": "bool"}
+        ],
+        "name": "setRelayer",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
     }
 ]
 
+# 4. Vote Submission Mode
+#    funded  -> fund a temp wallet, temp wallet calls vote()       (2 transactions, works with old deployments)
+#    relayed -> temp key SIGNS the ballot, relayer calls voteFor() (1 transaction, needs the new Election.sol)
+#    batched -> relayer flushes many ballots in one voteBatch()    (1 transaction per batch, needs the new Election.sol)
+#    ledger  -> ballots go to the local append-only ledger, only Merkle roots are anchored on chain
+VOTE_MODE = os.getenv("VOTE_MODE", "funded").lower()
+VOTE_BATCH_SIZE = int(os.getenv("VOTE_BATCH_SIZE", "50"))
+VOTE_BATCH_WAIT_MS = int(os.getenv("VOTE_BATCH_WAIT_MS", "2000"))
+LEDGER_BATCH_SIZE = int(os.getenv("LEDGER_BATCH_SIZE", "1000"))
+LEDGER_ANCHOR_INTERVAL = float(os.getenv("LEDGER_ANCHOR_INTERVAL", "30"))
+LEDGER_ANCHOR_RESEND_AFTER = float(os.getenv("LEDGER_ANCHOR_RESEND_AFTER", "180"))
+
 contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+# ⛓️ Everything the vote pipeline asks the chain (send, receipts, fees, counts, events)
+chain = SimulatedBackend(w3, contract) if CHAIN_BACKEND == "simulated" else Web3Backend(w3, contract)
 
 # ==========================================================
 # 🔥 FIREBASE ADMIN INITIALIZATION
 # ==========================================================
 firebase_cred_path = os.path.join(BASE_DIR, "firebase_credentials.json")
+FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID")
 if os.path.exists(firebase_cred_path):
     try:
         cred = credentials.Certificate(firebase_cred_path)
         firebase_admin.initialize_app(cred)
+        FIREBASE_PROJECT_ID = FIREBASE_PROJECT_ID or firebase_admin.get_app().project_id
         logger.info("✅ Firebase Admin SDK initialized successfully")
     except Exception as e:
         logger.warning(f"⚠️ Firebase initialization failed: {e}")
 else:
     logger.warning(f"⚠️ Firebase credentials not found at {firebase_cred_path}")
 
+# 🔐 ID-token verification cache (one revocation lookup per user per window, not per login)
+token_verifier = FirebaseTokenVerifier(
+    FIREBASE_PROJECT_ID, DB_PATH,
+    cache_size=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    cache_ttl=float(os.getenv("AUTH_CACHE_TTL", "300")),
+    revocation_window=float(os.getenv("AUTH_REVOCATION_WINDOW", "300")),
+    certs_url=os.getenv("FIREBASE_CERTS_URL", GOOGLE_CERTS_URL),
+    lookup_users=http_user_states(os.environ["FIREBASE_USERS_URL"]) if os.getenv("FIREBASE_USERS_URL") else firebase_user_states
+)
+
+# 🧪 LOAD-TEST HOOK (benchmarks/loadgen.py): with this secret, /login accepts synthetic students
+LOAD_TEST_SECRET = os.getenv("LOAD_TEST_SECRET")
+if LOAD_TEST_SECRET:
+    logger.warning("⚠️ LOAD_TEST_SECRET is set: /login accepts synthetic students without Firebase. Never enable in production!")
+
 # ==========================================================
 # 🔒 THE GATEKEEPER (SQLite Database System)
 # ==========================================================
 import sqlite3
+import db
 
 def get_db_connection():
-    """Returns a connection to the SQLite database."""
+    """Returns this thread's pooled WAL connection to the SQLite database."""
     # DB_PATH is now defined globally at the top
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    # conn.close() hands it back for reuse instead of closing it
+    return db.connect(DB_PATH)
+
+# 🧠 Cached election state (admin changes bump a generation counter that every worker checks)
+election_state = ElectionState(DB_PATH, check_interval=float(os.getenv("ELECTION_STATE_CHECK_INTERVAL", "1")))
+
+def current_election():
+    """Election snapshot, taken once per request so every check in it agrees."""
+    if has_request_context():
+        if "election" not in g:
+            g.election = election_state.snapshot()
+        return g.election
+    return election_state.snapshot()
 
 def get_current_election_id():
-    """Reads the current election ID from the DB system_config."""
-    try:
-        conn = get_db_connection()
-        row = conn.execute("SELECT value FROM system_config WHERE key = 'current_election_id'").fetchone()
-        conn.close()
-        if row:
-            return int(row['value'])
-        return 1
-    except Exception as e:
-        logger.error(f"⚠️ Error reading election ID: {e}")
-        return 1
+    """Current election ID (from the cached election state, no DB round-trip)."""
+    return current_election().election_id
 
-def has_user_voted(student_id):
-    """Checks the database to see if student has voted in the CURRENT election."""
+def has_user_voted(student_id, positions=None):
+    """Checks the database to see if student has voted in the CURRENT election.
+
+    With `positions`, only those positions count (a legacy vote without position
+    records still blocks everything).
+    """
     eid = get_current_election_id()
     try:
         conn = get_db_connection()
-        vote = conn.execute(
-            "SELECT id FROM votes WHERE student_id = ? AND election_id = ?",
-            (student_id, eid)
-        ).fetchone()
+        if positions is None:
+            vote = conn.execute(
+                "SELECT id FROM votes WHERE student_id = ? AND election_id = ?",
+                (student_id, eid)
+            ).fetchone()
+        else:
+            marks = ",".join("?" * len(positions))
+            vote = conn.execute(
+                f"""SELECT v.id FROM votes v
+                    WHERE v.student_id = ? AND v.election_id = ? AND (
+                        NOT EXISTS (SELECT 1 FROM ballot_positions p
+                                    WHERE p.student_id = v.student_id AND p.election_id = v.election_id)
+                        OR EXISTS (SELECT 1 FROM ballot_positions p
+                                   WHERE p.student_id = v.student_id AND p.election_id = v.election_id
+                                   AND p.position IN ({marks}))
+                    )""",
+                [student_id, eid] + list(positions)
+            ).fetchone()
         conn.close()
         
         if vote:
@@ -152,17 +348,30 @@ def has_user_voted(student_id):
         logger.error(f"⚠️ Database Read Error: {e}")
         return False # Fail open or closed? Safer to allow retry if DB is down, but risk double vote.
 
-def mark_user_as_voted(student_id):
-    """Records the vote in SQLite with Atomic Transaction."""
+def mark_user_as_voted(student_id, positions=None):
+    """Records the vote in SQLite with Atomic Transaction (plus one row per completed position)."""
     eid = get_current_election_id()
     try:
         conn = get_db_connection()
-        conn.execute(
-            "INSERT INTO votes (student_id, election_id) VALUES (?, ?)",
-            (student_id, eid)
-        )
-        conn.commit()
-        conn.close()
+        try:
+            if positions is None:
+                conn.execute(
+                    "INSERT INTO votes (student_id, election_id) VALUES (?, ?)",
+                    (student_id, eid)
+                )
+            else:
+                # Same transaction: a clash on ANY position rejects the whole ballot
+                conn.execute(
+                    "INSERT OR IGNORE INTO votes (student_id, election_id) VALUES (?, ?)",
+                    (student_id, eid)
+                )
+                conn.executemany(
+                    "INSERT INTO ballot_positions (student_id, election_id, position) VALUES (?, ?, ?)",
+                    [(student_id, eid, p) for p in positions]
+                )
+            conn.commit()
+        finally:
+            conn.close()
         logger.info(f"💾 SAVED: {student_id} voted in Election #{eid}")
         return True
     except sqlite3.IntegrityError:
@@ -172,15 +381,32 @@ def mark_user_as_voted(student_id):
         logger.error(f"❌ CRITICAL DATABASE ERROR: {e}")
         return False
 
-def unmark_user_as_voted(student_id):
-    """ROLLBACK: Removes the vote record if blockchain tx fails."""
-    eid = get_current_election_id()
+def unmark_user_as_voted(student_id, election_id=None, positions=None):
+    """ROLLBACK: Removes the vote record if blockchain tx fails (only `positions` if given)."""
+    eid = election_id if election_id is not None else get_current_election_id()
     try:
         conn = get_db_connection()
-        conn.execute(
-            "DELETE FROM votes WHERE student_id = ? AND election_id = ?",
-            (student_id, eid)
-        )
+        if positions is None:
+            conn.execute(
+                "DELETE FROM ballot_positions WHERE student_id = ? AND election_id = ?",
+                (student_id, eid)
+            )
+            conn.execute(
+                "DELETE FROM votes WHERE student_id = ? AND election_id = ?",
+                (student_id, eid)
+            )
+        else:
+            marks = ",".join("?" * len(positions))
+            conn.execute(
+                f"DELETE FROM ballot_positions WHERE student_id = ? AND election_id = ? AND position IN ({marks})",
+                [student_id, eid] + list(positions)
+            )
+            # Drop the voter record only once no completed position is left
+            conn.execute(
+                """DELETE FROM votes WHERE student_id = ? AND election_id = ?
+                   AND NOT EXISTS (SELECT 1 FROM ballot_positions WHERE student_id = ? AND election_id = ?)""",
+                (student_id, eid, student_id, eid)
+            )
         conn.commit()
         conn.close()
         logger.info(f"↩️ ROLLBACK: Unmarked {student_id} (TX Failed)")
@@ -199,9 +425,66 @@ else:
     logger.info(f"📂 Database FOUND at {DB_PATH}. Verifying tables...")
     init_db(DB_PATH)
 
+# 📬 ASYNC VOTE QUEUE (Workers are started once the pipeline is defined below)
+VOTE_WORKERS = int(os.getenv("VOTE_WORKERS", "4"))
+vote_queue = VoteQueue(DB_PATH)
+
+# 🚦 MULTI-LANE RELAYER (Each funding wallet has its own nonce lane, shared via SQLite)
+relayer_lanes = []
+for key in load_relayer_keys(os.getenv("ADMIN_PRIVATE_KEYS"), os.getenv("ADMIN_MNEMONIC"),
+                             int(os.getenv("ADMIN_LANES", "1")), ADMIN_PRIVATE_KEY if ADMIN_ADDRESS else None):
+    try:
+        relayer_lanes.append(RelayerLane(chain, key, DB_PATH))
+    except Exception as e:
+        logger.warning(f"⚠️ Skipping invalid relayer key: {e}")
+relayer = LaneScheduler(chain, relayer_lanes, min_balance_wei=int(0.01 * 10**18))
+if CHAIN_BACKEND == "simulated":
+    # Lanes are funded relayers from genesis (the first one owns the contract)
+    for lane in relayer_lanes:
+        sim_chain.fund(lane.address)
+        sim_chain.add_relayer(lane.address)
+    chain.start()
+logger.info(f"🚦 Relayer lanes: {[lane.address for lane in relayer_lanes]}")
+
+# 👛 PRE-FUNDED WALLET POOL (Defaults, overridable per election from the admin dashboard)
+WALLET_POOL_SIZE = int(os.getenv("WALLET_POOL_SIZE", "0"))
+WALLET_POOL_LOW_WATER = int(os.getenv("WALLET_POOL_LOW_WATER", str(WALLET_POOL_SIZE // 2)))
+WALLET_POOL_REFILL_RATE = int(os.getenv("WALLET_POOL_REFILL_RATE", "5"))
+WALLET_POOL_INTERVAL = float(os.getenv("WALLET_POOL_INTERVAL", "10"))
+
+# 📊 RESULTS CACHE (One batched RPC per TTL for ALL viewers, shared by every worker)
+RESULTS_CACHE_TTL = float(os.getenv("RESULTS_CACHE_TTL", "5"))
+results_cache = SharedTTLCache(DB_PATH, ttl=RESULTS_CACHE_TTL)
+
+# 🔎 VOTED EVENT INDEXER (Local tallies; disabled until CONTRACT_DEPLOY_BLOCK is set)
+CONTRACT_DEPLOY_BLOCK = os.getenv("CONTRACT_DEPLOY_BLOCK")
+INDEXER_MAX_LAG = int(os.getenv("INDEXER_MAX_LAG", "10"))
+vote_indexer = VoteIndexer(
+    chain, DB_PATH,
+    start_block=int(CONTRACT_DEPLOY_BLOCK or 0),
+    reorg_depth=int(os.getenv("INDEXER_REORG_DEPTH", "12")),
+    chunk_size=int(os.getenv("INDEXER_CHUNK_SIZE", "2000")),
+    interval=float(os.getenv("INDEXER_INTERVAL", "15"))
+)
+wallet_pool = WalletPool(chain, DB_PATH, os.getenv("WALLET_POOL_SECRET", app.secret_key))
+
+# ⛽ FEE ORACLE (EIP-1559 fees sampled in the background; 1 = aim for the next block)
+FEE_TARGET_BLOCKS = int(os.getenv("FEE_TARGET_BLOCKS", "1"))
+fee_oracle = FeeOracle(chain, target_blocks=FEE_TARGET_BLOCKS, interval=float(os.getenv("FEE_ORACLE_INTERVAL", "4")))
+
+# 🧾 RECEIPT WATCHER (One poller per process resolves every in-flight transaction)
+receipt_watcher = ReceiptWatcher(chain, interval=float(os.getenv("RECEIPT_POLL_INTERVAL", "2")))
+
 # ==========================================================
 # 📋 CANDIDATE MANAGEMENT (DB)
 # ==========================================================
+# 🧠 Cached candidate set for the student pages (add/delete bump a version every worker checks)
+candidate_cache = CandidateCache(DB_PATH, check_interval=float(os.getenv("CANDIDATE_CACHE_CHECK_INTERVAL", "1")))
+
+# 🖼️ Uploaded photos are resized into WebP/JPEG derivatives in the background (srcset on the cards)
+candidate_images = CandidateImageProcessor(DB_PATH, os.path.join(BASE_DIR, "static/images"),
+                                           interval=float(os.getenv("CANDIDATE_IMAGE_INTERVAL", "5")))
+
 def get_all_candidates():
     """Fetches all candidates from the database."""
     try:
@@ -224,16 +507,45 @@ def get_candidate_by_id(cid):
         logger.error(f"⚠️ DB Read Error (One Candidate): {e}")
         return None
 
+def get_ballot_candidates(candidate_ids):
+    """Fetches the ACTIVE candidates among `candidate_ids` in a single query."""
+    marks = ",".join("?" * len(candidate_ids))
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT id, position FROM candidates WHERE active = 1 AND id IN ({marks})",
+            list(candidate_ids)
+        ).fetchall()
+        return [dict(r) for r in rows]
+    finally:
+        conn.close()
+
+def get_candidate_positions(candidate_ids):
+    """Distinct positions of the given candidates (active or not, used for rollbacks)."""
+    marks = ",".join("?" * len(candidate_ids))
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT DISTINCT position FROM candidates WHERE id IN ({marks})",
+            list(candidate_ids)
+        ).fetchall()
+        return [r["position"] for r in rows]
+    finally:
+        conn.close()
+
 def add_candidate(name, position, image, manifesto):
-    """Adds a new candidate to the database."""
+    """Adds a new candidate to the database (its photo is queued for derivatives)."""
     try:
         conn = get_db_connection()
         conn.execute(
-            "INSERT INTO candidates (name, position, image, manifesto) VALUES (?, ?, ?, ?)",
+            "INSERT INTO candidates (name, position, image, manifesto, image_status) VALUES (?, ?, ?, ?, 'pending')",
             (name, position, image, manifesto)
         )
+        bump_candidates_version(conn)
         conn.commit()
         conn.close()
+        candidate_cache.invalidate()
+        candidate_images.notify()
         return True, "Success"
     except Exception as e:
         logger.error(f"❌ Error Adding Candidate: {e}")
@@ -244,8 +556,10 @@ def delete_candidate(cid):
     try:
         conn = get_db_connection()
         conn.execute("UPDATE candidates SET active = 0 WHERE id = ?", (cid,))
+        bump_candidates_version(conn)
         conn.commit()
         conn.close()
+        candidate_cache.invalidate()
         return True
     except Exception as e:
         logger.error(f"❌ Error Deleting Candidate: {e}")
@@ -278,8 +592,10 @@ def update_pause_status(election_id, is_paused):
             "UPDATE election_settings SET is_paused = ? WHERE election_id = ?",
             (1 if is_paused else 0, election_id)
         )
+        bump_generation(conn)
         conn.commit()
         conn.close()
+        election_state.invalidate()
         return True
     except Exception as e:
         logger.error(f"❌ Error updating pause status: {e}")
@@ -293,8 +609,10 @@ def set_election_deadline(election_id, deadline_str):
             "UPDATE election_settings SET deadline = ? WHERE election_id = ?",
             (deadline_str, election_id)
         )
+        bump_generation(conn)
         conn.commit()
         conn.close()
+        election_state.invalidate()
         return True
     except Exception as e:
         logger.error(f"❌ Error setting deadline: {e}")
@@ -302,36 +620,50 @@ def set_election_deadline(election_id, deadline_str):
 
 def is_voting_allowed():
     """Check if voting is currently allowed (not paused & before deadline)."""
-    eid = get_current_election_id()
-    settings = get_election_settings(eid)
-    
-    if not settings:
-        # If no settings exist, create default and allow voting
-        try:
-            conn = get_db_connection()
-            conn.execute("INSERT OR IGNORE INTO election_settings (election_id, is_paused) VALUES (?, 0)", (eid,))
-            conn.commit()
-            conn.close()
-        except:
-            pass
-        return True, "Voting is open"
-    
+    state = current_election()
+
     # Check if paused
-    if settings.get('is_paused'):
+    if state.is_paused:
         return False, "⏸️ Voting is currently paused by admin"
     
-    # Check deadline
-    deadline = settings.get('deadline')
-    if deadline:
-        try:
-            deadline_dt = datetime.fromisoformat(deadline)
-            if datetime.now() > deadline_dt:
-                return False, f"⏰ Voting ended at {deadline_dt.strftime('%Y-%m-%d %H:%M')}"
-        except:
-            pass
+    # Check deadline (precomputed epoch, no parsing per request)
+    if state.deadline_epoch is not None and time.time() > state.deadline_epoch:
+        deadline_dt = datetime.fromtimestamp(state.deadline_epoch)
+        return False, f"⏰ Voting ended at {deadline_dt.strftime('%Y-%m-%d %H:%M')}"
     
     return True, "Voting is open"
 
+def get_wallet_pool_settings(election_id=None):
+    """Wallet pool tuning for an election (falls back to the .env defaults)."""
+    eid = election_id if election_id is not None else get_current_election_id()
+    settings = get_election_settings(eid) or {}
+    size = settings.get('wallet_pool_size')
+    low_water = settings.get('wallet_pool_low_water')
+    refill_rate = settings.get('wallet_pool_refill_rate')
+    return {
+        "size": size if size is not None else WALLET_POOL_SIZE,
+        "low_water": low_water if low_water is not None else WALLET_POOL_LOW_WATER,
+        "refill_rate": refill_rate if refill_rate is not None else WALLET_POOL_REFILL_RATE
+    }
+
+def set_wallet_pool_settings(election_id, size, low_water, refill_rate):
+    """Saves wallet pool tuning for an election."""
+    try:
+        conn = get_db_connection()
+        conn.execute("INSERT OR IGNORE INTO election_settings (election_id, is_paused) VALUES (?, 0)", (election_id,))
+        conn.execute(
+            """UPDATE election_settings
+               SET wallet_pool_size = ?, wallet_pool_low_water = ?, wallet_pool_refill_rate = ?
+               WHERE election_id = ?""",
+            (size, low_water, refill_rate, election_id)
+        )
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error saving wallet pool settings: {e}")
+        return False
+
 # ==========================================================
 # ROUTES
 # ==========================================================
@@ -345,13 +677,69 @@ def add_security_headers(response):
     # response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
     return response
 
+# 📦 FINGERPRINTED ASSETS (built by `python -m static_assets`, served precompressed from /assets/)
+asset_manifest = AssetManifest(app.static_folder)
+
+@app.template_global()
+def asset_url(filename):
+    """url_for('static', filename=...) that points at the fingerprinted copy when there is one."""
+    hashed = asset_manifest.lookup(filename)
+    if hashed is None:
+        return url_for("static", filename=filename)
+    return url_for("asset", filename=hashed)
+
+@app.route("/assets/<path:filename>")
+@limiter.exempt
+def asset(filename):
+    """Fingerprinted asset, as .br/.gz when the browser accepts it; the name changes with the content."""
+    path, encoding = asset_manifest.pick_encoding(filename, request.accept_encodings)
+    resp = send_from_directory(asset_manifest.dist_dir, path, mimetype=asset_manifest.mimetype(filename))
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    resp.vary.add("Accept-Encoding")
+    return resp
+
 # 💉 CONTEXT PROCESSOR: Inject Contract Address into ALL templates
 @app.context_processor
 def inject_contract_config():
     return {
-        "CONTRACT_ADDRESS": CONTRACT_ADDRESS
+        "CONTRACT_ADDRESS": CONTRACT_ADDRESS,
+        "VOTE_MODE": VOTE_MODE
     }
 
+# 🏷️ CANDIDATE PAGE ETAGS (a refresh with a matching If-None-Match gets a 304: no DB, no rendering)
+def _templates_fingerprint():
+    """Hash of every template, so a redeploy with changed markup never matches an old ETag."""
+    digest = hashlib.sha256()
+    templates_dir = os.path.join(BASE_DIR, "templates")
+    for root, dirs, files in os.walk(templates_dir):
+        dirs.sort()
+        for name in sorted(files):
+            with open(os.path.join(root, name), "rb") as f:
+                digest.update(name.encode() + f.read())
+    return digest.hexdigest()[:16]
+
+# The asset manifest is part of it: a cached page must never point at assets from an older build
+PAGE_FINGERPRINT = make_etag(_templates_fingerprint(), json.dumps(asset_manifest.paths, sort_keys=True), CONTRACT_ADDRESS, VOTE_MODE)
+
+def candidate_page(page, snap, render):
+    """Response for a student page built only from the candidate set and the session.
+
+    The strong ETag covers the deploy, the candidate version and the student shown
+    in the navbar; `render()` only runs when the browser's copy is stale.
+    """
+    etag = make_etag(PAGE_FINGERPRINT, page, snap.version, session.get("student_id"))
+    if snap.version is not None and request.if_none_match.contains(etag):
+        resp = app.response_class(status=304)
+    else:
+        resp = make_response(render())
+    if snap.version is not None:
+        resp.set_etag(etag)
+    # Browsers keep the page but revalidate on every visit
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
 @app.route("/")
 def home():
     return redirect("/dashboard") if "user_id" in session else redirect("/login")
@@ -364,10 +752,14 @@ def login():
         return render_template("login.html")
     try:
         data = request.get_json()
-        id_token = data.get("idToken")
-        if not id_token:
-            return jsonify({"status": "error", "message": "Missing ID Token"}), 400
-        decoded = auth.verify_id_token(id_token, check_revoked=True, clock_skew_seconds=60)
+        if LOAD_TEST_SECRET and hmac.compare_digest(request.headers.get("X-Load-Test-Secret", ""), LOAD_TEST_SECRET):
+            # 🧪 Synthetic student from the load generator (no Firebase round-trip)
+            decoded = {"uid": f"loadtest-{data['email']}", "email": data["email"]}
+        else:
+            id_token = data.get("idToken")
+            if not id_token:
+                return jsonify({"status": "error", "message": "Missing ID Token"}), 400
+            decoded = token_verifier.verify(id_token)
         session["user_id"] = decoded["uid"]
         session["email"] = decoded["email"]
         session["student_id"] = decoded["email"].split("@")[0]
@@ -400,29 +792,43 @@ def architecture():
 @app.route("/vote")
 def vote():
     if "user_id" not in session: return redirect("/login")
-    candidates = get_all_candidates()
-    return render_template("vote.html", candidates=candidates)
+    snap = candidate_cache.snapshot()
+    return candidate_page("vote", snap, lambda: render_template(
+        "vote.html",
+        candidates_html=candidate_cache.fragment(snap, "vote_grid", lambda: Markup(
+            render_template("partials/vote_grid.html", candidates=snap.active)))
+    ))
 
 # ---------------- RESULTS ----------------
 @app.route("/results")
 def results():
     if "user_id" not in session: return redirect("/login")
-    candidates = get_all_candidates()
-    resp = make_response(render_template("results.html", candidates=candidates))
-    resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    return resp
+    # Vote counts come from /api/results, so the page itself only changes with the candidate set
+    snap = candidate_cache.snapshot()
+    return candidate_page("results", snap, lambda: render_template(
+        "results.html",
+        candidates=snap.active,
+        candidates_html=candidate_cache.fragment(snap, "results_grid", lambda: Markup(
+            render_template("partials/results_grid.html", candidates=snap.active)))
+    ))
 
 # ---------------- MANIFESTO ----------------
 @app.route("/manifesto/<int:candidate_id>")
 def manifesto(candidate_id):
     if "user_id" not in session: return redirect("/login")
     
-    # Validate candidate ID via DB
-    candidate = get_candidate_by_id(candidate_id)
+    # Validate candidate ID via the cached candidate set
+    snap = candidate_cache.snapshot()
+    candidate = snap.by_id.get(candidate_id)
     if not candidate:
         return redirect("/vote")
-    
-    return render_template(f"manifesto.html", candidate=candidate)
+
+    return candidate_page(f"manifesto:{candidate_id}", snap, lambda: render_template(
+        "manifesto.html",
+        candidate=candidate,
+        manifesto_html=candidate_cache.fragment(snap, f"manifesto:{candidate_id}", lambda: Markup(
+            render_template("partials/manifesto_body.html", candidate=candidate)))
+    ))
 
 
 # ---------------- LOGOUT ----------------
@@ -448,8 +854,8 @@ def admin():
         if not id_token:
             return jsonify({"status": "error", "message": "Missing ID Token"}), 400
         
-        # Verify Token
-        decoded = auth.verify_id_token(id_token, check_revoked=True, clock_skew_seconds=60)
+        # Verify Token (admins always get a live revocation check)
+        decoded = token_verifier.verify(id_token, fresh=True)
         email = decoded.get("email")
         
         # 🔒 STRICT ACCESS CONTROL (Loaded from .env file)
@@ -494,12 +900,20 @@ def admin_dashboard():
     except Exception as e:
         logger.error(f"⚠️ DB Error in Admin Dashboard: {e}")
     
+    try:
+        pool_depth = wallet_pool.depth()
+    except Exception as e:
+        logger.error(f"⚠️ Wallet pool unavailable: {e}")
+        pool_depth = None
+
     return render_template("admin_dashboard.html", 
                          total_votes=total_votes,
                          voters=voters,
                          admin_email=session.get("admin_email"),
                          current_election_id=eid,
-                         candidates=candidates)
+                         candidates=candidates,
+                         wallet_pool=pool_depth,
+                         wallet_pool_settings=get_wallet_pool_settings(eid))
 
 # ---------------- ADMIN CANDIDATE MANAGEMENT ----------------
 @app.route("/admin/candidates/add", methods=["POST"])
@@ -520,7 +934,7 @@ def admin_add_candidate():
             images_dir = os.path.join(BASE_DIR, "static/images")
             os.makedirs(images_dir, exist_ok=True)
             
-            image_filename = f"{int(time.time())}_{image_file.filename}"
+            image_filename = f"{int(time.time())}_{secure_filename(image_file.filename)}"
             image_path = os.path.join(images_dir, image_filename)
             image_file.save(image_path)
 
@@ -602,22 +1016,54 @@ def admin_get_election_status():
         "is_paused": settings.get('is_paused', 0) if settings else 0,
         "deadline": settings.get('deadline') if settings else None,
         "voting_allowed": allowed,
-        "message": message
+        "message": message,
+        "wallet_pool": wallet_pool.depth(),
+        "wallet_pool_settings": get_wallet_pool_settings(eid),
+        "relayer_lanes": relayer.status(),
+        "vote_indexer": vote_indexer.status() if CONTRACT_DEPLOY_BLOCK else None,
+        "fees": fee_oracle.status(),
+        "receipts": receipt_watcher.status(),
+        "chain": chain.status(),
+        "rpc_endpoints": w3.provider.status() if isinstance(w3.provider, PooledHTTPProvider) else None
     })
 
+@app.route("/admin/election/wallet-pool", methods=["POST"])
+def admin_set_wallet_pool():
+    if not session.get("is_admin"): return jsonify({"status": "error"}), 403
+
+    data = request.get_json() or {}
+    try:
+        size = int(data.get("size"))
+        low_water = int(data.get("low_water", size // 2))
+        refill_rate = int(data.get("refill_rate", WALLET_POOL_REFILL_RATE))
+        if size < 0 or low_water < 0 or refill_rate < 0 or low_water > size:
+            raise ValueError
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "Invalid pool settings"}), 400
+
+    eid = get_current_election_id()
+    if set_wallet_pool_settings(eid, size, low_water, refill_rate):
+        logger.info(f"👛 Wallet pool for Election #{eid}: size={size} low={low_water} rate={refill_rate}")
+        return jsonify({"status": "success", "message": "Wallet pool updated"})
+    return jsonify({"status": "error", "message": "Failed to update wallet pool"})
+
 # FIX: Absolute path for offsets
 def get_current_offsets(eid):
-    """Returns the offsets for a specific election ID from DB."""
+    """Returns the offsets for a specific election ID from DB as {candidate_id: count}."""
     try:
         conn = get_db_connection()
         row = conn.execute("SELECT offset_values FROM election_offsets WHERE election_id = ?", (eid,)).fetchone()
         conn.close()
-        if row:
-            return json.loads(row['offset_values'])
-        return [0] * 6
+        if not row:
+            return {}
+        offsets = json.loads(row['offset_values'])
+        if isinstance(offsets, list):
+            # Legacy snapshot: positional, same order as get_all_candidates() at rollover time
+            return {cand['id']: count for cand, count in zip(get_all_candidates(), offsets)}
+        return {int(cid): count for cid, count in offsets.items()}
     except Exception as e:
         logger.error(f"⚠️ Error reading offsets: {e}")
-        return [0] * 6
+        return {}
 
 @app.route("/api/offsets")
 def api_offsets():
@@ -626,48 +1072,123 @@ def api_offsets():
     offsets = get_current_offsets(eid)
     return jsonify({"election_id": eid, "offsets": offsets})
 
+def get_raw_vote_counts(candidate_ids):
+    """All-time counts per candidate: local index when it is caught up, else one batched RPC."""
+    lag = vote_indexer.lag() if CONTRACT_DEPLOY_BLOCK else None
+    if lag is not None and lag <= INDEXER_MAX_LAG:
+        tallies = vote_indexer.tallies()
+        return {cid: tallies.get(cid, 0) for cid in candidate_ids}
+    return chain.get_votes(candidate_ids)
+
+def get_election_tallies(eid, candidate_ids):
+    """Exact per-candidate counts for one election.
+
+    Block-anchored elections count the Voted events between their start and end
+    block; older elections fall back to raw chain counts minus their offsets.
+    """
+    settings = get_election_settings(eid) or {}
+    start_block, end_block = settings.get("start_block"), settings.get("end_block")
+
+    if start_block is None:
+        raw = get_raw_vote_counts(candidate_ids)
+        offsets = get_current_offsets(eid)
+        return {cid: max(0, raw[cid] - offsets.get(cid, 0)) for cid in candidate_ids}
+
+    lag = vote_indexer.lag()
+    if end_block is not None or (lag is not None and lag <= INDEXER_MAX_LAG):
+        tallies = vote_indexer.tallies_between(start_block, end_block)
+    elif vote_indexer.cursor() >= start_block - 1:
+        # Index is behind: live total minus everything indexed before this election began
+        raw = chain.get_votes(candidate_ids)
+        before = vote_indexer.tallies_between(None, start_block - 1)
+        tallies = {cid: raw[cid] - before.get(cid, 0) for cid in candidate_ids}
+    else:
+        logger.warning(f"⚠️ Vote index has not reached Election #{eid} yet, tallies are partial")
+        tallies = vote_indexer.tallies_between(start_block, None)
+    return {cid: max(0, tallies.get(cid, 0)) for cid in candidate_ids}
+
+def compute_results(eid):
+    """Final tallies for an election (ledger, block range or legacy offsets)."""
+    candidates = get_all_candidates()
+    ids = [c["id"] for c in candidates]
+
+    if VOTE_MODE == "ledger":
+        votes = ballot_ledger.tally(eid)
+    else:
+        votes = get_election_tallies(eid, ids)
+
+    return {
+        "election_id": eid,
+        "votes": {str(cid): votes.get(cid, 0) for cid in ids},
+        "total": sum(votes.get(cid, 0) for cid in ids),
+        "updated_at": time.time()
+    }
+
+@app.route("/api/results")
+@limiter.exempt
+def api_results():
+    """Server-side tallies for the CURRENT election (cached, polled by results.js)."""
+    eid = get_current_election_id()
+    try:
+        return jsonify(results_cache.get(f"results:{eid}", lambda: compute_results(eid)))
+    except Exception as e:
+        logger.error(f"❌ Results refresh failed: {e}")
+        return jsonify({"status": "error", "message": "Results temporarily unavailable"}), 503
+
 @app.route("/admin/start-new-election", methods=["POST"])
 def start_new_election():
     if not session.get("is_admin"):
         return jsonify({"status": "error", "message": "Unauthorized"}), 403
         
     try:
-        # 0. FETCH CURRENT BLOCKCHAIN TOTALS (The Snapshot)
-        # 0. FETCH CURRENT BLOCKCHAIN TOTALS (The Snapshot)
-        current_votes = []
-        try:
-             # FIX: Fetch ALL active candidates, not just 1-6
-             all_cands = get_all_candidates()
-             # We need to snapshot votes for EVERY candidate in the DB
-             # Assuming candidate IDs correspond to contract IDs
-             
-             for cand in all_cands:
-                 cid = cand['id']
-                 try:
-                    count = contract.functions.getVotes(cid).call()
-                    current_votes.append(count)
-                 except Exception as sub_e:
-                    logger.warning(f"⚠️ Could not fetch votes for ID {cid}: {sub_e}")
-                    current_votes.append(0) # Default to 0 if error for this specific ID
-                 
-             logger.info(f"📸 SNAPSHOT CAPTURED: {current_votes}")
-        except Exception as e:
-             return jsonify({"status": "error", "message": f"Blockchain Read Failed: {str(e)}"}), 500
-
-        # 1. Read Current ID (from DB)
+        # 1. Read Current ID (fresh from DB, another worker may have just rolled over)
+        election_state.invalidate()
         current_id = get_current_election_id()
         
         # 2. Increment ID
         new_id = current_id + 1
-        
-        # 3. Save Offset AND New ID to DB (Transaction)
+
+        # 0. BOUNDARY: the chain height right now (the indexer's head can lag a whole interval,
+        #    and votes mined in that gap still belong to the cycle being closed)
+        boundary = None
+        if CONTRACT_DEPLOY_BLOCK:
+            try:
+                boundary = chain.block_number()
+            except Exception as e:
+                return jsonify({"status": "error", "message": f"Blockchain Read Failed: {str(e)}"}), 500
+        current_votes = {}
+        if boundary is None:
+            # No event index -> legacy snapshot of on-chain totals, keyed by candidate ID
+            try:
+                ids = [cand['id'] for cand in get_all_candidates()]
+                current_votes = get_raw_vote_counts(ids)
+                logger.info(f"📸 SNAPSHOT CAPTURED: {current_votes}")
+            except Exception as e:
+                 return jsonify({"status": "error", "message": f"Blockchain Read Failed: {str(e)}"}), 500
+
+        # 3. Save Boundary (or Offsets) AND New ID to DB (Transaction)
         try:
             conn = get_db_connection()
-            # Save Offsets for NEW ID (Offsets for Cycle N = Snapshot at end of Cycle N-1)
-            conn.execute(
-                "INSERT OR REPLACE INTO election_offsets (election_id, offset_values) VALUES (?, ?)",
-                (new_id, json.dumps(current_votes))
-            )
+            if boundary is not None:
+                # Cycle N ends at the boundary block, cycle N+1 starts right after it
+                conn.execute(
+                    "UPDATE election_settings SET end_block = ? WHERE election_id = ?",
+                    (boundary, current_id)
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO election_settings (election_id, is_paused) VALUES (?, 0)",
+                    (new_id,)
+                )
+                conn.execute(
+                    "UPDATE election_settings SET start_block = ? WHERE election_id = ?",
+                    (boundary + 1, new_id)
+                )
+            else:
+                # Save Offsets for NEW ID (Offsets for Cycle N = Snapshot at end of Cycle N-1)
+                conn.execute(
+                    "INSERT OR REPLACE INTO election_offsets (election_id, offset_values) VALUES (?, ?)",
+                    (new_id, json.dumps(current_votes))
+                )
             
             # Update Current ID
             conn.execute(
@@ -681,14 +1202,20 @@ def start_new_election():
                 (new_id,)
             )
 
+            # 5. Tell every worker to reload the election state
+            bump_generation(conn)
             conn.commit()
             conn.close()
+            election_state.invalidate()
         except Exception as db_e:
              logger.error(f"❌ Database Write Failed: {db_e}")
              return jsonify({"status": "error", "message": f"DB Error: {db_e}"}), 500
 
-        logger.info(f"🔄 ELECTION CYCLE UPDATED: {current_id} -> {new_id} with Offsets {current_votes}")
-        return jsonify({"status": "success", "new_election_id": new_id})
+        if boundary is not None:
+            logger.info(f"🔄 ELECTION CYCLE UPDATED: {current_id} -> {new_id} at block {boundary}")
+        else:
+            logger.info(f"🔄 ELECTION CYCLE UPDATED: {current_id} -> {new_id} with Offsets {current_votes}")
+        return jsonify({"status": "success", "new_election_id": new_id, "boundary_block": boundary})
         
     except Exception as e:
         logger.error(f"❌ Error starting new election: {e}")
@@ -712,6 +1239,297 @@ def internal_server_error(e):
 # ==========================================================
 # 🚀 NEW SERVER-SIDE VOTING LOGIC (SECURE + ROBUST)
 # ==========================================================
+def _raw_tx(signed_tx):
+    # FIX: Try snake_case, if missing use camelCase (Universal fix)
+    return getattr(signed_tx, "raw_transaction", None) or signed_tx.rawTransaction
+
+def _send_signed(signed_tx):
+    """Broadcasts through the chain backend and returns the 0x hash."""
+    return chain.send_raw_transaction(_raw_tx(signed_tx))
+
+def _build_tx(contract_function, tx_params):
+    # 🛠️ UNIVERSAL BUILD TRANSACTION FIX
+    try:
+        return contract_function.build_transaction(tx_params)
+    except AttributeError:
+        return contract_function.buildTransaction(tx_params)
+
+def relay_transaction(build_tx, before_send=None):
+    """Signs and sends a transaction from the least busy relayer lane.
+
+    `build_tx(lane, nonce)` returns the transaction dict; the nonce comes from the
+    lane's local manager (no RPC) and is handed back if the node refuses the tx.
+    `before_send(signed_tx)` runs between signing and broadcasting.
+    """
+    with relayer.lane() as lane:
+        nonce = lane.nonces.allocate()
+        signed_tx = w3.eth.account.sign_transaction(build_tx(lane, nonce), lane.account.key)
+        try:
+            if before_send:
+                before_send(signed_tx)
+            return _send_signed(signed_tx)
+        except Exception as send_e:
+            # Node refused it -> give the nonce back (or resync on a gap)
+            lane.nonces.release(nonce, send_e)
+            raise
+
+def fund_address(address, fees=None):
+    """Sends 0.005 ETH from the least busy relayer lane to `address` and returns the tx hash."""
+    if fees is None:
+        # ⛽ From memory (read BEFORE taking a nonce)
+        fees = fee_oracle.fees()
+
+    # Calculate amount manually: 0.005 ETH = 0.005 * 10^18 Wei
+    amount_in_wei = int(0.005 * 10**18)
+
+    return relay_transaction(lambda lane, nonce: {
+        'to': address,
+        'value': amount_in_wei,
+        'gas': 21000,
+        **fees,
+        'nonce': nonce,
+        'chainId': CHAIN_ID
+    })
+
+def persist_signed_vote(job_id):
+    """`before_send` hook: stores a job's signed vote so a re-claimed job re-sends it instead of voting again."""
+    def persist(signed_tx):
+        vote_queue.update(job_id, vote_tx_hash=w3.to_hex(signed_tx.hash), vote_raw_tx=w3.to_hex(_raw_tx(signed_tx)))
+    return persist
+
+def rebroadcast_vote(job):
+    """Re-sends the stored signed vote of a re-claimed job (the node may never have seen it)."""
+    try:
+        chain.send_raw_transaction(bytes.fromhex(job["vote_raw_tx"][2:]))
+        logger.info(f"📡 Re-broadcast stored vote {job['vote_tx_hash']}")
+    except Exception as e:
+        # "already known" / "nonce too low": it is in the mempool or mined already
+        logger.info(f"♻️ Stored vote {job['vote_tx_hash']} not re-sent: {e}")
+
+def relay_signed_vote(candidate_id, fees, before_send=None):
+    """Meta-transaction vote: an ephemeral key signs the ballot, a relayer lane submits voteFor()."""
+    ballot_key = w3.eth.account.create()
+    signature = sign_ballot(ballot_key.key, candidate_id, 0, CHAIN_ID, contract.address)
+    logger.info(f"✍️ Ballot signed by ephemeral key {ballot_key.address}")
+
+    return relay_transaction(lambda lane, nonce: _build_tx(
+        contract.functions.voteFor(candidate_id, 0, signature),
+        {
+            'from': lane.address,
+            'nonce': nonce,
+            'gas': 200000,
+            **fees,
+            'chainId': CHAIN_ID
+        }
+    ), before_send)
+
+def relay_signed_ballot(candidate_ids, fees, before_send=None):
+    """Meta-transaction for a full multi-position ballot: one voteBallotFor() for every position."""
+    ballot_key = w3.eth.account.create()
+    signature = sign_multi_ballot(ballot_key.key, candidate_ids, 0, CHAIN_ID, contract.address)
+    logger.info(f"✍️ Ballot of {len(candidate_ids)} choices signed by ephemeral key {ballot_key.address}")
+
+    return relay_transaction(lambda lane, nonce: _build_tx(
+        contract.functions.voteBallotFor(candidate_ids, 0, signature),
+        {
+            'from': lane.address,
+            'nonce': nonce,
+            'gas': 150000 + 60000 * len(candidate_ids),
+            **fees,
+            'chainId': CHAIN_ID
+        }
+    ), before_send)
+
+def cast_funded_vote(job, fees):
+    """Classic flow: temp wallet (pooled or freshly funded) calls vote() / voteBallot() itself."""
+    job_id = job["id"]
+
+    # 1. Take a PRE-FUNDED wallet from the pool (skips a whole block of waiting)
+    temp_account = wallet_pool.pop()
+    if temp_account:
+        logger.info(f"👛 Using pooled voter wallet: {temp_account.address}")
+    else:
+        # Pool empty -> create a FRESH temporary wallet and fund it now
+        temp_account = w3.eth.account.create()
+        logger.info(f"👤 Created Temp Voter: {temp_account.address}")
+
+        vote_queue.update(job_id, stage="funding")
+
+        # 2. Fund the Temp Wallet
+        tx_hash_fund = fund_address(temp_account.address, fees)
+        logger.info(f"💸 Funding Temp Wallet... (Tx: {tx_hash_fund})")
+        vote_queue.update(job_id, fund_tx_hash=tx_hash_fund)
+
+        # Wait for funding (TIMEOUT 300s)
+        receipt_watcher.wait(tx_hash_fund, timeout=300)
+
+    # 3. Cast the Vote (a multi-position ballot is still ONE transaction)
+    vote_queue.update(job_id, stage="voting")
+    if job.get("candidate_ids"):
+        candidate_ids = job_choices(job)
+        vote_call, gas_limit = contract.functions.voteBallot(candidate_ids), 100000 + 60000 * len(candidate_ids)
+    else:
+        vote_call, gas_limit = contract.functions.vote(job["candidate_id"]), 300000
+    built_vote_tx = _build_tx(vote_call, {
+        'from': temp_account.address,
+        'nonce': 0,
+        'gas': gas_limit,
+        **fees,
+        'chainId': CHAIN_ID
+    })
+    signed_vote_tx = w3.eth.account.sign_transaction(built_vote_tx, temp_account.key)
+    # Stored first: a worker dying after this point must not lead to a second vote
+    persist_signed_vote(job_id)(signed_vote_tx)
+    return _send_signed(signed_vote_tx)
+
+def rollback_vote_job(job):
+    """Unlocks the positions of a failed job so the student can vote for them again."""
+    positions = get_candidate_positions(job_choices(job))
+    unmark_user_as_voted(job["student_id"], job["election_id"], positions=positions)
+
+def flush_vote_batch(jobs):
+    """Sends one voteBatch() for a list of queued jobs and resolves all of them with its hash."""
+    tally = Counter(cid for job in jobs for cid in job_choices(job))
+    candidate_ids = list(tally.keys())
+    counts = [tally[cid] for cid in candidate_ids]
+
+    try:
+        fees = fee_oracle.fees()
+        gas_limit = 60000 + 30000 * len(candidate_ids) + 5000 * sum(counts)
+
+        tx_hash = relay_transaction(lambda lane, nonce: _build_tx(
+            contract.functions.voteBatch(candidate_ids, counts),
+            {
+                'from': lane.address,
+                'nonce': nonce,
+                'gas': gas_limit,
+                **fees,
+                'chainId': CHAIN_ID
+            }
+        ))
+        logger.info(f"📦 Batch of {len(jobs)} votes sent! Hash: {tx_hash}")
+        for job in jobs:
+            vote_queue.update(job["id"], stage="confirming", vote_tx_hash=tx_hash)
+
+        receipt = receipt_watcher.wait(tx_hash, timeout=300)
+        if receipt.status != 1:
+            raise RuntimeError("Batch transaction reverted on chain")
+
+        for job in jobs:
+            vote_queue.complete(job["id"], tx_hash)
+        logger.info(f"📝 Batch Confirmed: {dict(tally)}")
+
+    except Exception as e:
+        # ❌ Whole batch failed -> every student in it may retry
+        logger.error(f"❌ Vote batch failed: {e}")
+        for job in jobs:
+            vote_queue.fail(job["id"], e)
+            rollback_vote_job(job)
+
+vote_batcher = VoteBatcher(flush_vote_batch, max_votes=VOTE_BATCH_SIZE, max_wait_ms=VOTE_BATCH_WAIT_MS,
+                           flush_workers=max(2, len(relayer_lanes)))
+
+def process_vote_job(job):
+    """Background pipeline: submit the vote (funded or relayed), wait for confirmation."""
+    job_id = job["id"]
+    student_id = job["student_id"]
+    candidate_ids = job_choices(job)
+
+    try:
+        if job.get("vote_tx_hash"):
+            # ♻️ RESUME: A previous worker already signed (and maybe sent) the vote, just wait for it
+            logger.info(f"♻️ Resuming job {job_id} at confirmation stage")
+            tx_hash_vote = job["vote_tx_hash"]
+            if job.get("vote_raw_tx"):
+                rebroadcast_vote(job)
+        else:
+            logger.info(f"🗳️  Processing vote for Candidate(s) {candidate_ids} by {student_id}...")
+
+            if VOTE_MODE == "batched":
+                # 📦 The batcher sends and confirms it together with other ballots
+                vote_queue.update(job_id, stage="batched")
+                vote_batcher.add(job)
+                return
+
+            # ⛽ Fees come from the background oracle: no RPC here
+            fees = fee_oracle.fees()
+
+            if VOTE_MODE == "relayed":
+                vote_queue.update(job_id, stage="voting")
+                if job.get("candidate_ids"):
+                    tx_hash_vote = relay_signed_ballot(candidate_ids, fees, persist_signed_vote(job_id))
+                else:
+                    tx_hash_vote = relay_signed_vote(job["candidate_id"], fees, persist_signed_vote(job_id))
+            else:
+                tx_hash_vote = cast_funded_vote(job, fees)
+
+            logger.info(f"✅ Vote Cast on Blockchain! Hash: {tx_hash_vote}")
+            vote_queue.update(job_id, stage="confirming", vote_tx_hash=tx_hash_vote)
+
+        # Wait for vote receipt (TIMEOUT 300s)
+        receipt = receipt_watcher.wait(tx_hash_vote, timeout=300)
+
+        if receipt.status == 1:
+            # ✅ SUCCESS! (User is already marked voted, so we just record the hash)
+            logger.info(f"📝 Vote Confirmed for {student_id}")
+            vote_queue.complete(job_id, tx_hash_vote)
+        else:
+            # ❌ REVERTED ON CHAIN -> ROLLBACK
+            logger.error("Transaction reverted on chain")
+            vote_queue.fail(job_id, "Transaction reverted on chain")
+            rollback_vote_job(job)
+
+    except Exception as e:
+        # ❌ BLOCKCHAIN ERROR -> ROLLBACK
+        logger.error(f"❌ Blockchain failure in job {job_id}: {e}")
+        vote_queue.fail(job_id, e)
+        rollback_vote_job(job) # Unlock user so they can try again
+
+# ==========================================================
+# 📒 OFF-CHAIN LEDGER MODE (Merkle roots anchored on chain)
+# ==========================================================
+ballot_ledger = BallotLedger(DB_PATH)
+
+def anchor_ledger_root(root_hex, count, replace=None):
+    """Sends anchorRoot(root, count) from a relayer lane. Returns {hash, from, nonce, fees}.
+
+    `replace` (an earlier return value) re-sends it from the same lane at the same
+    nonce with bumped fees, so a dropped anchor can never be mined twice.
+    """
+    fees = fee_oracle.fees()
+    def build(lane, nonce, fees):
+        return _build_tx(
+            contract.functions.anchorRoot(bytes.fromhex(root_hex[2:]), count),
+            {
+                'from': lane.address,
+                'nonce': nonce,
+                'gas': 100000,
+                **fees,
+                'chainId': CHAIN_ID
+            }
+        )
+
+    if replace is None:
+        sent = {"fees": fees}
+        def build_new(lane, nonce):
+            sent.update({"from": lane.address, "nonce": nonce})
+            return build(lane, nonce, fees)
+        sent["hash"] = relay_transaction(build_new)
+        return sent
+
+    fees = bump_fees(replace["fees"], fees)
+    with relayer.lane(replace["from"]) as lane:
+        signed_tx = w3.eth.account.sign_transaction(build(lane, replace["nonce"], fees), lane.account.key)
+        return {"hash": _send_signed(signed_tx), "from": lane.address, "nonce": replace["nonce"], "fees": fees}
+
+ledger_anchorer = LedgerAnchorer(
+    ballot_ledger, anchor_ledger_root,
+    lambda tx_hash, timeout: receipt_watcher.wait(tx_hash, timeout=timeout),
+    chain.get_receipts,
+    batch_size=LEDGER_BATCH_SIZE, interval=LEDGER_ANCHOR_INTERVAL,
+    resend_after=LEDGER_ANCHOR_RESEND_AFTER
+)
+
 @app.route("/submit_vote", methods=["POST"])
 @limiter.limit("5 per minute")
 def submit_vote():
@@ -738,119 +1556,173 @@ def submit_vote():
     except ValueError:
         return jsonify({"status": "error", "message": "Invalid Candidate Selection"}), 400
 
-    # 🛑 SECURITY CHECK: Did this student already vote?
+    # 🛑 SECURITY CHECK: Did this student already vote (for this position)?
     student_id = session["student_id"]
-    
-    # Check the file strictly before doing anything else
-    if has_user_voted(student_id):
+    return accept_ballot(student_id, [candidate_id], [cand["position"]])
+
+@app.route("/submit_ballot", methods=["POST"])
+@limiter.limit("5 per minute")
+def submit_ballot():
+    """Full ballot: one candidate per position, recorded in ONE contract call."""
+    if "user_id" not in session:
+        return jsonify({"status": "error", "message": "Unauthorized"}), 401
+
+    # 🛑 CHECK: Is voting currently allowed?
+    allowed, reason = is_voting_allowed()
+    if not allowed:
+        logger.warning(f"Ballot blocked for {session.get('student_id')}: {reason}")
+        return jsonify({"status": "error", "message": reason}), 403
+
+    # 🛑 SECURITY: Input Validation
+    data = request.get_json()
+    if not data or not isinstance(data.get("candidateIds"), list) or not data["candidateIds"]:
+        return jsonify({"status": "error", "message": "Invalid Data"}), 400
+
+    try:
+        candidate_ids = [int(cid) for cid in data["candidateIds"]]
+        if len(set(candidate_ids)) != len(candidate_ids):
+            raise ValueError("Duplicate candidate")
+
+        # One query validates every choice: all must be active, at most one per position
+        cands = get_ballot_candidates(candidate_ids)
+        positions = [c["position"] for c in cands]
+        if len(cands) != len(candidate_ids) or len(set(positions)) != len(positions):
+            raise ValueError("Invalid ballot")
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "Invalid Ballot: pick one active candidate per position"}), 400
+
+    # Keep the same order as the candidate IDs so the contract call is deterministic
+    position_of = {c["id"]: c["position"] for c in cands}
+    return accept_ballot(session["student_id"], candidate_ids, [position_of[cid] for cid in candidate_ids])
+
+def accept_ballot(student_id, candidate_ids, positions):
+    """Locks the positions for the student, then records the choices (ledger) or queues the blockchain job."""
+    # Check the DB strictly before doing anything else
+    if has_user_voted(student_id, positions):
         logger.warning(f"🚫 BLOCKED REQUEST: {student_id} tried to vote again.")
         return jsonify({"status": "error", "message": "You have already voted!"}), 400
 
-    if not ADMIN_PRIVATE_KEY or "PASTE" in ADMIN_PRIVATE_KEY:
+    if not relayer.lanes:
          return jsonify({"status": "error", "message": "Server Config Error: Admin Key missing"}), 500
 
-    # data = request.get_json()  <-- REMOVED (Duplicate)
-    # candidate_id = int(data.get("candidateId")) <-- REMOVED (Moved up)
-    
+    # A single choice keeps using vote()/voteFor() so older deployments still work
+    ballot = candidate_ids if len(candidate_ids) > 1 else None
+
     try:
-        logger.info(f"🗳️  Processing vote for Candidate {candidate_id} by {student_id}...")
+        eid = get_current_election_id()
 
         # 🔒 OPTIMISTIC LOCKING: Mark as voted FIRST to prevent race conditions
-        if not mark_user_as_voted(student_id):
+        if not mark_user_as_voted(student_id, positions):
             return jsonify({"status": "error", "message": "You have already voted!"}), 400
 
-        # 1. Create a FRESH temporary wallet
-        temp_account = w3.eth.account.create()
-        logger.info(f"👤 Created Temp Voter: {temp_account.address}")
-        
-        try: 
-            # 🔒 CRITICAL SECTION: Only one thread can use Admin Nonce at a time
-            with NONCE_LOCK:
-                # 2. Fund the Temp Wallet
-                nonce = w3.eth.get_transaction_count(ADMIN_ADDRESS)
-                
-                # 🔥 BOOST: Pay 50% more gas to be faster
-                current_gas_price = w3.eth.gas_price
-                boosted_gas_price = int(current_gas_price * 1.5) 
-
-                # Calculate amount manually: 0.005 ETH = 0.005 * 10^18 Wei
-                amount_in_wei = int(0.005 * 10**18)
-
-                fund_tx = {
-                    'to': temp_account.address,
-                    'value': amount_in_wei, 
-                    'gas': 21000,
-                    'gasPrice': boosted_gas_price,
-                    'nonce': nonce,
-                    'chainId': 11155111
-                }
-                signed_fund_tx = w3.eth.account.sign_transaction(fund_tx, ADMIN_PRIVATE_KEY)
-                
-                # FIX: Try camelCase, if fail try snake_case (Universal fix)
-                try:
-                    tx_hash_fund = w3.eth.send_raw_transaction(signed_fund_tx.rawTransaction)
-                except AttributeError:
-                    tx_hash_fund = w3.eth.send_raw_transaction(signed_fund_tx.raw_transaction)
-
-            logger.info(f"💸 Funding Temp Wallet... (Tx: {tx_hash_fund.hex()})")
-            
-            # Wait for funding (TIMEOUT 300s)
-            w3.eth.wait_for_transaction_receipt(tx_hash_fund, timeout=300)
-
-            # 3. Cast the Vote
-            contract_function = contract.functions.vote(candidate_id)
-            
-            tx_params = {
-                'from': temp_account.address,
-                'nonce': 0, 
-                'gas': 300000,
-                'gasPrice': boosted_gas_price,
-                'chainId': 11155111
-            }
-
-            # 🛠️ UNIVERSAL BUILD TRANSACTION FIX
+        if VOTE_MODE == "ledger":
+            # 📒 Append to the local ledger; the anchorer puts the batch root on chain later
             try:
-                built_vote_tx = contract_function.build_transaction(tx_params)
-            except AttributeError:
-                built_vote_tx = contract_function.buildTransaction(tx_params)
-            
-            signed_vote_tx = w3.eth.account.sign_transaction(built_vote_tx, temp_account.key)
-            
-            try:
-                tx_hash_vote = w3.eth.send_raw_transaction(signed_vote_tx.rawTransaction)
-            except AttributeError:
-                tx_hash_vote = w3.eth.send_raw_transaction(signed_vote_tx.raw_transaction)
-            
-            logger.info(f"✅ Vote Cast on Blockchain! Hash: {tx_hash_vote.hex()}")
-
-            # Wait for vote receipt (TIMEOUT 300s)
-            receipt = w3.eth.wait_for_transaction_receipt(tx_hash_vote, timeout=300)
-
-            if receipt.status == 1:
-                # ✅ SUCCESS! (User is already marked voted, so we just return)
-                logger.info(f"📝 Vote Confirmed for {student_id}")
-                
-                # Ensure hash has 0x prefix for Etherscan compatibility
-                tx_hash_str = tx_hash_vote.hex() if isinstance(tx_hash_vote.hex(), str) else str(tx_hash_vote.hex())
-                if not tx_hash_str.startswith('0x'):
-                    tx_hash_str = '0x' + tx_hash_str
-                return jsonify({"status": "success", "tx_hash": tx_hash_str})
-            else:
-                # ❌ REVERTED ON CHAIN -> ROLLBACK
-                logger.error("Transaction reverted on chain")
-                unmark_user_as_voted(student_id)
-                return jsonify({"status": "error", "message": "Transaction reverted on chain"}), 500
+                receipts = ballot_ledger.append_ballot(eid, candidate_ids)
+            except Exception:
+                unmark_user_as_voted(student_id, eid, positions=positions)
+                raise
+            logger.info(f"📒 Ledger ballot #{receipts[0]['seq']} recorded for Election #{eid}")
+            return jsonify({
+                "status": "success",
+                "receipt": receipts[0],
+                "receipts": receipts,
+                "proof_url": f"/ledger/proof/{receipts[0]['leaf']}"
+            })
+
+        # 📬 Hand the blockchain work to the background workers
+        try:
+            job_id = vote_queue.enqueue(student_id, eid, candidate_ids[0], candidate_ids=ballot)
+        except Exception:
+            unmark_user_as_voted(student_id, eid, positions=positions)
+            raise
 
-        except Exception as inner_e:
-            # ❌ BLOCKCHAIN ERROR -> ROLLBACK
-            logger.error(f"Blockchain failure: {inner_e}")
-            unmark_user_as_voted(student_id) # Unlock user so they can try again
-            raise inner_e
+        logger.info(f"📬 Queued vote job {job_id} for {student_id}")
+        return jsonify({"status": "queued", "job_id": job_id, "status_url": f"/vote_status/{job_id}"}), 202
 
     except Exception as e:
-        logger.error(f"❌ Blockchain Error: {e}")
+        logger.error(f"❌ Vote Queue Error: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route("/vote_status/<job_id>")
+@limiter.exempt
+def vote_status(job_id):
+    """Progress of a queued vote (polled by vote.js)."""
+    if "user_id" not in session:
+        return jsonify({"status": "error", "message": "Unauthorized"}), 401
+
+    job = vote_queue.get(job_id)
+    # Students may only see their own jobs
+    if not job or job["student_id"] != session.get("student_id"):
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+
+    return jsonify({
+        "status": "success",
+        "job_id": job_id,
+        "state": job["status"],
+        "stage": job["stage"],
+        "done": job["status"] in FINAL_STATUSES,
+        "tx_hash": job["vote_tx_hash"],
+        "message": job["error"]
+    })
+
+@app.route("/ledger/proof/<leaf_hash>")
+def ledger_proof(leaf_hash):
+    """Merkle inclusion proof for a ledger receipt (verify against Election.anchoredAt(root))."""
+    if "user_id" not in session:
+        return jsonify({"status": "error", "message": "Unauthorized"}), 401
+
+    proof = ballot_ledger.proof(leaf_hash.lower())
+    if not proof:
+        return jsonify({"status": "error", "message": "Unknown receipt"}), 404
+    return jsonify({"status": "success", "contract": CONTRACT_ADDRESS, **proof})
+
+@app.route("/api/ledger/tally")
+def api_ledger_tally():
+    """Per-candidate counts from the local ledger for the CURRENT election."""
+    eid = get_current_election_id()
+    return jsonify({"election_id": eid, "votes": ballot_ledger.tally(eid)})
+
+# 🔁 Keep the wallet pool topped up (only the worker holding the lease funds wallets)
+wallet_pool_replenisher = WalletPoolReplenisher(wallet_pool, fund_address, get_wallet_pool_settings,
+                                                interval=WALLET_POOL_INTERVAL)
+if relayer.lanes and VOTE_WORKERS > 0:
+    relayer.start()
+    fee_oracle.start()
+    if VOTE_MODE == "funded":
+        wallet_pool_replenisher.start()
+    if VOTE_MODE == "batched":
+        vote_batcher.start()
+    if VOTE_MODE == "ledger":
+        ledger_anchorer.start()
+
+# 🧱 The first election starts at the deployment block (later ones get theirs at rollover)
+if CONTRACT_DEPLOY_BLOCK:
+    try:
+        conn = get_db_connection()
+        conn.execute(
+            """UPDATE election_settings SET start_block = ?
+               WHERE election_id = 1 AND start_block IS NULL
+               AND NOT EXISTS (SELECT 1 FROM election_offsets WHERE election_id = 1)""",
+            (int(CONTRACT_DEPLOY_BLOCK),)
+        )
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        logger.error(f"⚠️ Could not set the first election's start block: {e}")
+
+# 🔎 Follow Voted events into the local tally tables (only the lease holder writes)
+if CONTRACT_DEPLOY_BLOCK and VOTE_WORKERS > 0:
+    vote_indexer.start()
+
+# 🖼️ Resize pending candidate photos (only the lease holder works, the others just check)
+candidate_images.start()
+
+# 👷 Start background vote workers (one small pool per gunicorn worker)
+vote_workers = VoteWorkerPool(vote_queue, process_vote_job, workers=VOTE_WORKERS, on_failure=rollback_vote_job)
+if VOTE_WORKERS > 0:
+    vote_workers.start()
+
 if __name__ == "__main__":
     # Initialize DB on start
     from database_init import init_db
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import logging
+import threading
+from eth_abi import encode
+from eth_utils import keccak
+
+import db
+from leases import try_acquire_lease
+
+logger = logging.getLogger(__name__)
+
+BATCH_PENDING = "pending"
+BATCH_ANCHORED = "anchored"
+
+
+# ==========================================================
+# 🌳 MERKLE TREE (Sorted-pair keccak256, like OpenZeppelin MerkleProof)
+# ==========================================================
+def ballot_leaf(election_id, candidate_id, salt):
+    """Leaf hash for one ballot. `salt` is 32 random bytes known only to the voter's receipt."""
+    return keccak(encode(["uint256", "uint256", "bytes32"], [election_id, candidate_id, salt]))
+
+
+def _hash_pair(a, b):
+    return keccak(a + b) if a < b else keccak(b + a)
+
+
+def merkle_levels(leaves):
+    """All tree levels from the leaves up to the root (an odd node is promoted as-is)."""
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def merkle_root(leaves):
+    return merkle_levels(leaves)[-1][0]
+
+
+def merkle_proof(leaves, index):
+    """Sibling hashes needed to rebuild the root from leaves[index]."""
+    proof = []
+    for level in merkle_levels(leaves)[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(level[sibling])
+        index //= 2
+    return proof
+
+
+def verify_proof(leaf, proof, root):
+    """True if `proof` links `leaf` to `root`."""
+    node = leaf
+    for sibling in proof:
+        node = _hash_pair(node, sibling)
+    return node == root
+
+
+# ==========================================================
+# 📒 APPEND-ONLY BALLOT LEDGER
+# ==========================================================
+class BallotLedger:
+    """Ballots stored locally; only a Merkle root per batch goes on chain."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def _connect(self):
+        return db.connect(self.db_path)
+
+    def append(self, election_id, candidate_id):
+        """Records a ballot and returns the voter's receipt (leaf hash + salt)."""
+        return self.append_ballot(election_id, [candidate_id])[0]
+
+    def append_ballot(self, election_id, candidate_ids):
+        """Records every choice of a multi-position ballot in one transaction, one receipt per choice."""
+        receipts = []
+        conn = self._connect()
+        try:
+            for candidate_id in candidate_ids:
+                salt = os.urandom(32)
+                leaf = ballot_leaf(election_id, candidate_id, salt)
+                cur = conn.execute(
+                    "INSERT INTO ballot_ledger (election_id, candidate_id, salt, leaf_hash, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (election_id, candidate_id, "0x" + salt.hex(), "0x" + leaf.hex(), time.time())
+                )
+                receipts.append({"seq": cur.lastrowid, "leaf": "0x" + leaf.hex(), "salt": "0x" + salt.hex()})
+            conn.commit()
+        finally:
+            conn.close()
+        return receipts
+
+    def unanchored_count(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM ballot_ledger WHERE batch_id IS NULL").fetchone()[0]
+        finally:
+            conn.close()
+
+    def seal_batch(self, max_ballots):
+        """Groups the oldest unbatched ballots into a new batch and returns it (None if nothing to seal)."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT seq, leaf_hash FROM ballot_ledger WHERE batch_id IS NULL ORDER BY seq LIMIT ?",
+                (max_ballots,)
+            ).fetchall()
+            if not rows:
+                conn.rollback()
+                return None
+
+            root = merkle_root([bytes.fromhex(r["leaf_hash"][2:]) for r in rows])
+            first_seq, last_seq = rows[0]["seq"], rows[-1]["seq"]
+            cur = conn.execute(
+                """INSERT INTO ledger_batches (merkle_root, ballot_count, first_seq, last_seq, status, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                ("0x" + root.hex(), len(rows), first_seq, last_seq, BATCH_PENDING, time.time())
+            )
+            batch_id = cur.lastrowid
+            conn.execute(
+                "UPDATE ballot_ledger SET batch_id = ? WHERE batch_id IS NULL AND seq BETWEEN ? AND ?",
+                (batch_id, first_seq, last_seq)
+            )
+            conn.commit()
+            return {"id": batch_id, "merkle_root": "0x" + root.hex(), "ballot_count": len(rows)}
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def pending_batches(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM ledger_batches WHERE status = ? ORDER BY id", (BATCH_PENDING,)
+            ).fetchall()
+            return [dict(r) for r in rows]
+        finally:
+            conn.close()
+
+    def set_batch(self, batch_id, **fields):
+        assignments = ", ".join(f"{c} = ?" for c in fields)
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE ledger_batches SET {assignments} WHERE id = ?", list(fields.values()) + [batch_id])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def proof(self, leaf_hash):
+        """Inclusion proof for a receipt, or None if the leaf is unknown."""
+        conn = self._connect()
+        try:
+            ballot = conn.execute("SELECT * FROM ballot_ledger WHERE leaf_hash = ?", (leaf_hash,)).fetchone()
+            if ballot is None:
+                return None
+            result = {
+                "seq": ballot["seq"],
+                "election_id": ballot["election_id"],
+                "leaf": ballot["leaf_hash"],
+                "batch": None,
+            }
+            if ballot["batch_id"] is None:
+                return result  # Not sealed yet
+
+            batch = conn.execute("SELECT * FROM ledger_batches WHERE id = ?", (ballot["batch_id"],)).fetchone()
+            leaves = [
+                bytes.fromhex(r["leaf_hash"][2:]) for r in conn.execute(
+                    "SELECT leaf_hash FROM ballot_ledger WHERE batch_id = ? ORDER BY seq", (batch["id"],)
+                )
+            ]
+        finally:
+            conn.close()
+
+        index = leaves.index(bytes.fromhex(leaf_hash[2:]))
+        result["proof"] = ["0x" + p.hex() for p in merkle_proof(leaves, index)]
+        result["batch"] = {
+            "id": batch["id"],
+            "merkle_root": batch["merkle_root"],
+            "ballot_count": batch["ballot_count"],
+            "status": batch["status"],
+            "anchor_tx_hash": batch["anchor_tx_hash"],
+        }
+        return result
+
+    def tally(self, election_id):
+        """Vote counts per candidate ID for an election."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT candidate_id, COUNT(*) AS n FROM ballot_ledger WHERE election_id = ? GROUP BY candidate_id",
+                (election_id,)
+            ).fetchall()
+            return {r["candidate_id"]: r["n"] for r in rows}
+        finally:
+            conn.close()
+
+
+# ==========================================================
+# ⚓ BACKGROUND ANCHORER
+# ==========================================================
+class LedgerAnchorer:
+    """Seals ballots into batches and anchors each batch root on chain (one worker at a time).
+
+    An anchor transaction that is still not mined after `resend_after` seconds
+    (dropped from the mempool, or priced out) is re-sent at the same nonce with
+    bumped fees; a receipt for ANY of the hashes sent for a batch settles it.
+    """
+
+    LEASE_NAME = "ballot_ledger_anchorer"
+
+    def __init__(self, ledger, anchor, wait_for_receipt, get_receipts, batch_size=1000, interval=30.0,
+                 resend_after=180.0):
+        self.ledger = ledger
+        # anchor(root_hex, count, replace=None) -> {"hash", "from", "nonce", "fees"}
+        self.anchor = anchor
+        self.wait_for_receipt = wait_for_receipt  # wait_for_receipt(tx_hash, timeout) -> receipt (raises on timeout)
+        self.get_receipts = get_receipts          # get_receipts(tx_hashes) -> [receipt or None, ...]
+        self.batch_size = batch_size
+        self.interval = interval
+        self.resend_after = resend_after
+        self._last_seal = time.monotonic()
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="ledger-anchorer", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"⚠️ Ledger anchoring failed: {e}")
+            self._stop.wait(min(self.interval, 5.0))
+
+    def run_once(self):
+        if not try_acquire_lease(self.ledger.db_path, self.LEASE_NAME, ttl=self.interval * 4):
+            return
+
+        # Seal when a batch is full or the time window has passed
+        waiting = self.ledger.unanchored_count()
+        due = time.monotonic() - self._last_seal >= self.interval
+        while waiting and (waiting >= self.batch_size or due):
+            batch = self.ledger.seal_batch(self.batch_size)
+            if batch is None:
+                break
+            logger.info(f"🌳 Sealed ledger batch #{batch['id']}: {batch['ballot_count']} ballots, root {batch['merkle_root']}")
+            waiting -= batch["ballot_count"]
+            self._last_seal = time.monotonic()
+
+        for batch in self.ledger.pending_batches():
+            self._anchor_batch(batch)
+
+    def _anchor_batch(self, batch):
+        sent = json.loads(batch["anchor_tx"]) if batch.get("anchor_tx") else None
+        if not batch["anchor_tx_hash"]:
+            sent = self.anchor(batch["merkle_root"], batch["ballot_count"])
+            sent.update(sent_at=time.time(), hashes=[sent["hash"]])
+            self.ledger.set_batch(batch["id"], anchor_tx_hash=sent["hash"], anchor_tx=json.dumps(sent))
+            logger.info(f"⚓ Anchoring batch #{batch['id']} (Tx: {sent['hash']})")
+        hashes = sent["hashes"] if sent else [batch["anchor_tx_hash"]]
+
+        # Short waits keep the lease renewed; the next cycle picks up where this one stopped
+        due = (sent["sent_at"] if sent else batch["created_at"]) + self.resend_after - time.time()
+        try:
+            receipt = self.wait_for_receipt(hashes[-1], timeout=max(1.0, min(due, self.interval * 2)))
+        except Exception:
+            # The latest hash is not mined, but an earlier one may have been
+            receipt = next((r for r in self.get_receipts(hashes) if r is not None), None)
+            if receipt is None:
+                if sent and due <= 0:
+                    self._resend(batch, sent)
+                return
+
+        if receipt.status == 1:
+            self.ledger.set_batch(batch["id"], status=BATCH_ANCHORED, anchored_at=time.time())
+            logger.info(f"✅ Batch #{batch['id']} anchored in block {receipt.blockNumber}")
+        else:
+            # Clear the hash so the next cycle sends a fresh anchor transaction
+            self.ledger.set_batch(batch["id"], anchor_tx_hash=None, anchor_tx=None)
+            logger.error(f"❌ Anchor transaction for batch #{batch['id']} reverted")
+
+    def _resend(self, batch, sent):
+        """Replaces a stuck anchor transaction (same lane and nonce, bumped fees)."""
+        try:
+            replacement = self.anchor(batch["merkle_root"], batch["ballot_count"], replace=sent)
+        except Exception as e:
+            if "nonce too low" not in str(e).lower():
+                raise
+            # The nonce is used: by one of our hashes (mined just now) or, if it was dropped, by another tx
+            if not any(r is not None for r in self.get_receipts(sent["hashes"])):
+                self.ledger.set_batch(batch["id"], anchor_tx_hash=None, anchor_tx=None)
+                logger.warning(f"⚠️ Anchor nonce of batch #{batch['id']} was reused, sending a fresh anchor")
+            return
+
+        sent.update(hash=replacement["hash"], fees=replacement["fees"], sent_at=time.time(),
+                    hashes=sent["hashes"] + [replacement["hash"]])
+        self.ledger.set_batch(batch["id"], anchor_tx_hash=sent["hash"], anchor_tx=json.dumps(sent))
+        logger.warning(f"🔁 Anchor of batch #{batch['id']} re-sent with bumped fees (Tx: {sent['hash']})")
@@ -0,0 +1,80 @@
+from eth_account import Account
+
+try:
+    from eth_account.messages import encode_typed_data
+except ImportError:  # eth-account < 0.10
+    from eth_account.messages import encode_structured_data as encode_typed_data
+
+
+# ==========================================================
+# ✍️ EIP-712 SIGNED BALLOTS (Must match Election.sol exactly)
+# ==========================================================
+DOMAIN_NAME = "Election"
+DOMAIN_VERSION = "1"
+
+EIP712_DOMAIN = [
+    {"name": "name", "type": "string"},
+    {"name": "version", "type": "string"},
+    {"name": "chainId", "type": "uint256"},
+    {"name": "verifyingContract", "type": "address"},
+]
+
+BALLOT_TYPE = [
+    {"name": "candidateId", "type": "uint256"},
+    {"name": "nonce", "type": "uint256"},
+]
+
+MULTI_BALLOT_TYPE = [
+    {"name": "candidateIds", "type": "uint256[]"},
+    {"name": "nonce", "type": "uint256"},
+]
+
+
+def ballot_typed_data(candidate_id, nonce, chain_id, contract_address):
+    """Typed data for Election.voteFor()."""
+    return {
+        "types": {"EIP712Domain": EIP712_DOMAIN, "Ballot": BALLOT_TYPE},
+        "primaryType": "Ballot",
+        "domain": {
+            "name": DOMAIN_NAME,
+            "version": DOMAIN_VERSION,
+            "chainId": chain_id,
+            "verifyingContract": contract_address,
+        },
+        "message": {"candidateId": candidate_id, "nonce": nonce},
+    }
+
+
+def multi_ballot_typed_data(candidate_ids, nonce, chain_id, contract_address):
+    """Typed data for Election.voteBallotFor() (one candidate per position)."""
+    typed_data = ballot_typed_data(0, nonce, chain_id, contract_address)
+    typed_data["types"] = {"EIP712Domain": EIP712_DOMAIN, "MultiBallot": MULTI_BALLOT_TYPE}
+    typed_data["primaryType"] = "MultiBallot"
+    typed_data["message"] = {"candidateIds": list(candidate_ids), "nonce": nonce}
+    return typed_data
+
+
+def _signable(typed_data):
+    try:
+        return encode_typed_data(full_message=typed_data)
+    except TypeError:  # encode_structured_data(primitive)
+        return encode_typed_data(typed_data)
+
+
+def _sign_typed_data(private_key, typed_data):
+    return bytes(Account.sign_message(_signable(typed_data), private_key).signature)
+
+
+def recover_typed_data_signer(typed_data, signature):
+    """Address that signed `typed_data` (what the contract's ecrecover sees)."""
+    return Account.recover_message(_signable(typed_data), signature=signature)
+
+
+def sign_ballot(private_key, candidate_id, nonce, chain_id, contract_address):
+    """Signs a ballot with an ephemeral key and returns the 65-byte signature."""
+    return _sign_typed_data(private_key, ballot_typed_data(candidate_id, nonce, chain_id, contract_address))
+
+
+def sign_multi_ballot(private_key, candidate_ids, nonce, chain_id, contract_address):
+    """Signs a full multi-position ballot and returns the 65-byte signature."""
+    return _sign_typed_data(private_key, multi_ballot_typed_data(candidate_ids, nonce, chain_id, contract_address))
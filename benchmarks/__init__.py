@@ -0,0 +1 @@
+"""Standalone performance benchmarks (run each one with `python -m benchmarks.<name>`)."""
@@ -0,0 +1,194 @@
+"""Local stand-in for Google's token-signing certs and Firebase's user lookup.
+
+    python -m benchmarks.auth_stub [--port 9099] [--project demo-election] [--max-age 3600]
+
+Serves, on one local port:
+
+    GET  /certs   the x509 certs JSON Google publishes (one self-signed RSA key)
+    POST /users   {"uids": [...]} -> {uid: {"valid_after", "disabled"}}, what
+                  FirebaseTokenVerifier expects from `lookup_users`
+    POST /token   {"uid", "email"} -> {"idToken": ...} signed with the stub key
+    POST /revoke  {"uid"} revokes every token issued to that user so far
+    POST /disable {"uid"} / POST /delete {"uid"}
+
+Point the app at it with FIREBASE_PROJECT_ID=<project>, FIREBASE_CERTS_URL=<url>/certs
+and FIREBASE_USERS_URL=<url>/users, and /login and /admin accept the stub's tokens
+without a Firebase project or network access.
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from google.auth import crypt, jwt
+
+logger = logging.getLogger(__name__)
+
+KEY_ID = "auth-stub-1"
+
+
+def _self_signed_key():
+    """(private key PEM, cert PEM) for a fresh RSA key valid for a week."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "auth-stub")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name)
+            .public_key(key.public_key()).serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=7))
+            .sign(key, hashes.SHA256()))
+    key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption()).decode()
+    return key_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+# ==========================================================
+# 🧪 AUTH STUB (Certs endpoint + user lookup + token minting)
+# ==========================================================
+class AuthStub:
+    """In-process auth backend; also usable directly (mint/revoke/lookup_users) from scripts."""
+
+    def __init__(self, project_id="demo-election", max_age=3600, key_id=KEY_ID):
+        self.project_id = project_id
+        self.max_age = max_age
+        self.key_id = key_id
+        key_pem, self.cert_pem = _self_signed_key()
+        self._signer = crypt.RSASigner.from_string(key_pem, key_id)
+        self._users = {}                # uid -> {"valid_after", "disabled"}
+        self._lock = threading.Lock()
+        self.hits = {"certs": 0, "users": 0}
+        self._server = None
+
+    # ---------------- TOKENS / USERS ----------------
+    def mint(self, uid, email=None, lifetime=3600, issued_at=None):
+        """Signed Firebase-style ID token for `uid` (the user is created if needed)."""
+        iat = int(time.time() if issued_at is None else issued_at)
+        with self._lock:
+            self._users.setdefault(uid, {"valid_after": 0, "disabled": False})
+        claims = {
+            "iss": f"https://securetoken.google.com/{self.project_id}",
+            "aud": self.project_id,
+            "sub": uid,
+            "iat": iat,
+            "exp": iat + lifetime,
+            "auth_time": iat,
+            "email": email or f"{uid}@example.com",
+        }
+        return jwt.encode(self._signer, claims).decode()
+
+    def revoke(self, uid):
+        with self._lock:
+            self._users.setdefault(uid, {"disabled": False})["valid_after"] = time.time() + 1
+
+    def disable(self, uid):
+        with self._lock:
+            self._users.setdefault(uid, {"valid_after": 0})["disabled"] = True
+
+    def delete(self, uid):
+        with self._lock:
+            self._users.pop(uid, None)
+
+    def lookup_users(self, uids):
+        """Same contract as token_verifier.firebase_user_states (unknown users are left out)."""
+        with self._lock:
+            self.hits["users"] += 1
+            return {uid: dict(self._users[uid]) for uid in uids if uid in self._users}
+
+    def certs(self):
+        with self._lock:
+            self.hits["certs"] += 1
+        return {self.key_id: self.cert_pem}
+
+    # ---------------- HTTP ----------------
+    def start(self, host="127.0.0.1", port=0):
+        """Serves the endpoints on a background thread. Returns the base URL."""
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        threading.Thread(target=self._server.serve_forever, name="auth-stub", daemon=True).start()
+        return self.url
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def _make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            logger.debug(fmt % args)
+
+        def _reply(self, payload, status=200, headers=()):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/certs":
+                return self._reply({"error": "not found"}, 404)
+            self._reply(stub.certs(), headers=[("Cache-Control", f"public, max-age={stub.max_age}")])
+
+        def do_POST(self):
+            try:
+                data = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            except ValueError:
+                return self._reply({"error": "invalid JSON"}, 400)
+
+            if self.path == "/users":
+                return self._reply(stub.lookup_users(data.get("uids") or []))
+            if self.path == "/token":
+                if not data.get("uid"):
+                    return self._reply({"error": "uid is required"}, 400)
+                return self._reply({"idToken": stub.mint(data["uid"], data.get("email"))})
+
+            actions = {"/revoke": stub.revoke, "/disable": stub.disable, "/delete": stub.delete}
+            if self.path not in actions:
+                return self._reply({"error": "not found"}, 404)
+            if not data.get("uid"):
+                return self._reply({"error": "uid is required"}, 400)
+            actions[self.path](data["uid"])
+            self._reply({"status": "ok"})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9099)
+    parser.add_argument("--project", default="demo-election", help="Firebase project ID the tokens are issued for")
+    parser.add_argument("--max-age", type=int, default=3600, help="Cache-Control max-age of /certs")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    stub = AuthStub(args.project, max_age=args.max_age)
+    url = stub.start(args.host, args.port)
+    logger.info(f"🧪 Auth stub listening on {url}. Start the app with:")
+    logger.info(f"   FIREBASE_PROJECT_ID={args.project} FIREBASE_CERTS_URL={url}/certs FIREBASE_USERS_URL={url}/users")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Micro-benchmarks for the SQLite gatekeeper and election helpers in app.py.
+
+    python -m benchmarks.bench_helpers [--votes 50000] [--elections 20] [--threads 1,8]
+                                       [--ops 2000] [--out FILE] [--compare OLD.json]
+
+Builds a synthetic database with database_init.init_db, imports app against it
+(no vote workers, dead RPC URL) and measures ops/s and p50/p99 latency for each
+helper, single-threaded and under N threads. Results are written as JSON
+(benchmarks/results/helpers-<commit>.json by default); --compare prints the
+change against an earlier run.
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database_init import init_db
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def build_database(path, votes, elections):
+    """init_db + `votes` rows spread evenly over `elections` elections (the last one is current)."""
+    init_db(path)
+    conn = sqlite3.connect(path)
+    per_election = max(1, votes // elections)
+    for eid in range(1, elections + 1):
+        conn.executemany(
+            "INSERT INTO votes (student_id, election_id) VALUES (?, ?)",
+            ((f"student{n:06d}", eid) for n in range(per_election))
+        )
+        conn.execute("INSERT OR IGNORE INTO election_settings (election_id, is_paused) VALUES (?, 0)", (eid,))
+    conn.execute("UPDATE system_config SET value = ? WHERE key = 'current_election_id'", (str(elections),))
+    conn.commit()
+    conn.close()
+    return per_election
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def measure(name, op, ops, threads):
+    """Runs `op(thread_no, i)` `ops` times spread over `threads` threads."""
+    latencies = [[] for _ in range(threads)]
+    per_thread = max(1, ops // threads)
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(n):
+        barrier.wait()
+        for i in range(per_thread):
+            started = time.perf_counter()
+            op(n, i)
+            latencies[n].append(time.perf_counter() - started)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    flat = [x for lane in latencies for x in lane]
+    return {
+        "helper": name,
+        "threads": threads,
+        "ops": len(flat),
+        "ops_per_s": round(len(flat) / elapsed, 1),
+        "p50_ms": round(percentile(flat, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(flat, 0.99) * 1000, 3),
+    }
+
+
+def helpers(app, per_election):
+    """(name, op) pairs; every op takes (thread_no, i)."""
+    rng = random.Random(42)
+    admin_clients = {}
+
+    def has_user_voted(n, i):
+        # Half existing voters, half students who haven't voted yet
+        app.has_user_voted(f"student{rng.randrange(per_election):06d}" if i % 2 else f"nobody{n}-{i}")
+
+    def mark_user_as_voted(n, i):
+        app.mark_user_as_voted(f"bench-{n}-{i}-{time.monotonic_ns()}")
+
+    def admin_dashboard(n, i):
+        client = admin_clients.get(n)
+        if client is None:
+            client = admin_clients[n] = app.app.test_client()
+            with client.session_transaction() as s:
+                s["is_admin"] = True
+        client.get("/admin/dashboard")
+
+    return [
+        ("has_user_voted", has_user_voted),
+        ("mark_user_as_voted", mark_user_as_voted),
+        ("get_all_candidates", lambda n, i: app.get_all_candidates()),
+        ("get_election_settings", lambda n, i: app.get_election_settings(app.get_current_election_id())),
+        ("is_voting_allowed", lambda n, i: app.is_voting_allowed()),
+        ("admin_dashboard", admin_dashboard),
+    ]
+
+
+def compare(results, old_path):
+    with open(old_path) as f:
+        old = {(r["helper"], r["threads"]): r for r in json.load(f)["results"]}
+    print(f"\nvs {old_path}")
+    for r in results:
+        before = old.get((r["helper"], r["threads"]))
+        if before:
+            change = (r["ops_per_s"] - before["ops_per_s"]) / before["ops_per_s"] * 100
+            print(f"{r['helper']:<24} x{r['threads']:<3} {before['ops_per_s']:>10.0f} -> {r['ops_per_s']:>10.0f} ops/s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--votes", type=int, default=50000)
+    parser.add_argument("--elections", type=int, default=20)
+    parser.add_argument("--threads", default="1,8", help="comma-separated thread counts")
+    parser.add_argument("--ops", type=int, default=2000, help="calls per helper and thread count")
+    parser.add_argument("--out", help="JSON results file")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+    thread_counts = [int(t) for t in args.threads.split(",")]
+
+    tmp = tempfile.mkdtemp(prefix="bench_helpers_")
+    db_path = os.path.join(tmp, "election.db")
+    per_election = build_database(db_path, args.votes, args.elections)
+
+    # app reads its configuration at import time
+    os.environ.update({"DB_PATH": db_path, "VOTE_WORKERS": "0", "RPC_URL": "http://127.0.0.1:1"})
+    import app
+    logging.disable(logging.WARNING)  # has_user_voted logs every blocked student
+
+    results = []
+    print(f"\n{args.votes} votes over {args.elections} elections, {args.ops} calls per row")
+    for name, op in helpers(app, per_election):
+        for threads in thread_counts:
+            r = measure(name, op, args.ops, threads)
+            results.append(r)
+            print(f"{name:<24} x{threads:<3} {r['ops_per_s']:>10.0f} ops/s   p50 {r['p50_ms']:>8.3f}ms   p99 {r['p99_ms']:>8.3f}ms")
+
+    commit = git_commit()
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"helpers-{commit}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({
+            "meta": {
+                "commit": commit,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "votes": args.votes,
+                "elections": args.elections,
+                "ops": args.ops,
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\n📄 Results written to {out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""RPC provider benchmark: one HTTPProvider vs PooledHTTPProvider against local stand-in nodes.
+
+    python -m benchmarks.bench_rpc_pool [--requests 400] [--threads 8]
+
+Three stand-in JSON-RPC servers with injected latency: a fast one, a slow one and a
+flaky one (random stalls and HTTP 503s, like a rate-limited public node). The single
+provider talks to the flaky node only; the pool gets all three plus a dead URL.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eth_account import Account
+from eth_utils import keccak
+from web3 import Web3
+
+from rpc_pool import PooledHTTPProvider
+
+
+class StandInNode:
+    """Minimal JSON-RPC node: eth_chainId, eth_blockNumber, eth_call, eth_sendRawTransaction."""
+
+    def __init__(self, name, latency, stall_rate=0.0, stall=0.0, error_rate=0.0):
+        self.name = name
+        self.latency = latency
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.error_rate = error_rate
+        self.hits = 0
+        self.sends = set()
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status, answer = node.answer(body)
+                data = json.dumps(answer).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def answer(self, body):
+        self.hits += 1
+        time.sleep(self.stall if random.random() < self.stall_rate else self.latency)
+        if random.random() < self.error_rate:
+            return 503, {"error": "overloaded"}
+        calls = body if isinstance(body, list) else [body]
+        out = [self._result(call) for call in calls]
+        return 200, out if isinstance(body, list) else out[0]
+
+    def _result(self, call):
+        method = call["method"]
+        if method == "eth_sendRawTransaction":
+            tx_hash = "0x" + keccak(hexstr=call["params"][0]).hex()
+            if tx_hash in self.sends:
+                return {"jsonrpc": "2.0", "id": call["id"], "error": {"code": -32000, "message": "already known"}}
+            self.sends.add(tx_hash)
+            return {"jsonrpc": "2.0", "id": call["id"], "result": tx_hash}
+        result = {"eth_chainId": "0xaa36a7", "eth_blockNumber": "0x100"}.get(method, "0x" + "00" * 31 + "2a")
+        return {"jsonrpc": "2.0", "id": call["id"], "result": result}
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def run_reads(label, w3, requests, threads):
+    latencies, failures = [], 0
+
+    def one(_):
+        started = time.monotonic()
+        try:
+            w3.eth.call({"to": "0x585a1801372e73BabAf4144D306bAF80A7496ae9", "data": "0x"})
+            return time.monotonic() - started
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(threads) as pool:
+        for elapsed in pool.map(one, range(requests)):
+            if elapsed is None:
+                failures += 1
+            else:
+                latencies.append(elapsed)
+
+    ms = lambda s: f"{s * 1000:7.0f}ms"
+    print(f"{label:<26} p50 {ms(percentile(latencies, 0.5))}  p95 {ms(percentile(latencies, 0.95))}"
+          f"  p99 {ms(percentile(latencies, 0.99))}  max {ms(max(latencies))}  failed {failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    random.seed(7)
+
+    fast = StandInNode("fast", latency=0.02)
+    slow = StandInNode("slow", latency=0.15)
+    flaky = StandInNode("flaky", latency=0.03, stall_rate=0.1, stall=1.5, error_rate=0.1)
+    dead = "http://127.0.0.1:1"
+
+    print(f"\n{args.requests} eth_call reads, {args.threads} threads")
+    single = Web3(Web3.HTTPProvider(flaky.url, request_kwargs={"timeout": 60}))
+    run_reads("single (flaky node)", single, args.requests, args.threads)
+
+    pooled = Web3(PooledHTTPProvider([flaky.url, slow.url, fast.url, dead], hedge_max=0.5))
+    run_reads("pool (flaky+slow+fast+dead)", pooled, args.requests, args.threads)
+    for status in pooled.provider.status():
+        print(f"   {status}")
+
+    # Broadcast: one signed transaction reaches several nodes, the hash comes back once
+    account = Account.create()
+    signed = account.sign_transaction({"to": account.address, "value": 0, "gas": 21000, "gasPrice": 1,
+                                       "nonce": 0, "chainId": 11155111})
+    raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+    tx_hash = pooled.eth.send_raw_transaction(raw)
+    time.sleep(2)  # Let the slower nodes finish receiving it
+    reached = [n.name for n in (fast, slow, flaky) if n.sends]
+    print(f"\nbroadcast {tx_hash.hex()[:18]}... reached {reached}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""SQLite access benchmark: connect-per-call (old get_db_connection) vs pooled WAL (db.connect).
+
+    python -m benchmarks.bench_sqlite [--threads 8] [--seconds 3]
+
+Every thread alternates between the vote gate read (has_user_voted) and the
+vote write (mark_user_as_voted) against a temporary database.
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from database_init import init_db
+
+
+def connect_per_call(db_path):
+    """What get_db_connection() used to do: a brand new rollback-journal connection."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def has_user_voted(connect, db_path, student_id):
+    conn = connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT 1 FROM votes WHERE student_id = ? AND election_id = ?", (student_id, 1)
+        ).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def mark_user_as_voted(connect, db_path, student_id):
+    conn = connect(db_path)
+    try:
+        conn.execute("INSERT INTO votes (student_id, election_id) VALUES (?, ?)", (student_id, 1))
+        conn.commit()
+        return True
+    except sqlite3.OperationalError:
+        return False  # "database is locked"
+    finally:
+        conn.close()
+
+
+def run(label, connect, db_path, threads, seconds):
+    reads = [0] * threads
+    writes = [0] * threads
+    failures = [0] * threads
+    stop = time.monotonic() + seconds
+
+    def worker(n):
+        i = 0
+        while time.monotonic() < stop:
+            student = f"{label}-{n}-{i}"
+            has_user_voted(connect, db_path, student)
+            reads[n] += 1
+            if mark_user_as_voted(connect, db_path, student):
+                writes[n] += 1
+            else:
+                failures[n] += 1
+            i += 1
+        db.close_thread_connections()
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    print(f"{label:<18} {sum(reads) / seconds:>10.0f} reads/s {sum(writes) / seconds:>10.0f} writes/s"
+          f" {sum(failures):>6} locked")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        pooled_path = os.path.join(tmp, "pooled.db")
+        init_db(legacy_path)
+        init_db(pooled_path)
+        # init_db switches new databases to WAL; put the legacy one back to the old default
+        conn = sqlite3.connect(legacy_path)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+
+        print(f"\n{args.threads} threads, {args.seconds:.0f}s each")
+        run("connect-per-call", connect_per_call, legacy_path, args.threads, args.seconds)
+        run("pooled WAL", db.connect, pooled_path, args.threads, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+"""End-to-end election load generator: synthetic students against `app:app` under gunicorn.
+
+    python -m benchmarks.loadgen [--rate 5] [--duration 60] [--workers 4] [--threads 8]
+                                 [--vote-mode relayed] [--lanes 2] [--block-time 12]
+                                 [--latency-ms 50] [--failure-rate 0] [--out FILE]
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --secret S [--db election.db]
+
+By default everything runs offline on this box: a simulated chain
+(`python -m sim_chain`) with funded relayer lanes, and gunicorn serving app:app
+against a fresh database, both on free local ports. Students arrive as a Poisson
+process at --rate per second. Each one logs in through the LOAD_TEST_SECRET hook,
+opens /vote, posts /submit_vote, polls /vote_status until the vote is confirmed and
+loads /results and /api/results. Every student gets its own 127.x.y.z source address,
+so per-IP rate limits behave as they would for real students.
+
+The report covers throughput (accepted and confirmed votes per minute), latency
+percentiles per route, error and rate-limit counts, and DB lock contention: a
+probe times `BEGIN IMMEDIATE` on the database while the load runs, and the server
+log is searched for lock errors. JSON goes to benchmarks/results/loadgen-<commit>.json.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import sqlite3
+import secrets
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+from collections import defaultdict, Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from eth_account import Account
+
+from database_init import init_db
+from benchmarks.bench_helpers import git_commit, percentile
+
+# Server log lines that point at SQLite contention or failed writes
+LOCK_PATTERNS = ("database is locked", "CRITICAL DATABASE ERROR", "Database Read Error")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def source_ip(n):
+    """Distinct loopback address per student (all of 127.0.0.0/8 is local on Linux)."""
+    return f"127.{10 + (n // (254 * 256)) % 240}.{(n // 254) % 256}.{n % 254 + 1}"
+
+
+# ==========================================================
+# 📈 RECORDER (Per-route latencies and outcomes)
+# ==========================================================
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+        self.confirm_latencies = []
+        self.start_lags = []
+        self.votes = Counter()
+        self.first_submit = None
+        self.last_confirm = None
+        self._lock = threading.Lock()
+
+    def request(self, route, elapsed, status):
+        if status is None:
+            outcome = "error"
+        elif status == 429:
+            outcome = "rate_limited"
+        elif status >= 500:
+            outcome = "5xx"
+        elif status >= 400:
+            outcome = "4xx"
+        else:
+            outcome = "ok"
+        with self._lock:
+            self.latencies[route].append(elapsed)
+            self.outcomes[route][outcome] += 1
+
+    def vote(self, outcome, confirm_latency=None):
+        with self._lock:
+            self.votes[outcome] += 1
+            now = time.monotonic()
+            if outcome == "accepted" and self.first_submit is None:
+                self.first_submit = now
+            if confirm_latency is not None:
+                self.confirm_latencies.append(confirm_latency)
+                self.last_confirm = now
+
+    def lag(self, seconds):
+        with self._lock:
+            self.start_lags.append(seconds)
+
+
+# ==========================================================
+# 🎓 SYNTHETIC STUDENT (One keep-alive connection, one session cookie)
+# ==========================================================
+class Student:
+    def __init__(self, n, host, port, secret, recorder, spread_ips=True, timeout=60):
+        self.n = n
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.recorder = recorder
+        self.source = (source_ip(n), 0) if spread_ips else None
+        self.timeout = timeout
+        self.cookie = None
+        self.conn = None
+
+    def _connect(self):
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout,
+                                               source_address=self.source)
+
+    def request(self, method, path, route, body=None, headers=None):
+        """Returns (status, parsed JSON or None); transport failures count as errors."""
+        headers = dict(headers or {})
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+
+        started = time.monotonic()
+        for attempt in (1, 2):
+            try:
+                if self.conn is None:
+                    self._connect()
+                self.conn.request(method, path, body=data, headers=headers)
+                response = self.conn.getresponse()
+                payload = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Server closed the idle keep-alive connection -> reconnect once
+                self.close()
+                if attempt == 2:
+                    self.recorder.request(route, time.monotonic() - started, None)
+                    return None, None
+            except Exception:
+                self.close()
+                self.recorder.request(route, time.monotonic() - started, None)
+                return None, None
+        self.recorder.request(route, time.monotonic() - started, response.status)
+
+        for header in response.headers.get_all("Set-Cookie") or []:
+            if header.startswith("session="):
+                self.cookie = header.split(";", 1)[0]
+        if "json" in (response.getheader("Content-Type") or ""):
+            try:
+                return response.status, json.loads(payload)
+            except ValueError:
+                pass
+        return response.status, None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def run(self, candidate_ids, poll_interval, confirm_timeout):
+        try:
+            email = f"loadtest{self.n:06d}@rvce.edu.in"
+            status, _ = self.request("POST", "/login", "/login", {"email": email},
+                                     {"X-Load-Test-Secret": self.secret})
+            if status != 200:
+                self.recorder.vote("login_failed")
+                return
+
+            self.request("GET", "/vote", "/vote")
+            status, body = self.request("POST", "/submit_vote", "/submit_vote",
+                                        {"candidateId": random.choice(candidate_ids)})
+            submitted = time.monotonic()
+            if status == 429:
+                self.recorder.vote("rate_limited")
+            elif status not in (200, 202) or not body:
+                self.recorder.vote("rejected")
+            else:
+                self.recorder.vote("accepted")
+                self._wait_confirmed(body, submitted, poll_interval, confirm_timeout)
+
+            self.request("GET", "/results", "/results")
+            self.request("GET", "/api/results", "/api/results")
+        finally:
+            self.close()
+
+    def _wait_confirmed(self, body, submitted, poll_interval, confirm_timeout):
+        status_url = body.get("status_url")
+        if not status_url:
+            # Ledger mode answers synchronously
+            self.recorder.vote("confirmed", time.monotonic() - submitted)
+            return
+        while time.monotonic() - submitted < confirm_timeout:
+            time.sleep(poll_interval)
+            _, job = self.request("GET", status_url, "/vote_status")
+            if job and job.get("done"):
+                if job.get("state") == "confirmed":
+                    self.recorder.vote("confirmed", time.monotonic() - submitted)
+                else:
+                    self.recorder.vote("failed_on_chain")
+                return
+        self.recorder.vote("confirm_timeout")
+
+
+# ==========================================================
+# 🔒 DB LOCK PROBE (How long a writer waits for the SQLite write lock)
+# ==========================================================
+class LockProbe:
+    def __init__(self, db_path, interval=0.25):
+        self.db_path = db_path
+        self.interval = interval
+        self.waits = []
+        self.timeouts = 0
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="lock-probe", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        while not self._stop.wait(self.interval):
+            started = time.monotonic()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                self.waits.append(time.monotonic() - started)
+                conn.execute("ROLLBACK")
+            except sqlite3.OperationalError:
+                self.timeouts += 1
+        conn.close()
+
+
+# ==========================================================
+# 🚀 OFFLINE STACK (Simulated chain + gunicorn)
+# ==========================================================
+class Stack:
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.db_path = os.path.join(workdir, "election.db")
+        self.log_path = os.path.join(workdir, "gunicorn.log")
+        self.secret = secrets.token_hex(16)
+        self.port = free_port()
+        self.processes = []
+
+    def start(self):
+        init_db(self.db_path)   # Once, before the workers race to verify tables
+        keys = [Account.create() for _ in range(self.args.lanes)]
+        chain_port = free_port()
+        self._spawn([sys.executable, "-m", "sim_chain", "--port", str(chain_port),
+                     "--block-time", str(self.args.block_time), "--latency-ms", str(self.args.latency_ms),
+                     "--failure-rate", str(self.args.failure_rate),
+                     "--accounts", ",".join(k.address for k in keys)],
+                    os.path.join(self.workdir, "sim_chain.log"))
+
+        env = dict(os.environ,
+                   DB_PATH=self.db_path,
+                   RPC_URL=f"http://127.0.0.1:{chain_port}",
+                   CHAIN_BACKEND="web3",
+                   ADMIN_PRIVATE_KEYS=",".join("0x" + bytes(k.key).hex() for k in keys),
+                   LOAD_TEST_SECRET=self.secret,
+                   VOTE_MODE=self.args.vote_mode,
+                   VOTE_WORKERS=str(self.args.vote_workers),
+                   FIREBASE_PROJECT_ID="loadtest")
+        env.pop("RPC_URLS", None)
+        self._spawn([sys.executable, "-m", "gunicorn", "-w", str(self.args.workers), "--threads", str(self.args.threads),
+                     "-b", f"127.0.0.1:{self.port}", "--timeout", "120", "app:app"],
+                    self.log_path, env)
+        self._wait_ready()
+
+    def _spawn(self, cmd, log_path, env=None):
+        log = open(log_path, "w")
+        self.processes.append(subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT))
+
+    def _wait_ready(self, timeout=90):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for process in self.processes:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{process.args[2]} exited early, see {self.workdir}")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+                conn.request("GET", "/login")
+                if conn.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.5)
+        raise RuntimeError(f"gunicorn did not answer within {timeout}s, see {self.log_path}")
+
+    def stop(self):
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def active_candidates(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [r[0] for r in conn.execute("SELECT id FROM candidates WHERE active = 1")]
+    finally:
+        conn.close()
+
+
+def job_summary(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM vote_jobs GROUP BY status").fetchall())
+    finally:
+        conn.close()
+
+
+def log_matches(log_path):
+    counts = Counter()
+    if log_path and os.path.exists(log_path):
+        with open(log_path, errors="replace") as f:
+            for line in f:
+                for pattern in LOCK_PATTERNS:
+                    if pattern in line:
+                        counts[pattern] += 1
+    return dict(counts)
+
+
+# ==========================================================
+# 📊 LOAD + REPORT
+# ==========================================================
+def generate_load(host, port, secret, candidate_ids, args, recorder):
+    """Open-loop Poisson arrivals for `duration` seconds, then waits for every student to finish."""
+    pool = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="student")
+    rng = random.Random(args.seed)
+    started = time.monotonic()
+    next_arrival, n = started, 0
+
+    def arrive(n, scheduled):
+        recorder.lag(time.monotonic() - scheduled)
+        Student(n, host, port, secret, recorder, spread_ips=not args.same_ip).run(
+            candidate_ids, args.poll, args.confirm_timeout)
+
+    while True:
+        next_arrival += rng.expovariate(args.rate)
+        if next_arrival - started > args.duration:
+            break
+        time.sleep(max(0.0, next_arrival - time.monotonic()))
+        pool.submit(arrive, n, next_arrival)
+        n += 1
+    pool.shutdown(wait=True)
+    return n, time.monotonic() - started
+
+
+def route_rows(recorder):
+    rows = []
+    for route in sorted(recorder.latencies):
+        values = recorder.latencies[route]
+        rows.append({
+            "route": route,
+            "requests": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1),
+            **dict(recorder.outcomes[route]),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=5.0, help="new students per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of arrivals")
+    parser.add_argument("--concurrency", type=int, default=500, help="max students in flight")
+    parser.add_argument("--poll", type=float, default=2.0, help="seconds between /vote_status polls")
+    parser.add_argument("--confirm-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--same-ip", action="store_true", help="don't spread students over 127.x.y.z")
+    # Offline stack
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--vote-mode", default="relayed", choices=["funded", "relayed", "batched", "ledger"])
+    parser.add_argument("--vote-workers", type=int, default=4, help="VOTE_WORKERS per gunicorn worker")
+    parser.add_argument("--lanes", type=int, default=2, help="funded relayer lanes")
+    parser.add_argument("--block-time", type=float, default=12.0)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="simulated RPC latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of RPC requests that fail")
+    # Existing deployment instead
+    parser.add_argument("--url", help="target a running server (started with LOAD_TEST_SECRET) instead")
+    parser.add_argument("--secret", help="its LOAD_TEST_SECRET")
+    parser.add_argument("--db", help="its database, for the lock probe and job summary")
+    parser.add_argument("--candidates", help="comma-separated candidate IDs (default: active ones in the DB)")
+    parser.add_argument("--out", help="JSON results file")
+    args = parser.parse_args()
+
+    stack = None
+    if args.url:
+        if not args.secret:
+            parser.error("--url needs --secret")
+        target = urlsplit(args.url)
+        host, port, secret, db_path, log_path = target.hostname, target.port or 80, args.secret, args.db, None
+    else:
+        stack = Stack(args, tempfile.mkdtemp(prefix="loadgen_"))
+        print(f"🚀 Starting simulated chain + gunicorn ({args.workers}x{args.threads}) in {stack.workdir}")
+        stack.start()
+        host, port, secret, db_path, log_path = "127.0.0.1", stack.port, stack.secret, stack.db_path, stack.log_path
+
+    if args.candidates:
+        candidate_ids = [int(c) for c in args.candidates.split(",")]
+    elif db_path:
+        candidate_ids = active_candidates(db_path)
+    else:
+        candidate_ids = [1, 2, 3]
+
+    probe = LockProbe(db_path) if db_path else None
+    recorder = Recorder()
+    try:
+        if probe:
+            probe.start()
+        print(f"🎓 {args.rate}/s students for {args.duration:.0f}s against http://{host}:{port} "
+              f"(vote mode {args.vote_mode if stack else 'as configured'})")
+        students, elapsed = generate_load(host, port, secret, candidate_ids, args, recorder)
+    finally:
+        if probe:
+            probe.stop()
+        jobs = job_summary(db_path) if db_path else None
+        if stack:
+            stack.stop()
+
+    confirmed = recorder.votes["confirmed"]
+    confirm_window = (recorder.last_confirm - recorder.first_submit) if confirmed else None
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "target": args.url or "offline",
+            "rate": args.rate,
+            "duration": args.duration,
+            "workers": args.workers if stack else None,
+            "threads": args.threads if stack else None,
+            "vote_mode": args.vote_mode if stack else None,
+            "lanes": args.lanes if stack else None,
+            "block_time": args.block_time if stack else None,
+            "rpc_latency_ms": args.latency_ms if stack else None,
+            "rpc_failure_rate": args.failure_rate if stack else None,
+        },
+        "students": students,
+        "elapsed_s": round(elapsed, 1),
+        "votes": dict(recorder.votes),
+        "accepted_per_min": round(recorder.votes["accepted"] / elapsed * 60, 1),
+        "confirmed_per_min": round(confirmed / confirm_window * 60, 1) if confirm_window else None,
+        "confirm_p50_s": round(percentile(recorder.confirm_latencies, 0.50), 1) if confirmed else None,
+        "confirm_p95_s": round(percentile(recorder.confirm_latencies, 0.95), 1) if confirmed else None,
+        "generator_lag_p99_ms": round(percentile(recorder.start_lags, 0.99) * 1000, 1) if recorder.start_lags else None,
+        "routes": route_rows(recorder),
+        "db_lock": {
+            "probe_wait_p50_ms": round(percentile(probe.waits, 0.50) * 1000, 2) if probe and probe.waits else None,
+            "probe_wait_p99_ms": round(percentile(probe.waits, 0.99) * 1000, 2) if probe and probe.waits else None,
+            "probe_wait_max_ms": round(max(probe.waits) * 1000, 2) if probe and probe.waits else None,
+            "probe_timeouts": probe.timeouts if probe else None,
+            "server_log": log_matches(log_path),
+        },
+        "vote_jobs": jobs,
+    }
+
+    print(f"\n{students} students in {elapsed:.0f}s   votes {dict(recorder.votes)}")
+    print(f"accepted {report['accepted_per_min']}/min   confirmed {report['confirmed_per_min']}/min   "
+          f"confirmation p50 {report['confirm_p50_s']}s p95 {report['confirm_p95_s']}s")
+    print(f"\n{'route':<14} {'requests':>8} {'p50':>9} {'p95':>9} {'p99':>9}   outcomes")
+    for row in report["routes"]:
+        outcomes = {k: v for k, v in row.items() if k in ("ok", "4xx", "5xx", "rate_limited", "error")}
+        print(f"{row['route']:<14} {row['requests']:>8} {row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms "
+              f"{row['p99_ms']:>7.1f}ms   {outcomes}")
+    print(f"\n🔒 DB lock: {report['db_lock']}")
+    if jobs is not None:
+        print(f"📬 Vote jobs: {jobs}")
+
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"loadgen-{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import time
+import json
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+
+import db
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "candidates_version"
+
+# active = ACTIVE candidates in table order (what the vote/results grids show); by_id = every row
+CandidateSnapshot = namedtuple("CandidateSnapshot", "version active by_id")
+
+EMPTY_SNAPSHOT = CandidateSnapshot(None, (), {})
+
+
+def bump_candidates_version(conn):
+    """Marks the candidate set as changed. Call inside the same transaction as the change."""
+    conn.execute(
+        """INSERT INTO system_config (key, value) VALUES (?, '1')
+           ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1""",
+        (VERSION_KEY,)
+    )
+
+
+def make_etag(*parts):
+    """Strong ETag value for a page built from `parts` (versions, page name, student...)."""
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode()).hexdigest()[:32]
+
+
+def _parse_variants(raw):
+    """image_variants column -> {format: [{file, width, height}, ...]} (None if not processed)."""
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        logger.warning(f"⚠️ Ignoring unreadable image_variants: {raw[:80]}")
+        return None
+
+
+# ==========================================================
+# 📋 CANDIDATE CACHE (Versioned candidate set + rendered fragments)
+# ==========================================================
+class CandidateCache:
+    """Per-process copy of the `candidates` table, plus HTML fragments rendered from it.
+
+    add/delete bump a `candidates_version` counter in `system_config`; every worker
+    compares it at most once per `check_interval` and reloads (dropping its
+    memoized fragments) only when it moved, the same way ElectionState works.
+    """
+
+    def __init__(self, db_path, check_interval=1.0):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._fragments = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        return db.connect(self.db_path)
+
+    def snapshot(self):
+        """Current CandidateSnapshot (re-validated at most every `check_interval` seconds)."""
+        snap = self._snapshot
+        if snap is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snap
+
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._snapshot
+            try:
+                self._refresh()
+            except Exception as e:
+                logger.error(f"⚠️ DB Read Error (Candidate cache): {e}")
+                if self._snapshot is None:
+                    return EMPTY_SNAPSHOT
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self):
+        """Forces the next snapshot() to re-check the database (used right after a local change)."""
+        self._checked_at = 0.0
+
+    def fragment(self, snap, name, render):
+        """HTML rendered by `render()` once per (candidate version, `name`)."""
+        key = (snap.version, name)
+        html = self._fragments.get(key)
+        if html is None:
+            html = render()
+            if snap.version is not None and snap is self._snapshot:
+                self._fragments[key] = html
+        return html
+
+    def _refresh(self):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM system_config WHERE key = ?", (VERSION_KEY,)).fetchone()
+            version = int(row["value"]) if row else 0
+            if self._snapshot is not None and self._snapshot.version == version:
+                return  # Nothing changed
+            rows = [dict(r) for r in conn.execute("SELECT * FROM candidates").fetchall()]
+        finally:
+            conn.close()
+
+        for r in rows:
+            r["image_variants"] = _parse_variants(r.get("image_variants"))
+
+        self._snapshot = CandidateSnapshot(
+            version=version,
+            active=tuple(r for r in rows if r["active"] == 1),
+            by_id={r["id"]: r for r in rows},
+        )
+        self._fragments = {}
+        logger.info(f"📋 Candidates loaded: {len(self._snapshot.active)} active (version {version})")
@@ -0,0 +1,198 @@
+"""Width-bounded WebP + JPEG derivatives of candidate photos.
+
+    python -m candidate_images --backfill [--force] [--db election.db]
+
+Uploads are marked `image_status = 'pending'` and processed by a background
+CandidateImageProcessor; --backfill processes every candidate row whose photo
+has never been processed (all rows with --force) in one go.
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+import threading
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # templates keep using the original upload
+    Image = ImageOps = None
+
+import db
+from leases import try_acquire_lease
+from candidate_cache import bump_candidates_version
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cards are 100-150 CSS px wide, so these cover 1x-3x screens
+DERIVATIVE_WIDTHS = (160, 320, 640)
+DERIVATIVE_DIR = "derivatives"  # under static/images/
+# format name -> (Pillow format, extension, save options)
+FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 6}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+# ==========================================================
+# 🖼️ DERIVATIVES (One source photo -> every width x format)
+# ==========================================================
+def make_derivatives(images_dir, image):
+    """Writes the derivatives of images/<image>. Returns (width, height, variants).
+
+    `variants` is {"webp": [{"file", "width", "height"}, ...], "jpeg": [...]} with
+    `file` relative to static/, narrowest first. Nothing is ever upscaled.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is not installed")
+
+    with Image.open(os.path.join(images_dir, image)) as src:
+        # Phone photos are stored sideways with an EXIF rotation flag
+        photo = ImageOps.exif_transpose(src)
+        photo.load()
+    width, height = photo.size
+
+    # JPEG has no alpha channel: flatten onto white
+    if photo.mode in ("RGBA", "LA", "P"):
+        photo = photo.convert("RGBA")
+        opaque = Image.new("RGB", photo.size, (255, 255, 255))
+        opaque.paste(photo, mask=photo.getchannel("A"))
+    else:
+        opaque = photo.convert("RGB")
+
+    widths = sorted({min(w, width) for w in DERIVATIVE_WIDTHS})
+    stem = os.path.splitext(os.path.basename(image))[0]
+    out_dir = os.path.join(images_dir, DERIVATIVE_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+
+    variants = {name: [] for name in FORMATS}
+    for w in widths:
+        h = max(1, round(height * w / width))
+        resized = opaque if w == width else opaque.resize((w, h), Image.LANCZOS)
+        for name, (pil_format, ext, options) in FORMATS.items():
+            filename = f"{stem}-{w}w.{ext}"
+            resized.save(os.path.join(out_dir, filename), pil_format, **options)
+            variants[name].append({"file": f"images/{DERIVATIVE_DIR}/{filename}", "width": w, "height": h})
+    return width, height, variants
+
+
+def process_candidate(conn, images_dir, cid, image):
+    """Builds one candidate's derivatives and stores them (status ready/failed). Returns True if ready."""
+    try:
+        width, height, variants = make_derivatives(images_dir, image)
+    except Exception as e:
+        logger.error(f"❌ Image processing failed for candidate {cid} ({image}): {e}")
+        conn.execute("UPDATE candidates SET image_status = 'failed' WHERE id = ?", (cid,))
+        conn.commit()
+        return False
+
+    # The photo may have been replaced meanwhile: only store derivatives of the one we processed
+    conn.execute(
+        """UPDATE candidates SET image_status = 'ready', image_width = ?, image_height = ?, image_variants = ?
+           WHERE id = ? AND image = ?""",
+        (width, height, json.dumps(variants), cid, image)
+    )
+    bump_candidates_version(conn)
+    conn.commit()
+    logger.info(f"🖼️ Candidate {cid}: {image} ({width}x{height}) -> {sum(map(len, variants.values()))} derivatives")
+    return True
+
+
+# ==========================================================
+# 👷 BACKGROUND PROCESSOR (Uploads are resized off the request thread)
+# ==========================================================
+class CandidateImageProcessor:
+    """Turns `pending` candidate photos into derivatives, one worker at a time.
+
+    Every worker checks for pending rows every `interval` seconds (notify() wakes
+    it right after an upload); only the holder of the lease does the work.
+    """
+
+    LEASE_NAME = "candidate_images"
+
+    def __init__(self, db_path, images_dir, interval=5.0):
+        self.db_path = db_path
+        self.images_dir = images_dir
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def notify(self):
+        self._wake.set()
+
+    def start(self):
+        if Image is None:
+            logger.warning("⚠️ Pillow is not installed: candidate photos are served as uploaded")
+            return
+        threading.Thread(target=self._run, name="candidate-images", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"⚠️ Candidate image processor failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def run_once(self):
+        """Processes every pending photo. Returns how many became ready."""
+        conn = db.connect(self.db_path)
+        try:
+            pending = conn.execute(
+                "SELECT id, image FROM candidates WHERE image_status = 'pending' ORDER BY id"
+            ).fetchall()
+            if not pending:
+                return 0
+            if not try_acquire_lease(self.db_path, self.LEASE_NAME, ttl=120):
+                return 0
+            return sum(process_candidate(conn, self.images_dir, row["id"], row["image"]) for row in pending)
+        finally:
+            conn.close()
+
+
+# ==========================================================
+# 🔁 BACKFILL (One-shot for photos uploaded before derivatives existed)
+# ==========================================================
+def backfill(db_path, images_dir, force=False):
+    """Processes every unprocessed (or, with `force`, every) candidate photo now."""
+    conn = db.connect(db_path)
+    try:
+        where = "" if force else "WHERE image_status IS NULL OR image_status != 'ready'"
+        rows = conn.execute(f"SELECT id, image FROM candidates {where} ORDER BY id").fetchall()
+        ready = sum(process_candidate(conn, images_dir, row["id"], row["image"]) for row in rows)
+    finally:
+        conn.close()
+    logger.info(f"✅ Backfill done: {ready}/{len(rows)} candidate photos processed")
+    return ready, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Candidate photo derivatives")
+    parser.add_argument("--backfill", action="store_true", help="process existing candidate photos now")
+    parser.add_argument("--force", action="store_true", help="with --backfill: also redo photos already processed")
+    parser.add_argument("--db", default=os.getenv("DB_PATH", os.path.join(BASE_DIR, "election.db")))
+    parser.add_argument("--images", default=os.path.join(BASE_DIR, "static", "images"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if not args.backfill:
+        parser.print_help()
+        return 1
+    if Image is None:
+        logger.error("❌ Pillow is not installed (pip install Pillow)")
+        return 1
+
+    from database_init import init_db
+    init_db(args.db)  # adds the image columns to older databases
+    ready, total = backfill(args.db, args.images, force=args.force)
+    return 0 if ready == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
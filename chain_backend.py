@@ -0,0 +1,313 @@
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from eth_utils import to_checksum_address
+from web3.datastructures import AttributeDict
+from web3.exceptions import ContractLogicError, BadFunctionCallOutput
+
+from rpc_batch import rpc_batch, RPCBatchError, account_states
+from event_indexer import VOTED_TOPIC
+from sim_chain import SimulatedRPCError
+
+logger = logging.getLogger(__name__)
+
+# Receipt fields returned as hex quantities that callers compare as numbers
+_INT_FIELDS = ("status", "blockNumber", "transactionIndex", "gasUsed", "cumulativeGasUsed",
+               "effectiveGasPrice", "type")
+
+
+def format_receipt(raw):
+    """Raw JSON-RPC receipt -> AttributeDict with the numeric fields as ints (like web3 returns)."""
+    receipt = dict(raw)
+    for field in _INT_FIELDS:
+        if isinstance(receipt.get(field), str):
+            receipt[field] = int(receipt[field], 16)
+    return AttributeDict(receipt)
+
+
+def tx_hash_hex(tx_hash):
+    """HexBytes/bytes/str -> 0x-prefixed hash string (Etherscan format)."""
+    tx_hash_str = tx_hash.hex() if hasattr(tx_hash, "hex") else str(tx_hash)
+    if not tx_hash_str.startswith('0x'):
+        tx_hash_str = '0x' + tx_hash_str
+    return tx_hash_str
+
+
+# ==========================================================
+# ⛓️ CHAIN BACKEND (Everything the vote pipeline asks the chain)
+# ==========================================================
+class ChainBackend(ABC):
+    """Nonce, balance, fee, send, receipt, vote-count and event access for the vote pipeline.
+
+    `w3` stays available for the pieces that build and sign transactions (relayer
+    lanes, wallet pool, contract calls); everything that polls or sends goes
+    through these methods so another backend can stand in for the RPC node.
+    """
+
+    name = "abstract"
+    w3 = None
+    contract = None
+
+    @abstractmethod
+    def block_number(self):
+        """Latest block number."""
+
+    @abstractmethod
+    def block_hash(self, number):
+        """0x hash (lowercase) of block `number`."""
+
+    @abstractmethod
+    def pending_nonce(self, address):
+        """Transaction count of `address` including its pending transactions."""
+
+    @abstractmethod
+    def account_states(self, addresses):
+        """{address: (balance in wei, pending nonce)} for many accounts at once."""
+
+    @abstractmethod
+    def fee_history(self, blocks, percentiles):
+        """eth_feeHistory up to the latest block (ints, like web3 returns)."""
+
+    @abstractmethod
+    def gas_price(self):
+        """Legacy gas price in wei."""
+
+    @abstractmethod
+    def send_raw_transaction(self, raw_tx):
+        """Broadcasts signed bytes and returns the 0x hash."""
+
+    @abstractmethod
+    def get_receipts(self, tx_hashes):
+        """Receipts in the same order, None for the ones not mined yet."""
+
+    @abstractmethod
+    def get_votes(self, candidate_ids):
+        """Raw on-chain counts as {candidate_id: count}."""
+
+    @abstractmethod
+    def get_vote_events(self, from_block, to_block):
+        """Voted logs of the contract inside [from_block, to_block]."""
+
+    def status(self):
+        return {"backend": self.name}
+
+
+class Web3Backend(ChainBackend):
+    """The RPC node behind `w3` (HTTP, pooled or simulated provider)."""
+
+    name = "web3"
+
+    def __init__(self, w3, contract):
+        self.w3 = w3
+        self.contract = contract
+        # Flipped off the first time the deployed contract turns out to predate getVotesBatch()
+        self._votes_batch_supported = True
+
+    # ---------------- BLOCKS / FEES / NONCES ----------------
+    def block_number(self):
+        return self.w3.eth.block_number
+
+    def block_hash(self, number):
+        return tx_hash_hex(self.w3.eth.get_block(number)["hash"]).lower()
+
+    def pending_nonce(self, address):
+        return self.w3.eth.get_transaction_count(address, "pending")
+
+    def account_states(self, addresses):
+        # Balances and nonces of every address in one JSON-RPC batch
+        return account_states(self.w3, addresses)
+
+    def fee_history(self, blocks, percentiles):
+        return self.w3.eth.fee_history(blocks, "latest", percentiles)
+
+    def gas_price(self):
+        return self.w3.eth.gas_price
+
+    # ---------------- TRANSACTIONS ----------------
+    def send_raw_transaction(self, raw_tx):
+        return tx_hash_hex(self.w3.eth.send_raw_transaction(raw_tx))
+
+    def get_receipts(self, tx_hashes):
+        try:
+            results = rpc_batch(self.w3, [("eth_getTransactionReceipt", [h]) for h in tx_hashes])
+        except RPCBatchError as e:
+            # Node refuses batches -> still one request per hash, never per waiter
+            logger.warning(f"⚠️ Receipt batch refused ({e}), fetching one by one")
+            results = [self.w3.provider.make_request("eth_getTransactionReceipt", [h]).get("result") for h in tx_hashes]
+
+        receipts = []
+        for tx_hash, raw in zip(tx_hashes, results):
+            if isinstance(raw, RPCBatchError):
+                logger.warning(f"⚠️ Receipt lookup failed for {tx_hash}: {raw}")
+                raw = None
+            receipts.append(format_receipt(raw) if raw else None)
+        return receipts
+
+    # ---------------- CONTRACT READS ----------------
+    def get_votes(self, candidate_ids):
+        """getVotesBatch() answers in one eth_call; older deployments fall back to
+        per-ID getVotes() calls (one JSON-RPC batch, or concurrent requests).
+        """
+        if self._votes_batch_supported:
+            try:
+                counts = self.contract.functions.getVotesBatch(candidate_ids).call()
+                return dict(zip(candidate_ids, counts))
+            except (ContractLogicError, BadFunctionCallOutput) as e:
+                logger.warning(f"⚠️ getVotesBatch unavailable on {self.contract.address}, using per-ID calls: {e}")
+                self._votes_batch_supported = False
+
+        try:
+            return self._get_votes_per_id(candidate_ids)
+        except Exception as e:
+            # Node refuses JSON-RPC batches -> plain concurrent calls
+            logger.warning(f"⚠️ JSON-RPC batch failed ({e}), falling back to concurrent getVotes calls")
+            return self._get_votes_concurrently(candidate_ids)
+
+    def _encode_call(self, fn_name, args):
+        # 🛠️ UNIVERSAL ABI ENCODE FIX (web3 v7 renamed encodeABI -> encode_abi)
+        try:
+            return self.contract.encode_abi(fn_name, args=args)
+        except AttributeError:
+            return self.contract.encodeABI(fn_name=fn_name, args=args)
+
+    def _get_votes_per_id(self, candidate_ids):
+        """Raw on-chain getVotes() for every candidate in ONE JSON-RPC batch ({id: count})."""
+        calls = [
+            ("eth_call", [{"to": self.contract.address, "data": self._encode_call("getVotes", [cid])}, "latest"])
+            for cid in candidate_ids
+        ]
+        counts = {}
+        for cid, result in zip(candidate_ids, rpc_batch(self.w3, calls)):
+            if isinstance(result, RPCBatchError):
+                logger.warning(f"⚠️ Could not fetch votes for ID {cid}: {result}")
+                counts[cid] = 0  # Contract doesn't recognize this ID
+            else:
+                counts[cid] = int(result, 16)
+        return counts
+
+    def _get_votes_concurrently(self, candidate_ids):
+        """One getVotes() request per candidate, sent in parallel."""
+        def one(cid):
+            try:
+                return self.contract.functions.getVotes(cid).call()
+            except (ContractLogicError, BadFunctionCallOutput) as e:
+                logger.warning(f"⚠️ Could not fetch votes for ID {cid}: {e}")
+                return 0  # Contract doesn't recognize this ID
+
+        with ThreadPoolExecutor(max_workers=min(16, max(1, len(candidate_ids)))) as pool:
+            return dict(zip(candidate_ids, pool.map(one, candidate_ids)))
+
+    def get_vote_events(self, from_block, to_block):
+        return self.w3.eth.get_logs({
+            "address": self.contract.address,
+            "topics": [VOTED_TOPIC],
+            "fromBlock": from_block,
+            "toBlock": to_block,
+        })
+
+    def status(self):
+        status = super().status()
+        provider_status = getattr(self.w3.provider, "status", None)
+        if provider_status:
+            status["provider"] = provider_status()
+        return status
+
+
+class SimulatedBackend(ChainBackend):
+    """Reads and sends straight against a SimulatedChain, without JSON-RPC encoding.
+
+    `w3` (a SimulatedProvider over the same chain) is still used to build and sign
+    transactions. Every call here goes through the provider's latency and failure
+    injection, so a flaky simulated node stays flaky for the vote pipeline too.
+    """
+
+    name = "simulated"
+
+    def __init__(self, w3, contract):
+        self.w3 = w3
+        self.contract = contract
+        self.provider = w3.provider
+        self.sim_chain = w3.provider.chain
+
+    def start(self):
+        self.sim_chain.start()
+
+    def stop(self):
+        self.sim_chain.stop()
+
+    def _round_trip(self):
+        """One simulated request: waits the provider's latency, raises its injected failures."""
+        error = self.provider._round_trip()
+        if error:
+            raise SimulatedRPCError(error["message"], code=error["code"])
+        return self.sim_chain
+
+    # ---------------- BLOCKS / FEES / NONCES ----------------
+    def block_number(self):
+        chain = self._round_trip()
+        with chain._lock:
+            return len(chain.blocks) - 1
+
+    def block_hash(self, number):
+        chain = self._round_trip()
+        with chain._lock:
+            return chain.blocks[number]["hash"].lower()
+
+    def pending_nonce(self, address):
+        chain = self._round_trip()
+        with chain._lock:
+            return chain._pending_nonce(to_checksum_address(address))
+
+    def account_states(self, addresses):
+        chain = self._round_trip()
+        with chain._lock:
+            return {
+                a: (chain.balances[to_checksum_address(a)], chain._pending_nonce(to_checksum_address(a)))
+                for a in addresses
+            }
+
+    def fee_history(self, blocks, percentiles):
+        chain = self._round_trip()
+        with chain._lock:
+            raw = chain.fee_history(blocks, "latest", percentiles)
+        return AttributeDict({
+            "oldestBlock": int(raw["oldestBlock"], 16),
+            "baseFeePerGas": [int(f, 16) for f in raw["baseFeePerGas"]],
+            "gasUsedRatio": raw["gasUsedRatio"],
+            "reward": [[int(r, 16) for r in rewards] for rewards in raw["reward"]],
+        })
+
+    def gas_price(self):
+        return int(self._round_trip().rpc("eth_gasPrice", []), 16)
+
+    # ---------------- TRANSACTIONS ----------------
+    def send_raw_transaction(self, raw_tx):
+        return self._round_trip().send_raw_transaction(bytes(raw_tx))
+
+    def get_receipts(self, tx_hashes):
+        chain = self._round_trip()
+        with chain._lock:
+            raws = [chain.receipts.get(h.lower()) for h in tx_hashes]
+        return [format_receipt(raw) if raw else None for raw in raws]
+
+    # ---------------- CONTRACT READS ----------------
+    def get_votes(self, candidate_ids):
+        chain = self._round_trip()
+        with chain._lock:
+            return {cid: chain.votes[cid] for cid in candidate_ids}
+
+    def get_vote_events(self, from_block, to_block):
+        chain = self._round_trip()
+        with chain._lock:
+            logs = chain.get_logs({
+                "address": self.contract.address,
+                "topics": [VOTED_TOPIC],
+                "fromBlock": hex(from_block),
+                "toBlock": hex(to_block),
+            })
+        return [AttributeDict({**log, "blockNumber": int(log["blockNumber"], 16),
+                               "logIndex": int(log["logIndex"], 16)}) for log in logs]
+
+    def status(self):
+        return {**super().status(), "provider": self.provider.status()}
@@ -3,7 +3,13 @@ import os
 
 # Use absolute path for reliability
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "election.db")
+DB_PATH = os.getenv("DB_PATH", os.path.join(BASE_DIR, "election.db"))
+
+def _ensure_column(cur, table, column, definition):
+    """Adds a column to an existing table (CREATE TABLE IF NOT EXISTS won't)."""
+    existing = [row[1] for row in cur.execute(f"PRAGMA table_info({table})")]
+    if column not in existing:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
 def init_db(db_path=None):
     if db_path is None:
@@ -12,6 +18,9 @@ def init_db(db_path=None):
     try:
         conn = sqlite3.connect(db_path)
         cur = conn.cursor()
+
+        # 0. WAL journal (persistent): readers no longer block the vote writers
+        cur.execute("PRAGMA journal_mode=WAL")
         
         # 1. Create Vote Tracking Table
         # election_id + student_id must be UNIQUE together
@@ -84,8 +93,178 @@ def init_db(db_path=None):
         # 8. Seed Default System Config (current_election_id = 1)
         cur.execute("INSERT OR IGNORE INTO system_config (key, value) VALUES ('current_election_id', '1')")
 
+        # 9. Create Vote Jobs Table (Async submission queue)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS vote_jobs (
+            id TEXT PRIMARY KEY,
+            student_id TEXT NOT NULL,
+            election_id INTEGER NOT NULL,
+            candidate_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            stage TEXT NULL,
+            fund_tx_hash TEXT NULL,
+            vote_tx_hash TEXT NULL,
+            error TEXT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT NULL,
+            lease_until REAL NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_vote_jobs_status ON vote_jobs (status, created_at)")
+
+        # 10. Create Nonce State Table (Next free nonce per relayer wallet)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS nonce_state (
+            address TEXT PRIMARY KEY,
+            next_nonce INTEGER NOT NULL,
+            synced_at REAL NULL
+        );
+        """)
+
+        # 11. Create Leases Table (Singleton background jobs across workers)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        """)
+
+        # 12. Create Wallet Pool Table (Pre-funded temp voter wallets, keys encrypted)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS wallet_pool (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            address TEXT NOT NULL UNIQUE,
+            encrypted_key TEXT NOT NULL,
+            status TEXT NOT NULL,
+            fund_tx_hash TEXT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_wallet_pool_status ON wallet_pool (status, id)")
+
+        # 13. Per-election wallet pool tuning (NULL = use .env defaults)
+        _ensure_column(cur, "election_settings", "wallet_pool_size", "INTEGER NULL")
+        _ensure_column(cur, "election_settings", "wallet_pool_low_water", "INTEGER NULL")
+        _ensure_column(cur, "election_settings", "wallet_pool_refill_rate", "INTEGER NULL")
+
+        # 14. Create Ballot Ledger (Off-chain ballots, APPEND-ONLY) + Merkle batches
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS ballot_ledger (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            election_id INTEGER NOT NULL,
+            candidate_id INTEGER NOT NULL,
+            salt TEXT NOT NULL,
+            leaf_hash TEXT NOT NULL UNIQUE,
+            batch_id INTEGER NULL,
+            created_at REAL NOT NULL
+        );
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_ballot_ledger_batch ON ballot_ledger (batch_id, seq)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_ballot_ledger_election ON ballot_ledger (election_id, candidate_id)")
+        # Ballots can be sealed into a batch but never edited or removed
+        cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS ballot_ledger_no_delete BEFORE DELETE ON ballot_ledger
+        BEGIN SELECT RAISE(ABORT, 'ballot_ledger is append-only'); END;
+        """)
+        cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS ballot_ledger_no_edit
+        BEFORE UPDATE OF seq, election_id, candidate_id, salt, leaf_hash ON ballot_ledger
+        BEGIN SELECT RAISE(ABORT, 'ballot_ledger is append-only'); END;
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            merkle_root TEXT NOT NULL UNIQUE,
+            ballot_count INTEGER NOT NULL,
+            first_seq INTEGER NOT NULL,
+            last_seq INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            anchor_tx_hash TEXT NULL,
+            created_at REAL NOT NULL,
+            anchored_at REAL NULL
+        );
+        """)
+
+        # 15. Create Ballot Positions Table (Which positions a student has completed, NOT who they chose)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS ballot_positions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id TEXT NOT NULL,
+            election_id INTEGER NOT NULL,
+            position TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(student_id, election_id, position)
+        );
+        """)
+
+        # 16. Multi-position ballot jobs carry all their choices (JSON list, NULL = single candidate_id)
+        _ensure_column(cur, "vote_jobs", "candidate_ids", "TEXT NULL")
+
+        # 17. Create Results Cache Table (Tallies shared by all gunicorn workers)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS results_cache (
+            name TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            computed_at REAL NOT NULL
+        );
+        """)
+
+        # 18. Create Vote Event Index (Voted logs mirrored from the chain) + running tallies
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS vote_events (
+            block_number INTEGER NOT NULL,
+            log_index INTEGER NOT NULL,
+            block_hash TEXT NOT NULL,
+            tx_hash TEXT NOT NULL,
+            candidate_id INTEGER NOT NULL,
+            PRIMARY KEY (block_number, log_index)
+        );
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_vote_events_candidate ON vote_events (candidate_id, block_number)")
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS candidate_tallies (
+            candidate_id INTEGER PRIMARY KEY,
+            votes INTEGER NOT NULL
+        );
+        """)
+        # Hashes of recently indexed blocks (reorg detection)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS indexed_blocks (
+            block_number INTEGER PRIMARY KEY,
+            block_hash TEXT NOT NULL
+        );
+        """)
+
+        # 19. Block-height boundaries per election (NULL start = legacy offsets snapshot)
+        _ensure_column(cur, "election_settings", "start_block", "INTEGER NULL")
+        _ensure_column(cur, "election_settings", "end_block", "INTEGER NULL")
+
+        # 20. Create Auth Cache Table (Google signing certs + per-user revocation state, shared by workers)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS auth_cache (
+            name TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        """)
+
+        # 21. Candidate photo derivatives (status NULL = never processed, pending/ready/failed;
+        #     variants = JSON {format: [{file, width, height}, ...]}, see candidate_images.py)
+        _ensure_column(cur, "candidates", "image_status", "TEXT NULL")
+        _ensure_column(cur, "candidates", "image_width", "INTEGER NULL")
+        _ensure_column(cur, "candidates", "image_height", "INTEGER NULL")
+        _ensure_column(cur, "candidates", "image_variants", "TEXT NULL")
+
+        # 22. Signed vote transaction, stored BEFORE it is broadcast (a re-claimed job re-sends it)
+        _ensure_column(cur, "vote_jobs", "vote_raw_tx", "TEXT NULL")
+
+        # 23. Anchor transaction details (lane, nonce, fees, every hash sent) so a stuck one can be re-sent
+        _ensure_column(cur, "ledger_batches", "anchor_tx", "TEXT NULL")
 
-        
         # 2. Check and clean up legacy info if needed
         # (Optional: Add migration logic here if we were preserving old JSON data)
         
@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# 🗄️ POOLED SQLITE ACCESS (One WAL connection per thread)
+# ==========================================================
+# WAL lets readers run while a writer commits, so bursts of mark_user_as_voted()
+# from several gunicorn workers queue on busy_timeout instead of failing with
+# "database is locked". synchronous=NORMAL is durable across app crashes in WAL mode.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '30000'))}",
+    f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '16384'))}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Prepared statements kept per connection (sqlite3 reuses them by SQL text)
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+
+
+class PooledConnection:
+    """Thin wrapper around a reused connection.
+
+    `close()` does not close anything: it rolls back whatever the caller left
+    uncommitted (same effect as closing) and keeps the connection for the next
+    call on this thread. Checkouts nest: a helper that calls `connect()`/`close()`
+    inside a caller's open write shares it, and only the outermost `close()`
+    rolls back. Everything else is passed to the real connection.
+    """
+
+    def __init__(self, conn):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_depth", 0)   # connect() calls not closed yet
+
+    def close(self):
+        object.__setattr__(self, "_depth", max(0, self._depth - 1))
+        if self._depth == 0 and self._conn.in_transaction:
+            self._conn.rollback()
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+
+def _open(db_path):
+    conn = sqlite3.connect(db_path, timeout=30, cached_statements=STATEMENT_CACHE_SIZE)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def connect(db_path):
+    """Returns this thread's connection to `db_path` (opened on first use, per process)."""
+    pool = getattr(_local, "pool", None)
+    if pool is None or _local.pid != os.getpid():
+        # First call on this thread, or we are in a forked gunicorn worker
+        pool = _local.pool = {}
+        _local.pid = os.getpid()
+
+    conn = pool.get(db_path)
+    if conn is None:
+        conn = pool[db_path] = PooledConnection(_open(db_path))
+    elif conn.in_transaction:
+        if conn._depth == 0:
+            # Idle but mid-transaction: a previous caller never committed -> don't keep its write lock
+            logger.warning(f"⚠️ Rolled back a transaction left open on {db_path}")
+            conn.rollback()
+        else:
+            # Nested inside a caller's open write: its rows are kept, but a commit() here commits them too
+            logger.error(f"❌ connect({db_path}) while this thread has an uncommitted write open on it")
+    object.__setattr__(conn, "_depth", conn._depth + 1)
+    return conn
+
+
+def close_thread_connections():
+    """Really closes this thread's connections (tests, benchmarks, thread shutdown)."""
+    pool = getattr(_local, "pool", None) or {}
+    for conn in pool.values():
+        conn._conn.close()
+    pool.clear()
@@ -14,6 +14,8 @@ except ImportError:
     from web3 import Web3
     from dotenv import load_dotenv
 
+from rpc_batch import batch_reads, hex_int
+
 # Load Environment Variables
 load_dotenv()
 
@@ -81,8 +83,16 @@ def deploy():
     account = w3.eth.account.from_key(PRIVATE_KEY)
     print(f"👤 Deploying from: {account.address}")
     
-    # helper to get balance
-    balance = w3.eth.get_balance(account.address)
+    # Preflight: balance, nonce, gas price, chain ID and gas estimate in ONE round-trip
+    deploy_data = bytecode if bytecode.startswith("0x") else "0x" + bytecode
+    preflight = batch_reads(w3, {
+        "balance": ("eth_getBalance", [account.address, "latest"]),
+        "nonce": ("eth_getTransactionCount", [account.address, "pending"]),
+        "gas_price": ("eth_gasPrice", []),
+        "chain_id": ("eth_chainId", []),
+        "gas": ("eth_estimateGas", [{"from": account.address, "data": deploy_data}]),
+    }, optional=("gas",))
+    balance = hex_int(preflight["balance"])
     
     # Compatibility for from_wei / fromWei
     from_wei = w3.from_wei if hasattr(w3, "from_wei") else w3.fromWei
@@ -96,19 +106,24 @@ def deploy():
     print("🚀 Sending Deployment Transaction...")
     Election = w3.eth.contract(abi=abi, bytecode=bytecode)
     
-    # Compatibility helpers
-    get_tx_count = w3.eth.get_transaction_count if hasattr(w3.eth, "get_transaction_count") else w3.eth.getTransactionCount
-    gas_price = w3.eth.gas_price if hasattr(w3.eth, "gas_price") else w3.eth.gasPrice
+    # Values from the preflight batch (nothing left for build_transaction to look up)
+    nonce = hex_int(preflight["nonce"])
+    gas_price = hex_int(preflight["gas_price"])
+    chain_id = hex_int(preflight["chain_id"])
     
     # Build
     constructor_call = Election.constructor()
     build_txn_method = constructor_call.build_transaction if hasattr(constructor_call, "build_transaction") else constructor_call.buildTransaction
     
-    construct_txn = build_txn_method({
+    txn_params = {
         "from": account.address,
-        "nonce": get_tx_count(account.address),
-        "gasPrice": gas_price
-    })
+        "nonce": nonce,
+        "gasPrice": gas_price,
+        "chainId": chain_id
+    }
+    if preflight["gas"]:
+        txn_params["gas"] = int(hex_int(preflight["gas"]) * 1.2)  # Headroom over the estimate
+    construct_txn = build_txn_method(txn_params)
     
     # Sign
     # v6: sign_transaction, v5: signTransaction
@@ -118,7 +133,8 @@ def deploy():
     # Send
     # v6: send_raw_transaction, v5: sendRawTransaction
     send_raw = w3.eth.send_raw_transaction if hasattr(w3.eth, "send_raw_transaction") else w3.eth.sendRawTransaction
-    tx_hash = send_raw(signed.rawTransaction)
+    raw = signed.rawTransaction if hasattr(signed, "rawTransaction") else signed.raw_transaction
+    tx_hash = send_raw(raw)
     
     print(f"⏳ Transaction Sent! Hash: {tx_hash.hex()}")
     print("Waiting for confirmation...")
@@ -127,11 +143,64 @@ def deploy():
     wait_for_receipt = w3.eth.wait_for_transaction_receipt if hasattr(w3.eth, "wait_for_transaction_receipt") else w3.eth.waitForTransactionReceipt
     tx_receipt = wait_for_receipt(tx_hash)
     
+    # 6. Allow the extra relayer lanes to submit signed ballots (voteFor)
+    txn_defaults = {"from": account.address, "gasPrice": gas_price, "chainId": chain_id}
+    nonce = register_relayers(w3, tx_receipt.contractAddress, abi, nonce + 1, txn_defaults, sign_txn, send_raw, wait_for_receipt)
+
+    # 7. Register the candidate ID range read by getAllVotes()
+    register_candidate_count(w3, tx_receipt.contractAddress, abi, nonce, txn_defaults, sign_txn, send_raw, wait_for_receipt)
+
     print("-" * 30)
     print("✅ DEPLOYMENT COMPLETE!")
     print(f"📄 NEW CONTRACT ADDRESS: {tx_receipt.contractAddress}")
+    print(f"🧱 DEPLOYED IN BLOCK: {tx_receipt.blockNumber} (set CONTRACT_DEPLOY_BLOCK to enable the vote indexer)")
     print("-" * 30)
     print("👉 Please update your .env file with this address.")
 
+def register_relayers(w3, contract_address, abi, nonce, txn_defaults, sign_txn, send_raw, wait_for_receipt):
+    """Sends setRelayer() for every extra lane. Returns the next free deployer nonce."""
+    from relayer import load_relayer_keys
+
+    keys = load_relayer_keys(os.getenv("ADMIN_PRIVATE_KEYS"), os.getenv("ADMIN_MNEMONIC"), int(os.getenv("ADMIN_LANES", "1")))
+    addresses = [w3.eth.account.from_key(k).address for k in keys]
+    addresses = [a for a in addresses if a != txn_defaults["from"]]  # Deployer is a relayer already
+    if not addresses:
+        return nonce
+
+    print(f"🔑 Registering {len(addresses)} extra relayer wallet(s)...")
+    election = w3.eth.contract(address=contract_address, abi=abi)
+    for address in addresses:
+        call = election.functions.setRelayer(address, True)
+        build_txn_method = call.build_transaction if hasattr(call, "build_transaction") else call.buildTransaction
+        txn = build_txn_method({**txn_defaults, "nonce": nonce})
+        signed = sign_txn(txn, private_key=PRIVATE_KEY)
+        raw = signed.rawTransaction if hasattr(signed, "rawTransaction") else signed.raw_transaction
+        wait_for_receipt(send_raw(raw))
+        print(f"   ✅ {address}")
+        nonce += 1
+    return nonce
+
+def register_candidate_count(w3, contract_address, abi, nonce, txn_defaults, sign_txn, send_raw, wait_for_receipt):
+    """Sends setCandidateCount() (CANDIDATE_COUNT, or the highest candidate ID in the DB) so getAllVotes() covers them."""
+    import sqlite3
+    from database_init import DB_PATH
+
+    count = os.getenv("CANDIDATE_COUNT")
+    if count is None and os.path.exists(DB_PATH):
+        conn = sqlite3.connect(DB_PATH)
+        count = conn.execute("SELECT MAX(id) FROM candidates").fetchone()[0]
+        conn.close()
+    if not count:
+        return
+
+    print(f"🗳️  Registering candidate IDs 1..{count} for getAllVotes()...")
+    election = w3.eth.contract(address=contract_address, abi=abi)
+    call = election.functions.setCandidateCount(int(count))
+    build_txn_method = call.build_transaction if hasattr(call, "build_transaction") else call.buildTransaction
+    txn = build_txn_method({**txn_defaults, "nonce": nonce})
+    signed = sign_txn(txn, private_key=PRIVATE_KEY)
+    raw = signed.rawTransaction if hasattr(signed, "rawTransaction") else signed.raw_transaction
+    wait_for_receipt(send_raw(raw))
+
 if __name__ == "__main__":
     deploy()
@@ -0,0 +1,110 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from collections import namedtuple
+
+import db
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "election_generation"
+
+# What the vote gate needs, already parsed (deadline_epoch = None when there is no deadline)
+ElectionSnapshot = namedtuple("ElectionSnapshot", "generation election_id is_paused deadline deadline_epoch")
+
+DEFAULT_SNAPSHOT = ElectionSnapshot(None, 1, False, None, None)
+
+
+def bump_generation(conn):
+    """Marks the election state as changed. Call inside the same transaction as the change."""
+    conn.execute(
+        """INSERT INTO system_config (key, value) VALUES (?, '1')
+           ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1""",
+        (GENERATION_KEY,)
+    )
+
+
+# ==========================================================
+# 🧠 ELECTION STATE CACHE (Current election, pause flag, deadline)
+# ==========================================================
+class ElectionState:
+    """Per-process copy of the current election's state.
+
+    Admin changes bump a generation counter in `system_config`; every worker
+    compares it at most once per `check_interval` and reloads only when it moved,
+    so the vote gate normally costs no database round-trip at all.
+    """
+
+    def __init__(self, db_path, check_interval=1.0):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        return db.connect(self.db_path)
+
+    def snapshot(self):
+        """Current ElectionSnapshot (re-validated at most every `check_interval` seconds)."""
+        snap = self._snapshot
+        if snap is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snap
+
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._snapshot
+            try:
+                self._refresh()
+            except Exception as e:
+                logger.error(f"⚠️ Error reading election state: {e}")
+                if self._snapshot is None:
+                    return DEFAULT_SNAPSHOT
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self):
+        """Forces the next snapshot() to re-check the database (used right after a local change)."""
+        self._checked_at = 0.0
+
+    def _refresh(self):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM system_config WHERE key = ?", (GENERATION_KEY,)).fetchone()
+            generation = int(row["value"]) if row else 0
+            if self._snapshot is not None and self._snapshot.generation == generation:
+                return  # Nothing changed
+
+            row = conn.execute("SELECT value FROM system_config WHERE key = 'current_election_id'").fetchone()
+            election_id = int(row["value"]) if row else 1
+            settings = conn.execute(
+                "SELECT is_paused, deadline FROM election_settings WHERE election_id = ?", (election_id,)
+            ).fetchone()
+            if settings is None:
+                # If no settings exist, create default and allow voting
+                conn.execute("INSERT OR IGNORE INTO election_settings (election_id, is_paused) VALUES (?, 0)", (election_id,))
+                conn.commit()
+        finally:
+            conn.close()
+
+        deadline = settings["deadline"] if settings else None
+        self._snapshot = ElectionSnapshot(
+            generation=generation,
+            election_id=election_id,
+            is_paused=bool(settings["is_paused"]) if settings else False,
+            deadline=deadline,
+            deadline_epoch=_deadline_epoch(deadline),
+        )
+        logger.info(f"🧠 Election state loaded: #{election_id} (generation {generation})")
+
+
+def _deadline_epoch(deadline):
+    """ISO deadline (server local time) -> epoch seconds, None if unset or unparseable."""
+    if not deadline:
+        return None
+    try:
+        return datetime.fromisoformat(deadline).timestamp()
+    except ValueError:
+        logger.warning(f"⚠️ Ignoring unparseable deadline: {deadline}")
+        return None
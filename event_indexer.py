@@ -0,0 +1,252 @@
+import logging
+import threading
+from eth_utils import keccak
+
+import db
+from leases import try_acquire_lease
+
+logger = logging.getLogger(__name__)
+
+# topic0 of `event Voted(uint256 indexed candidateId)`
+VOTED_TOPIC = "0x" + keccak(text="Voted(uint256)").hex()
+
+CURSOR_KEY = "vote_indexer_cursor"
+HEAD_KEY = "vote_indexer_head"
+
+
+def _hex(value):
+    """HexBytes/bytes/str -> 0x-prefixed lowercase hex string."""
+    if isinstance(value, (bytes, bytearray)):
+        value = value.hex()
+    value = str(value).lower()
+    return value if value.startswith("0x") else "0x" + value
+
+
+# ==========================================================
+# 🔎 VOTED EVENT INDEXER (eth_getLogs -> local tallies)
+# ==========================================================
+class VoteIndexer:
+    """Follows the contract's Voted events into SQLite so tallies are a local read.
+
+    Every event is stored once in `vote_events` (keyed by block + log index) and
+    added to the running counters in `candidate_tallies`. The hashes of recently
+    indexed blocks are kept in `indexed_blocks`; if the chain no longer agrees with
+    them, events above the fork point are rolled back and indexed again.
+    """
+
+    LEASE_NAME = "vote_indexer"
+
+    def __init__(self, chain, db_path, start_block=0,
+                 reorg_depth=12, chunk_size=2000, interval=15.0):
+        self.chain = chain
+        self.db_path = db_path
+        self.start_block = start_block
+        self.reorg_depth = reorg_depth
+        self.chunk_size = chunk_size
+        self.interval = interval
+        self.head = None   # Latest chain height seen by this process
+        self._stop = threading.Event()
+
+    def _connect(self):
+        return db.connect(self.db_path)
+
+    # ---------------- READ SIDE ----------------
+    def cursor(self):
+        """Last fully indexed block (start_block - 1 before the first run)."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM system_config WHERE key = ?", (CURSOR_KEY,)).fetchone()
+            return int(row["value"]) if row else self.start_block - 1
+        finally:
+            conn.close()
+
+    def known_head(self):
+        """Chain height last seen by the indexer, shared through the DB (None before the first poll)."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM system_config WHERE key = ?", (HEAD_KEY,)).fetchone()
+            return int(row["value"]) if row else None
+        finally:
+            conn.close()
+
+    def tallies(self):
+        """All-time vote count per candidate ID."""
+        conn = self._connect()
+        try:
+            return {r["candidate_id"]: r["votes"] for r in conn.execute("SELECT candidate_id, votes FROM candidate_tallies")}
+        finally:
+            conn.close()
+
+    def tallies_between(self, from_block=None, to_block=None):
+        """Vote count per candidate ID for events inside [from_block, to_block] (None = open end)."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                """SELECT candidate_id, COUNT(*) AS n FROM vote_events
+                   WHERE block_number >= COALESCE(?, 0) AND block_number <= COALESCE(?, block_number)
+                   GROUP BY candidate_id""",
+                (from_block, to_block)
+            ).fetchall()
+            return {r["candidate_id"]: r["n"] for r in rows}
+        finally:
+            conn.close()
+
+    def lag(self):
+        """Blocks behind the chain head (None until the first poll)."""
+        if self.head is None:
+            return None
+        return max(0, self.head - self.cursor())
+
+    def status(self):
+        """Snapshot for the admin dashboard."""
+        return {"cursor": self.cursor(), "head": self.head, "lag": self.lag()}
+
+    # ---------------- BACKGROUND LOOP ----------------
+    def start(self):
+        threading.Thread(target=self._run, name="vote-indexer", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                caught_up = self.run_once()
+            except Exception as e:
+                logger.error(f"⚠️ Vote indexer failed: {e}")
+                caught_up = True
+            # Keep going without sleeping while there is a backlog
+            if caught_up:
+                self._stop.wait(self.interval)
+
+    def run_once(self):
+        """Indexes one chunk. Returns True when the cursor has reached the chain head."""
+        if not try_acquire_lease(self.db_path, self.LEASE_NAME, ttl=max(self.interval * 4, 60)):
+            self.head = self.chain.block_number()
+            return True
+
+        self.head = self.chain.block_number()
+        self._save_head()
+        cursor = self.cursor()
+        if cursor >= self.start_block:
+            cursor = self._handle_reorg(cursor)
+        if cursor >= self.head:
+            return True
+
+        from_block = cursor + 1
+        to_block = min(self.head, cursor + self.chunk_size)
+        logs = self.chain.get_vote_events(from_block, to_block)
+        end_hash = self.chain.block_hash(to_block)
+        added = self._store(logs, to_block, end_hash)
+
+        if added:
+            logger.info(f"🔎 Indexed {added} vote event(s) in blocks {from_block}-{to_block}")
+        return to_block >= self.head
+
+    def _save_head(self):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO system_config (key, value) VALUES (?, ?)",
+                (HEAD_KEY, str(self.head))
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _store(self, logs, to_block, end_hash):
+        """Writes events, counters, block hashes and the new cursor in ONE transaction."""
+        conn = self._connect()
+        added = 0
+        try:
+            for log in logs:
+                candidate_id = int(_hex(log["topics"][1]), 16)
+                cur = conn.execute(
+                    """INSERT OR IGNORE INTO vote_events
+                       (block_number, log_index, block_hash, tx_hash, candidate_id)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    (log["blockNumber"], log["logIndex"], _hex(log["blockHash"]),
+                     _hex(log["transactionHash"]), candidate_id)
+                )
+                if cur.rowcount:
+                    added += 1
+                    conn.execute(
+                        """INSERT INTO candidate_tallies (candidate_id, votes) VALUES (?, 1)
+                           ON CONFLICT(candidate_id) DO UPDATE SET votes = votes + 1""",
+                        (candidate_id,)
+                    )
+                conn.execute(
+                    "INSERT OR REPLACE INTO indexed_blocks (block_number, block_hash) VALUES (?, ?)",
+                    (log["blockNumber"], _hex(log["blockHash"]))
+                )
+
+            conn.execute(
+                "INSERT OR REPLACE INTO indexed_blocks (block_number, block_hash) VALUES (?, ?)",
+                (to_block, end_hash)
+            )
+            # Only blocks inside the reorg window are worth remembering
+            conn.execute("DELETE FROM indexed_blocks WHERE block_number < ?", (to_block - self.reorg_depth,))
+            conn.execute(
+                "INSERT OR REPLACE INTO system_config (key, value) VALUES (?, ?)",
+                (CURSOR_KEY, str(to_block))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return added
+
+    def _handle_reorg(self, cursor):
+        """Checks recent block hashes against the chain and rewinds past a fork. Returns the cursor."""
+        conn = self._connect()
+        try:
+            known = conn.execute(
+                "SELECT block_number, block_hash FROM indexed_blocks WHERE block_number <= ? ORDER BY block_number DESC",
+                (cursor,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        fork_point = None
+        for row in known:
+            if self.chain.block_hash(row["block_number"]) == row["block_hash"]:
+                if row["block_number"] == cursor:
+                    return cursor  # Common case: tip still matches
+                fork_point = row["block_number"]
+                break
+
+        if fork_point is None:
+            # Nothing matched inside the window -> rewind the full depth
+            fork_point = max(self.start_block - 1, cursor - self.reorg_depth)
+
+        logger.warning(f"🔀 Reorg detected: rewinding vote index from block {cursor} to {fork_point}")
+        self._rollback(fork_point)
+        return fork_point
+
+    def _rollback(self, fork_point):
+        """Removes every event above `fork_point` and takes it out of the counters."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT candidate_id, COUNT(*) AS n FROM vote_events WHERE block_number > ? GROUP BY candidate_id",
+                (fork_point,)
+            ).fetchall()
+            for r in rows:
+                conn.execute(
+                    "UPDATE candidate_tallies SET votes = votes - ? WHERE candidate_id = ?",
+                    (r["n"], r["candidate_id"])
+                )
+            conn.execute("DELETE FROM vote_events WHERE block_number > ?", (fork_point,))
+            conn.execute("DELETE FROM indexed_blocks WHERE block_number > ?", (fork_point,))
+            conn.execute(
+                "INSERT OR REPLACE INTO system_config (key, value) VALUES (?, ?)",
+                (CURSOR_KEY, str(fork_point))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
@@ -0,0 +1,154 @@
+import time
+import logging
+import threading
+from statistics import median
+
+logger = logging.getLogger(__name__)
+
+# Reward percentiles sampled from eth_feeHistory
+PERCENTILES = [10, 25, 50, 75, 90]
+
+# Lowest tip we ever offer (0.1 gwei): some nodes ignore 0-tip transactions entirely
+MIN_PRIORITY_FEE = 10**8
+
+# Max base fee growth per full block under EIP-1559
+BASE_FEE_GROWTH = 1.125
+
+# Nodes only accept a same-nonce replacement that pays at least 10% more
+REPLACEMENT_BUMP = 1.125
+
+
+def tip_percentile(target_blocks):
+    """How aggressive the tip is for the wanted inclusion latency (1 = next block)."""
+    if target_blocks <= 1:
+        return 90
+    if target_blocks == 2:
+        return 75
+    if target_blocks <= 4:
+        return 50
+    return 25
+
+
+def bump_fees(previous, current, factor=REPLACEMENT_BUMP):
+    """Fee fields for re-sending a stuck transaction sent with `previous`:
+    the `current` estimate, but never less than `factor` x every old field."""
+    if "gasPrice" in previous:
+        return {'gasPrice': max(int(previous["gasPrice"] * factor) + 1, current.get("gasPrice", 0))}
+    tip = max(int(previous["maxPriorityFeePerGas"] * factor) + 1, current.get("maxPriorityFeePerGas", 0))
+    max_fee = max(int(previous["maxFeePerGas"] * factor) + 1, current.get("maxFeePerGas", 0), tip)
+    return {'type': 2, 'maxFeePerGas': max_fee, 'maxPriorityFeePerGas': tip}
+
+
+# ==========================================================
+# ⛽ FEE ORACLE (eth_feeHistory sampled in the background)
+# ==========================================================
+class FeeOracle:
+    """Keeps current EIP-1559 fee estimates in memory so sending a vote needs no fee RPC.
+
+    Every `interval` seconds one eth_feeHistory call covers the last `history_blocks`
+    blocks; when a new block has appeared, the next base fee and the median of each
+    priority-fee percentile are stored. `fees()` turns them into type-2 transaction
+    fields aimed at inclusion within `target_blocks` blocks. Chains without a base fee
+    fall back to the legacy `gasPrice * legacy_multiplier`.
+    """
+
+    def __init__(self, chain, target_blocks=1, history_blocks=20, interval=4.0, legacy_multiplier=1.5):
+        self.chain = chain
+        self.target_blocks = max(1, target_blocks)
+        self.history_blocks = history_blocks
+        self.interval = interval
+        self.legacy_multiplier = legacy_multiplier
+        # Estimates older than this are refreshed inline (thread not running, RPC outage)
+        self.max_age = max(interval * 5, 30.0)
+
+        self.base_fee = None        # Base fee of the NEXT block (Wei)
+        self.tips = {}              # percentile -> median tip over the sampled blocks (Wei)
+        self.gas_price = None       # Legacy chains only
+        self.newest_block = None
+        self.updated_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # ---------------- READ SIDE ----------------
+    def fees(self, target_blocks=None):
+        """Fee fields to merge into a transaction dict (`{**oracle.fees(), ...}`)."""
+        if time.monotonic() - self.updated_at > self.max_age:
+            with self._lock:
+                if time.monotonic() - self.updated_at > self.max_age:
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        if self.base_fee is None and self.gas_price is None:
+                            raise  # Nothing to fall back on
+                        logger.warning(f"⚠️ Fee refresh failed, using estimates from block {self.newest_block}: {e}")
+
+        target = max(1, target_blocks or self.target_blocks)
+        if self.base_fee is None:
+            return {'gasPrice': int(self.gas_price * self.legacy_multiplier)}
+
+        tip = max(self.tips.get(tip_percentile(target), 0), MIN_PRIORITY_FEE)
+        # Room for the base fee to rise in every block until the target (+1 for the block in flight)
+        max_fee = int(self.base_fee * BASE_FEE_GROWTH ** target) + tip
+        return {'type': 2, 'maxFeePerGas': max_fee, 'maxPriorityFeePerGas': tip}
+
+    def status(self):
+        """Snapshot for the admin dashboard."""
+        return {
+            "block": self.newest_block,
+            "base_fee": self.base_fee,
+            "tips": self.tips,
+            "gas_price": self.gas_price,
+            "target_blocks": self.target_blocks,
+            "age": round(time.monotonic() - self.updated_at, 1) if self.updated_at else None,
+        }
+
+    # ---------------- SAMPLING ----------------
+    def refresh(self):
+        """One eth_feeHistory call. Returns True when a new block was sampled."""
+        try:
+            history = self.chain.fee_history(self.history_blocks, PERCENTILES)
+            base_fees = history.get("baseFeePerGas") or []
+        except Exception as e:
+            if self.base_fee is not None:
+                raise  # Transient RPC failure on an EIP-1559 chain: keep the estimates we have
+            logger.debug(f"eth_feeHistory unavailable ({e}), using legacy gas price")
+            base_fees = []
+
+        if not base_fees or not any(base_fees):
+            # Pre-London chain -> legacy pricing
+            self.gas_price = self.chain.gas_price()
+            self.base_fee = None
+            self.updated_at = time.monotonic()
+            return True
+
+        newest = history["oldestBlock"] + len(history["gasUsedRatio"]) - 1
+        self.updated_at = time.monotonic()
+        if newest == self.newest_block:
+            return False
+
+        # Blocks with no transactions report 0 tips and would drag the medians down
+        rewards = [r for r, used in zip(history.get("reward") or [], history["gasUsedRatio"]) if used > 0]
+        self.tips = {
+            p: int(median(r[i] for r in rewards)) if rewards else 0
+            for i, p in enumerate(PERCENTILES)
+        }
+        self.base_fee = base_fees[-1]   # feeHistory includes the block after `newest`
+        self.newest_block = newest
+        return True
+
+    # ---------------- BACKGROUND LOOP ----------------
+    def start(self):
+        threading.Thread(target=self._run, name="fee-oracle", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self._lock:
+                    if self.refresh() and self.base_fee is not None:
+                        logger.debug(f"⛽ Block {self.newest_block}: base fee {self.base_fee}, tips {self.tips}")
+            except Exception as e:
+                logger.error(f"⚠️ Fee oracle refresh failed: {e}")
+            self._stop.wait(self.interval)
@@ -0,0 +1,39 @@
+import os
+import time
+import uuid
+import socket
+
+import db
+
+# Identifies this process when several gunicorn workers compete for a lease
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+# ==========================================================
+# 🎟️ CROSS-WORKER LEASES (Only one worker runs a singleton job)
+# ==========================================================
+def try_acquire_lease(db_path, name, ttl, owner=PROCESS_OWNER):
+    """Takes or renews the named lease. Returns True if `owner` holds it for `ttl` seconds."""
+    now = time.time()
+    conn = db.connect(db_path)
+    try:
+        cur = conn.execute(
+            """INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)
+               ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+               WHERE leases.owner = excluded.owner OR leases.expires_at < ?""",
+            (name, owner, now + ttl, now)
+        )
+        conn.commit()
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def release_lease(db_path, name, owner=PROCESS_OWNER):
+    """Gives the lease up early so another worker can take over."""
+    conn = db.connect(db_path)
+    try:
+        conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,121 @@
+import time
+import logging
+import threading
+
+import db
+
+logger = logging.getLogger(__name__)
+
+# Node error fragments that mean our view of the nonce sequence is wrong
+NONCE_ERRORS = ("nonce too low", "nonce too high", "already known", "replacement transaction underpriced")
+
+
+# ==========================================================
+# 🔢 LOCAL NONCE MANAGER (shared through SQLite)
+# ==========================================================
+class NonceManager:
+    """Hands out nonces for one wallet without asking the node for every transaction.
+
+    The next free nonce lives in the `nonce_state` table so every gunicorn worker
+    draws from the same sequence. The chain is only consulted once per process and
+    again whenever a transaction is rejected.
+    """
+
+    def __init__(self, chain, address, db_path):
+        self.chain = chain
+        self.address = address
+        self.db_path = db_path
+        self._synced = False
+        self._sync_lock = threading.Lock()
+
+    def _connect(self):
+        return db.connect(self.db_path)
+
+    def _chain_nonce(self):
+        return self.chain.pending_nonce(self.address)
+
+    def sync(self, chain_nonce=None):
+        """Initial sync: never moves the shared counter backwards.
+
+        `chain_nonce` may be passed in when it was already fetched (batched preflight).
+        """
+        if chain_nonce is None:
+            chain_nonce = self._chain_nonce()
+        conn = self._connect()
+        try:
+            conn.execute(
+                """INSERT INTO nonce_state (address, next_nonce, synced_at) VALUES (?, ?, ?)
+                   ON CONFLICT(address) DO UPDATE
+                   SET next_nonce = MAX(next_nonce, excluded.next_nonce), synced_at = excluded.synced_at""",
+                (self.address, chain_nonce, time.time())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._synced = True
+        logger.info(f"🔢 Nonce sync for {self.address}: chain pending = {chain_nonce}")
+
+    def resync(self, reason=""):
+        """Hard resync after a rejected/stuck transaction: trust the chain's pending count."""
+        chain_nonce = self._chain_nonce()
+        conn = self._connect()
+        try:
+            conn.execute(
+                """INSERT INTO nonce_state (address, next_nonce, synced_at) VALUES (?, ?, ?)
+                   ON CONFLICT(address) DO UPDATE
+                   SET next_nonce = excluded.next_nonce, synced_at = excluded.synced_at""",
+                (self.address, chain_nonce, time.time())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._synced = True
+        logger.warning(f"🔄 Nonce RESYNC for {self.address} -> {chain_nonce} ({reason})")
+
+    def sync_if_needed(self, chain_nonce=None):
+        """Runs the initial sync once per process."""
+        if not self._synced:
+            with self._sync_lock:
+                if not self._synced:
+                    self.sync(chain_nonce)
+
+    def allocate(self):
+        """Reserves and returns the next nonce (one local SQLite write, no RPC)."""
+        self.sync_if_needed()
+
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "UPDATE nonce_state SET next_nonce = next_nonce + 1 WHERE address = ? RETURNING next_nonce - 1",
+                (self.address,)
+            ).fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+        return row[0]
+
+    def release(self, nonce, error=None):
+        """Called when a transaction with `nonce` was NOT accepted by the node.
+
+        If nobody allocated after us we simply hand the nonce back; otherwise later
+        transactions are stuck behind a gap and we resync from the chain.
+        """
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "UPDATE nonce_state SET next_nonce = ? WHERE address = ? AND next_nonce = ?",
+                (nonce, self.address, nonce + 1)
+            )
+            conn.commit()
+            returned = cur.rowcount == 1
+        finally:
+            conn.close()
+
+        nonce_problem = error is not None and any(e in str(error).lower() for e in NONCE_ERRORS)
+        if not returned or nonce_problem:
+            try:
+                self.resync(f"nonce {nonce} rejected: {error}")
+            except Exception as e:
+                # Next allocation will fail the same way and retry the resync
+                self._synced = False
+                logger.error(f"❌ Nonce resync failed for {self.address}: {e}")
@@ -0,0 +1,152 @@
+import time
+import logging
+import threading
+from web3.exceptions import TimeExhausted
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending:
+    __slots__ = ("event", "receipt", "waiters", "fresh")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.receipt = None
+        self.waiters = 0
+        self.fresh = True   # Not looked up yet (may already be mined, e.g. a resumed job)
+
+
+# ==========================================================
+# 🧾 RECEIPT WATCHER (One poller per process for every pending tx)
+# ==========================================================
+class ReceiptWatcher:
+    """Replaces per-caller `wait_for_transaction_receipt` loops.
+
+    Callers register a hash with `wait()` and sleep on an event. A single thread
+    polls the block number every `interval` seconds and, for each new block, looks
+    up ALL pending receipts in one JSON-RPC batch, so RPC load follows the block
+    rate instead of the number of votes in flight.
+
+    Newly registered hashes (which may already be mined, e.g. a resumed job) wake
+    the thread, but only those are looked up, and at most once per `interval`:
+    a burst of submissions costs one extra batch, not one request per vote.
+    """
+
+    def __init__(self, chain, interval=2.0):
+        self.chain = chain
+        self.interval = interval
+        self.last_block = None
+        self._polled_at = float("-inf")   # Last block-number check
+        self._fresh_at = float("-inf")    # Last early lookup of newly registered hashes
+        self._pending = {}          # tx hash (lowercase 0x) -> _Pending
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------------- CALLER SIDE ----------------
+    def wait(self, tx_hash, timeout=300):
+        """Blocks until `tx_hash` is mined and returns its receipt (raises TimeExhausted)."""
+        tx_hash = tx_hash.lower()
+        with self._lock:
+            entry = self._pending.get(tx_hash)
+            if entry is None:
+                entry = self._pending[tx_hash] = _Pending()
+            entry.waiters += 1
+        self._ensure_running()
+        self._wake.set()
+
+        try:
+            if not entry.event.wait(timeout):
+                raise TimeExhausted(f"Transaction {tx_hash} is not in the chain after {timeout} seconds")
+            return entry.receipt
+        finally:
+            with self._lock:
+                entry.waiters -= 1
+                if entry.waiters == 0:
+                    self._pending.pop(tx_hash, None)
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def status(self):
+        """Snapshot for the admin dashboard."""
+        return {"pending": self.pending_count(), "block": self.last_block}
+
+    # ---------------- BACKGROUND LOOP ----------------
+    def _ensure_running(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="receipt-watcher", daemon=True)
+                self._thread.start()
+
+    def start(self):
+        self._ensure_running()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Cleared BEFORE the pass, so a registration made during it still wakes the next wait
+            self._wake.clear()
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"⚠️ Receipt watcher failed: {e}")
+            if not self._pending:
+                # Idle: sleep until wait() registers a hash (or stop())
+                self._wake.wait()
+                continue
+            # New registrations wake us early so already-mined hashes resolve at once
+            self._wake.wait(max(0.0, self._polled_at + self.interval - time.monotonic()))
+
+    def run_once(self):
+        """Every `interval`: all pending receipts if a new block arrived, else only the new
+        hashes. Woken early: only the new hashes, if none were looked up in the last `interval`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending:
+                return 0
+            has_fresh = any(e.fresh and not e.event.is_set() for e in self._pending.values())
+
+        block = self.last_block
+        if now - self._polled_at >= self.interval:
+            self._polled_at = now
+            block = self.chain.block_number()
+            new_block = block != self.last_block
+            self.last_block = block
+        elif has_fresh and now - self._fresh_at >= self.interval:
+            new_block = False
+        else:
+            return 0
+        if not new_block and not has_fresh:
+            return 0
+
+        with self._lock:
+            hashes = [h for h, e in self._pending.items() if not e.event.is_set() and (new_block or e.fresh)]
+            for h in hashes:
+                self._pending[h].fresh = False
+        if not new_block:
+            self._fresh_at = now
+        if not hashes:
+            return 0
+
+        receipts = self.chain.get_receipts(hashes)
+        resolved = 0
+        with self._lock:
+            for tx_hash, receipt in zip(hashes, receipts):
+                entry = self._pending.get(tx_hash)
+                if receipt is None or entry is None:
+                    continue  # Still pending (or its waiter timed out meanwhile)
+                entry.receipt = receipt
+                entry.event.set()
+                resolved += 1
+        if resolved:
+            logger.info(f"🧾 Block {block}: {resolved} of {len(hashes)} pending transaction(s) confirmed")
+        return resolved
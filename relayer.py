@@ -0,0 +1,136 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from eth_account import Account
+
+from nonce_manager import NonceManager
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# 🔑 RELAYER KEYS (Several admin hot wallets = several nonce lanes)
+# ==========================================================
+def load_relayer_keys(private_keys=None, mnemonic=None, lanes=1, fallback_key=None):
+    """Returns the list of funding keys from a comma-separated list, an HD seed, or the single admin key."""
+    if private_keys:
+        return [k.strip() for k in private_keys.split(",") if k.strip()]
+    if mnemonic:
+        Account.enable_unaudited_hdwallet_features()
+        return [
+            Account.from_mnemonic(mnemonic, account_path=f"m/44'/60'/0'/0/{i}").key
+            for i in range(lanes)
+        ]
+    if fallback_key:
+        return [fallback_key]
+    return []
+
+
+class RelayerLane:
+    """One funding wallet with its own nonce sequence."""
+
+    def __init__(self, chain, private_key, db_path, pending_window=30.0):
+        self.account = Account.from_key(private_key)
+        self.address = self.account.address
+        self.nonces = NonceManager(chain, self.address, db_path)
+        self.balance = None         # Wei, refreshed in the background
+        self.pending_window = pending_window
+        self._active = 0            # Transactions being signed/sent right now
+        self._recent = []           # Send times of transactions that are probably still pending
+        self._lock = threading.Lock()
+
+    def depth(self):
+        """Approximate queue depth: in-progress sends plus sends within the pending window."""
+        cutoff = time.time() - self.pending_window
+        with self._lock:
+            self._recent = [t for t in self._recent if t > cutoff]
+            return self._active + len(self._recent)
+
+    def _begin(self):
+        with self._lock:
+            self._active += 1
+
+    def _end(self, sent):
+        with self._lock:
+            self._active -= 1
+            if sent:
+                self._recent.append(time.time())
+
+
+# ==========================================================
+# 🚦 LANE SCHEDULER
+# ==========================================================
+class LaneScheduler:
+    """Spreads funding transactions across lanes by queue depth and balance."""
+
+    def __init__(self, chain, lanes, min_balance_wei=0, balance_interval=30.0):
+        self.chain = chain
+        self.lanes = lanes
+        self.min_balance_wei = min_balance_wei
+        self.balance_interval = balance_interval
+        self._pick_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def pick(self):
+        """Least-loaded lane that can afford another transaction (unknown balance counts as OK)."""
+        funded = [l for l in self.lanes if l.balance is None or l.balance >= self.min_balance_wei]
+        if not funded:
+            raise RuntimeError("All relayer wallets are below the minimum balance")
+        return min(funded, key=lambda l: (l.depth(), -(l.balance or 0)))
+
+    @contextmanager
+    def lane(self, address=None):
+        """Reserves a lane for one send: `with scheduler.lane() as lane: ...`.
+
+        `address` asks for that specific lane (re-sending one of its transactions).
+        """
+        with self._pick_lock:
+            if address is None:
+                lane = self.pick()
+            else:
+                lane = next((l for l in self.lanes if l.address.lower() == address.lower()), None)
+                if lane is None:
+                    raise RuntimeError(f"{address} is not a relayer lane")
+            lane._begin()
+        sent = False
+        try:
+            yield lane
+            sent = True
+        finally:
+            lane._end(sent)
+
+    def refresh_balances(self):
+        """Balances AND pending nonces of every lane in one backend call (one JSON-RPC batch on a node).
+
+        The first refresh doubles as the nonce preflight, so no lane has to ask the
+        node for its transaction count on the vote path.
+        """
+        states = self.chain.account_states([lane.address for lane in self.lanes])
+        for lane in self.lanes:
+            lane.balance, chain_nonce = states[lane.address]
+            lane.nonces.sync_if_needed(chain_nonce)
+
+    def start(self):
+        threading.Thread(target=self._run, name="relayer-balances", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_balances()
+                low = [l.address for l in self.lanes if l.balance < self.min_balance_wei]
+                if low:
+                    logger.warning(f"⚠️ Relayer wallets low on funds: {low}")
+            except Exception as e:
+                logger.error(f"⚠️ Relayer balance refresh failed: {e}")
+            self._stop.wait(self.balance_interval)
+
+    def status(self):
+        """Per-lane snapshot for the admin dashboard."""
+        return [
+            {"address": l.address, "depth": l.depth(), "balance": l.balance}
+            for l in self.lanes
+        ]
@@ -0,0 +1,84 @@
+import json
+import time
+import logging
+import threading
+
+import db
+from leases import try_acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# 🗃️ SHARED TTL CACHE (One refresh at a time across all workers)
+# ==========================================================
+class SharedTTLCache:
+    """JSON values cached in the `results_cache` table so every gunicorn worker shares them.
+
+    When an entry expires only one caller refreshes it: threads of the same worker
+    queue on a lock, other workers lose the lease and serve the stale value meanwhile.
+    """
+
+    def __init__(self, db_path, ttl=5.0, refresh_timeout=30.0):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.refresh_timeout = refresh_timeout
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        return db.connect(self.db_path)
+
+    def _read(self, key):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT payload, computed_at FROM results_cache WHERE name = ?", (key,)).fetchone()
+            return (json.loads(row["payload"]), row["computed_at"]) if row else (None, 0)
+        finally:
+            conn.close()
+
+    def _write(self, key, value):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO results_cache (name, payload, computed_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, key, compute):
+        """Returns the cached value for `key`, calling `compute()` at most once per TTL."""
+        value, computed_at = self._read(key)
+        if value is not None and time.time() - computed_at < self.ttl:
+            return value
+
+        with self._lock:
+            # Another thread may have refreshed it while we waited
+            value, computed_at = self._read(key)
+            if value is not None and time.time() - computed_at < self.ttl:
+                return value
+
+            lease = f"cache_refresh:{key}"
+            deadline = time.time() + self.refresh_timeout
+            while not try_acquire_lease(self.db_path, lease, ttl=self.refresh_timeout):
+                if value is not None:
+                    return value  # Stale but good enough while another worker refreshes
+                if time.time() > deadline:
+                    break  # Refresher died mid-flight -> compute it ourselves
+                time.sleep(0.1)
+                value, computed_at = self._read(key)
+                if value is not None and time.time() - computed_at < self.ttl:
+                    return value
+
+            try:
+                fresh = compute()
+                self._write(key, fresh)
+                return fresh
+            except Exception as e:
+                if value is None:
+                    raise
+                logger.warning(f"⚠️ Refresh of {key} failed, serving stale value: {e}")
+                return value
+            finally:
+                release_lease(self.db_path, lease)
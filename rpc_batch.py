@@ -0,0 +1,94 @@
+import itertools
+import logging
+import requests
+
+from rpc_pool import HEDGED_METHODS
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive session: the batch endpoint is hit every few seconds
+_session = requests.Session()
+_ids = itertools.count(1)
+
+
+class RPCBatchError(Exception):
+    """One call inside a batch came back with a JSON-RPC error."""
+
+
+# ==========================================================
+# 📦 JSON-RPC BATCHING (Many calls, one HTTP round-trip)
+# ==========================================================
+def rpc_batch(w3, calls, timeout=30):
+    """Sends `[(method, params), ...]` in one HTTP request and returns the results in the same order.
+
+    A failed call is returned as an RPCBatchError instead of raising, so one bad
+    item does not throw away the rest of the batch.
+    """
+    if not calls:
+        return []
+
+    post_json = getattr(w3.provider, "post_json", None)
+    endpoint = getattr(w3.provider, "endpoint_uri", None)
+    if not post_json and not endpoint:
+        # Not an HTTP provider (IPC/tester) -> plain sequential requests
+        return [_unwrap(w3.provider.make_request(method, params)) for method, params in calls]
+
+    payload = [
+        {"jsonrpc": "2.0", "id": next(_ids), "method": method, "params": list(params)}
+        for method, params in calls
+    ]
+    if post_json:
+        # Pooled provider: healthiest endpoint, hedged when every call is a plain read
+        body = post_json(payload, hedge=all(method in HEDGED_METHODS for method, _ in calls))
+    else:
+        response = _session.post(str(endpoint), json=payload, timeout=timeout)
+        response.raise_for_status()
+        body = response.json()
+    if isinstance(body, dict):
+        # Some nodes answer a whole batch with a single error object
+        raise RPCBatchError(body.get("error", body))
+
+    # Nodes may answer out of order -> demultiplex by id
+    by_id = {item.get("id"): item for item in body}
+    return [_unwrap(by_id.get(req["id"], {"error": "missing response"})) for req in payload]
+
+
+def _unwrap(item):
+    if "error" in item:
+        return RPCBatchError(item["error"])
+    return item.get("result")
+
+
+def hex_int(value):
+    """JSON-RPC quantity ("0x1a") -> int."""
+    return int(value, 16) if isinstance(value, str) else value
+
+
+def batch_reads(w3, calls, optional=(), timeout=30):
+    """Named form of rpc_batch for preflight reads.
+
+    `batch_reads(w3, {"balance": ("eth_getBalance", [addr, "latest"]), ...})`
+    returns `{"balance": "0x...", ...}` and raises the first RPCBatchError, except
+    for the names in `optional`, which come back as None when they fail.
+    """
+    names = list(calls)
+    results = dict(zip(names, rpc_batch(w3, [calls[name] for name in names], timeout=timeout)))
+    for name, result in results.items():
+        if isinstance(result, RPCBatchError):
+            if name not in optional:
+                raise RPCBatchError(f"{calls[name][0]} failed: {result}")
+            results[name] = None
+    return results
+
+
+def account_states(w3, addresses):
+    """`{address: (balance, pending nonce)}` for many accounts in ONE round-trip."""
+    calls = {}
+    for address in addresses:
+        calls[f"balance:{address}"] = ("eth_getBalance", [address, "latest"])
+        calls[f"nonce:{address}"] = ("eth_getTransactionCount", [address, "pending"])
+    results = batch_reads(w3, calls)
+    return {
+        a: (hex_int(results[f"balance:{a}"]), hex_int(results[f"nonce:{a}"]))
+        for a in addresses
+    }
@@ -0,0 +1,235 @@
+import time
+import logging
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+from eth_utils import keccak
+from web3.providers.base import JSONBaseProvider
+
+logger = logging.getLogger(__name__)
+
+# Reads that return the same answer on any node -> safe to send twice (hedging)
+HEDGED_METHODS = {
+    "eth_blockNumber", "eth_chainId", "net_version", "eth_call", "eth_estimateGas",
+    "eth_getBalance", "eth_getCode", "eth_getTransactionCount", "eth_gasPrice",
+    "eth_feeHistory", "eth_maxPriorityFeePerGas", "eth_getBlockByNumber", "eth_getBlockByHash",
+    "eth_getLogs", "eth_getTransactionByHash", "eth_getTransactionReceipt",
+}
+# Sent to several endpoints at once so one lagging node can't hold a vote back
+BROADCAST_METHODS = {"eth_sendRawTransaction"}
+
+# Errors that mean "this node is overloaded", not "your request is wrong"
+RATE_LIMIT_CODES = {-32005, 429}
+
+EWMA_ALPHA = 0.2
+
+
+class EndpointError(Exception):
+    """Transport failure, HTTP error or rate limit from one endpoint (try another one)."""
+
+
+# ==========================================================
+# 📡 RPC ENDPOINT (Keep-alive session + health statistics)
+# ==========================================================
+class Endpoint:
+    """One JSON-RPC URL with its own keep-alive session, EWMA latency and EWMA error rate."""
+
+    def __init__(self, url, timeout=60, pool_size=20):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.latency = None         # EWMA seconds (None until the first answer)
+        self.error_rate = 0.0       # EWMA of failures (0..1)
+        self.failures = 0           # Consecutive failures
+        self.down_until = 0.0
+        self.requests = 0
+        self._samples = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    def record(self, ok, elapsed):
+        with self._lock:
+            self.requests += 1
+            self.error_rate += EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+            if ok:
+                self.failures = 0
+                self._samples.append(elapsed)
+                self.latency = elapsed if self.latency is None else self.latency + EWMA_ALPHA * (elapsed - self.latency)
+            else:
+                self.failures += 1
+                if self.failures >= 3:
+                    # Back off a little longer after every further failure
+                    self.down_until = time.monotonic() + min(60.0, 5.0 * (self.failures - 2))
+
+    def p95(self):
+        with self._lock:
+            if len(self._samples) < 20:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def is_up(self):
+        return time.monotonic() >= self.down_until
+
+    def score(self):
+        """Lower is better. Unknown latency scores 0 so new endpoints get tried."""
+        return (self.latency or 0.0) * (1.0 + 20.0 * self.error_rate)
+
+    def post(self, payload):
+        """Sends a JSON-RPC request (or batch) and returns the decoded body."""
+        started = time.monotonic()
+        try:
+            response = self.session.post(self.url, json=payload, timeout=(5, self.timeout))
+            if response.status_code == 429 or response.status_code >= 500:
+                raise EndpointError(f"HTTP {response.status_code} from {self.url}")
+            response.raise_for_status()
+            body = response.json()
+            error = body.get("error") if isinstance(body, dict) else None
+            if isinstance(error, dict) and (error.get("code") in RATE_LIMIT_CODES or "rate limit" in str(error.get("message", "")).lower()):
+                raise EndpointError(f"Rate limited by {self.url}: {error.get('message')}")
+        except EndpointError:
+            self.record(False, time.monotonic() - started)
+            raise
+        except Exception as e:
+            self.record(False, time.monotonic() - started)
+            raise EndpointError(f"{self.url}: {e}") from e
+        self.record(True, time.monotonic() - started)
+        return body
+
+    def status(self):
+        return {
+            "url": self.url,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "p95_ms": round(self.p95() * 1000, 1) if self.p95() is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "up": self.is_up(),
+            "requests": self.requests,
+        }
+
+
+# ==========================================================
+# 🌐 POOLED PROVIDER (Failover, hedged reads, broadcast sends)
+# ==========================================================
+class PooledHTTPProvider(JSONBaseProvider):
+    """web3 provider over several RPC URLs.
+
+    Every call goes to the healthiest endpoint (EWMA latency weighted by error rate).
+    Idempotent reads are hedged: if the first endpoint hasn't answered after its p95
+    latency, the same request goes to the runner-up and the first answer wins.
+    Raw transactions are broadcast to the best `broadcast` endpoints. Anything else
+    fails over to the next endpoint on transport errors and rate limits.
+    """
+
+    def __init__(self, urls, timeout=60, hedge_min=0.05, hedge_max=2.0, broadcast=3, pool_size=20, **kwargs):
+        super().__init__(**kwargs)
+        if not urls:
+            raise ValueError("PooledHTTPProvider needs at least one RPC URL")
+        self.endpoints = [Endpoint(url, timeout=timeout, pool_size=pool_size) for url in urls]
+        self.hedge_min = hedge_min
+        self.hedge_max = hedge_max
+        self.broadcast = broadcast
+        self._ids = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size * len(urls), thread_name_prefix="rpc-pool")
+
+    def __str__(self):
+        return f"PooledHTTPProvider({[e.url for e in self.endpoints]})"
+
+    @property
+    def endpoint_uri(self):
+        """URL of the currently preferred endpoint."""
+        return self.ranked()[0].url
+
+    def ranked(self):
+        """Endpoints best-first; ones backing off go last (still used if nothing else is up)."""
+        return sorted(self.endpoints, key=lambda e: (not e.is_up(), e.score()))
+
+    # ---------------- web3 PROVIDER API ----------------
+    def make_request(self, method, params):
+        payload = {"jsonrpc": "2.0", "method": method, "params": list(params or []), "id": next(self._ids)}
+        if method in BROADCAST_METHODS:
+            return self._broadcast(payload)
+        return self.post_json(payload, hedge=method in HEDGED_METHODS)
+
+    def is_connected(self, show_traceback=False):
+        try:
+            return "result" in self.make_request("eth_chainId", [])
+        except Exception:
+            if show_traceback:
+                raise
+            return False
+
+    def status(self):
+        """Per-endpoint health for the admin dashboard."""
+        return [e.status() for e in self.ranked()]
+
+    # ---------------- ROUTING ----------------
+    def post_json(self, payload, hedge=False):
+        """Sends a request or batch body; reads may be hedged, everything fails over."""
+        ranked = self.ranked()
+        if hedge and len(ranked) > 1:
+            return self._hedged(payload, ranked)
+        return self._failover(payload, ranked)
+
+    def _failover(self, payload, ranked):
+        last_error = None
+        for endpoint in ranked:
+            try:
+                return endpoint.post(payload)
+            except EndpointError as e:
+                logger.warning(f"⚠️ RPC failover: {e}")
+                last_error = e
+        raise last_error
+
+    def _hedge_delay(self, endpoint):
+        p95 = endpoint.p95()
+        if p95 is None:
+            return self.hedge_max
+        return min(self.hedge_max, max(self.hedge_min, p95))
+
+    def _hedged(self, payload, ranked):
+        primary, backup = ranked[0], ranked[1]
+        running = {self._executor.submit(primary.post, payload)}
+        done, _ = wait(running, timeout=self._hedge_delay(primary))
+        if done and next(iter(done)).exception() is None:
+            return next(iter(done)).result()
+
+        # Primary is slow (or already failed) -> race the runner-up
+        running.add(self._executor.submit(backup.post, payload))
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+        # Both failed -> remaining endpoints one by one
+        return self._failover(payload, ranked[2:]) if len(ranked) > 2 else self._failover(payload, ranked[:1])
+
+    def _broadcast(self, payload):
+        targets = self.ranked()[:max(1, self.broadcast)]
+        futures = [self._executor.submit(e.post, payload) for e in targets]
+        responses = []
+        for future in as_completed(futures):
+            try:
+                body = future.result()
+            except EndpointError:
+                continue
+            if "error" not in body:
+                return body  # First node that accepted it
+            responses.append(body)
+
+        if not responses:
+            raise EndpointError(f"No RPC endpoint accepted the transaction ({len(targets)} tried)")
+        # A node that already has it means another node propagated it first
+        for body in responses:
+            if "already known" in str(body["error"]).lower():
+                raw = payload["params"][0]
+                tx_hash = "0x" + keccak(hexstr=raw).hex()
+                return {"jsonrpc": "2.0", "id": payload["id"], "result": tx_hash}
+        return responses[0]
+
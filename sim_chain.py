@@ -0,0 +1,869 @@
+"""In-process simulated chain running Election.sol, for offline runs of the vote pipeline.
+
+    python -m sim_chain [--port 8545] [--block-time 12] [--latency-ms 50] [--failure-rate 0]
+                        [--revert-rate 0] [--accounts ADDR,ADDR]
+
+`SimulatedChain` keeps balances, nonces, a mempool and the contract state in memory
+and mines a block every `block_time` seconds (EIP-1559 base fee, receipts, logs).
+`SimulatedProvider` is a web3 provider on top of it with injected latency and RPC
+failures; run as a module it serves the same JSON-RPC over HTTP so several gunicorn
+workers can share one chain.
+"""
+import json
+import time
+import heapq
+import random
+import logging
+import argparse
+import itertools
+import threading
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import rlp
+from eth_abi import encode, decode
+from eth_account import Account
+from eth_utils import keccak, to_checksum_address, big_endian_to_int
+from web3.providers.base import JSONBaseProvider
+
+from ballots import ballot_typed_data, multi_ballot_typed_data, recover_typed_data_signer
+from event_indexer import VOTED_TOPIC
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTRACT_ADDRESS = "0x585a1801372e73BabAf4144D306bAF80A7496ae9"
+DEFAULT_CHAIN_ID = 11155111
+BLOCK_GAS_LIMIT = 30_000_000
+INITIAL_BASE_FEE = 10**9            # 1 gwei
+DEFAULT_BALANCE = 100 * 10**18
+
+ROOT_ANCHORED_TOPIC = "0x" + keccak(text="RootAnchored(bytes32,uint256)").hex()
+
+# Election.sol interface: name -> (input types, output types)
+ELECTION_FUNCTIONS = {
+    "vote": (["uint256"], []),
+    "voteFor": (["uint256", "uint256", "bytes"], []),
+    "voteBallot": (["uint256[]"], []),
+    "voteBallotFor": (["uint256[]", "uint256", "bytes"], []),
+    "voteBatch": (["uint256[]", "uint256[]"], []),
+    "anchorRoot": (["bytes32", "uint256"], []),
+    "setRelayer": (["address", "bool"], []),
+    "setCandidateCount": (["uint256"], []),
+    "getVotes": (["uint256"], ["uint256"]),
+    "getVotesBatch": (["uint256[]"], ["uint256[]"]),
+    "getAllVotes": ([], ["uint256[]"]),
+    "votes": (["uint256"], ["uint256"]),
+    "totalVotes": ([], ["uint256"]),
+    "candidateCount": ([], ["uint256"]),
+    "nonces": (["address"], ["uint256"]),
+    "anchoredAt": (["bytes32"], ["uint256"]),
+    "anchoredBallots": ([], ["uint256"]),
+    "owner": ([], ["address"]),
+    "relayers": (["address"], ["bool"]),
+}
+SELECTORS = {
+    keccak(text=f"{name}({','.join(inputs)})")[:4]: name
+    for name, (inputs, _) in ELECTION_FUNCTIONS.items()
+}
+VIEW_FUNCTIONS = {name for name, (_, outputs) in ELECTION_FUNCTIONS.items() if outputs}
+
+# Rough gas costs (close to what the compiled contract uses on Sepolia)
+GAS_TRANSFER = 21000
+GAS_CALL = 28000
+GAS_PER_RECORD = 25000
+GAS_PER_EXTRA_EVENT = 1500
+GAS_SIGNATURE = 20000
+
+
+class SimulatedRPCError(Exception):
+    """JSON-RPC error answered by the simulated node."""
+
+    def __init__(self, message, code=-32000, data=None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+    def to_json(self):
+        error = {"code": self.code, "message": str(self)}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+
+class Revert(SimulatedRPCError):
+    """`require()` failed inside the contract."""
+
+    def __init__(self, reason):
+        data = "0x08c379a0" + encode(["string"], [reason]).hex()   # Error(string)
+        super().__init__(f"execution reverted: {reason}", code=3, data=data)
+        self.reason = reason
+
+
+def _quantity(value):
+    return hex(int(value))
+
+
+def _address(raw):
+    return to_checksum_address(raw) if raw else None
+
+
+def decode_raw_transaction(raw):
+    """Signed legacy / EIP-2930 / EIP-1559 transaction bytes -> dict of its fields."""
+    kind = raw[0]
+    if kind >= 0xc0:
+        nonce, gas_price, gas, to, value, data, v, _, _ = rlp.decode(raw)
+        v = big_endian_to_int(v)
+        chain_id = (v - 35) // 2 if v >= 35 else None
+        max_fee = tip = big_endian_to_int(gas_price)
+        kind = 0
+    elif kind == 1:
+        chain_id, nonce, gas_price, gas, to, value, data, _, _, _, _ = rlp.decode(raw[1:])
+        chain_id = big_endian_to_int(chain_id)
+        max_fee = tip = big_endian_to_int(gas_price)
+    elif kind == 2:
+        chain_id, nonce, tip, max_fee, gas, to, value, data, _, _, _, _ = rlp.decode(raw[1:])
+        chain_id = big_endian_to_int(chain_id)
+        tip, max_fee = big_endian_to_int(tip), big_endian_to_int(max_fee)
+    else:
+        raise SimulatedRPCError(f"transaction type {kind} not supported", code=-32602)
+
+    return {
+        "type": kind,
+        "chain_id": chain_id,
+        "nonce": big_endian_to_int(nonce),
+        "gas": big_endian_to_int(gas),
+        "max_fee": max_fee,
+        "tip": tip,
+        "to": _address(to),
+        "value": big_endian_to_int(value),
+        "data": bytes(data),
+        "sender": Account.recover_transaction(raw),
+    }
+
+
+class _Tx:
+    __slots__ = ("hash", "sender", "nonce", "to", "value", "data", "gas", "max_fee", "tip", "type",
+                 "impersonated", "block")
+
+    def __init__(self, tx_hash, sender, nonce, to, value, data, gas, max_fee, tip, kind, impersonated=False):
+        self.hash = tx_hash
+        self.sender = sender
+        self.nonce = nonce
+        self.to = to
+        self.value = value
+        self.data = data
+        self.gas = gas
+        self.max_fee = max_fee
+        self.tip = tip
+        self.type = kind
+        self.impersonated = impersonated
+        self.block = None
+
+    def as_json(self):
+        return {
+            "hash": self.hash, "from": self.sender, "to": self.to, "nonce": _quantity(self.nonce),
+            "value": _quantity(self.value), "input": "0x" + self.data.hex(), "gas": _quantity(self.gas),
+            "maxFeePerGas": _quantity(self.max_fee), "maxPriorityFeePerGas": _quantity(self.tip),
+            "gasPrice": _quantity(self.max_fee), "type": _quantity(self.type),
+            "blockNumber": _quantity(self.block) if self.block is not None else None,
+        }
+
+
+# ==========================================================
+# 🧪 SIMULATED CHAIN (Election.sol + EIP-1559 block producer in memory)
+# ==========================================================
+class SimulatedChain:
+    """Single-node chain with the Election contract deployed at `contract_address`.
+
+    `accounts` are funded at genesis; the first one is the contract owner and every
+    one of them is a relayer (like the deployer after deploy.py). `revert_rate` makes
+    that share of contract calls fail on chain (status 0) to exercise rollbacks.
+    `block_time=0` mines every transaction as soon as it is sent.
+    """
+
+    def __init__(self, contract_address=DEFAULT_CONTRACT_ADDRESS, chain_id=DEFAULT_CHAIN_ID, block_time=12.0,
+                 accounts=(), balance=DEFAULT_BALANCE, revert_rate=0.0, gas_limit=BLOCK_GAS_LIMIT,
+                 base_fee=INITIAL_BASE_FEE, seed=None):
+        self.contract_address = to_checksum_address(contract_address)
+        self.chain_id = chain_id
+        self.block_time = block_time
+        self.revert_rate = revert_rate
+        self.gas_limit = gas_limit
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Accounts
+        self.balances = defaultdict(int)
+        self.nonces = defaultdict(int)
+        self.mempool = {}               # (sender, nonce) -> _Tx
+        self.transactions = {}          # hash -> _Tx (pending and mined)
+        self.receipts = {}              # hash -> receipt JSON
+        self.logs = []                  # log JSON in chain order
+        self.blocks = []                # block JSON, index = number
+
+        # Election.sol storage
+        accounts = [to_checksum_address(a) for a in accounts]
+        self.owner = accounts[0] if accounts else None
+        self.relayers = set(accounts)
+        self.votes = defaultdict(int)
+        self.total_votes = 0
+        self.candidate_count = 0
+        self.ballot_nonces = defaultdict(int)
+        self.anchored_at = {}
+        self.anchored_ballots = 0
+
+        for account in accounts:
+            self.balances[account] = balance
+        self._seal_block([], base_fee, [], 0)   # Genesis
+
+    # ---------------- ADMIN (cheat codes) ----------------
+    def fund(self, address, amount=DEFAULT_BALANCE):
+        with self._lock:
+            self.balances[to_checksum_address(address)] += amount
+
+    def add_relayer(self, address):
+        with self._lock:
+            address = to_checksum_address(address)
+            self.relayers.add(address)
+            if self.owner is None:
+                self.owner = address
+
+    def impersonate(self, sender, function, args):
+        """Queues a contract call from `sender` without a signature or fees (like anvil's impersonation)."""
+        data = self._encode_call(function, args)
+        with self._lock:
+            sender = to_checksum_address(sender)
+            nonce = self._pending_nonce(sender)
+            tx_hash = "0x" + keccak(b"impersonated" + sender.encode() + nonce.to_bytes(32, "big") + data).hex()
+            tx = _Tx(tx_hash, sender, nonce, self.contract_address, 0, data, 1_000_000, 0, 0, 2, impersonated=True)
+            self._accept(tx)
+        return tx_hash
+
+    # ---------------- BLOCK PRODUCER ----------------
+    def start(self):
+        if self.block_time > 0 and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sim-chain", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        logger.info(f"🧪 Simulated chain {self.chain_id}: one block every {self.block_time}s")
+        while not self._stop.wait(self.block_time):
+            try:
+                self.mine_block()
+            except Exception as e:
+                logger.error(f"⚠️ Simulated block production failed: {e}")
+
+    def mine_block(self):
+        """Includes executable mempool transactions (highest tip first, nonce order per sender)."""
+        with self._lock:
+            head = self.blocks[-1]
+            base_fee = int(head["baseFeePerGas"], 16)
+            next_base_fee = self._next_base_fee(base_fee, int(head["gasUsed"], 16))
+
+            by_sender = defaultdict(dict)
+            for tx in self.mempool.values():
+                by_sender[tx.sender][tx.nonce] = tx
+
+            def effective_tip(tx):
+                return min(tx.tip, tx.max_fee - next_base_fee)
+
+            # Next executable transaction of every sender, highest tip first
+            ready = []
+            for sender, txs in by_sender.items():
+                tx = txs.get(self.nonces[sender])
+                if tx is not None:
+                    heapq.heappush(ready, (-effective_tip(tx), tx.hash, tx))
+
+            included, receipts, gas_used = [], [], 0
+            while ready:
+                _, _, tx = heapq.heappop(ready)
+                if not tx.impersonated and tx.max_fee < next_base_fee:
+                    continue    # Underpriced: this sender waits for a cheaper block
+                if gas_used + tx.gas > self.gas_limit:
+                    continue
+                del self.mempool[(tx.sender, tx.nonce)]
+
+                receipt = self._execute(tx, next_base_fee, len(self.blocks), len(included), gas_used)
+                gas_used += int(receipt["gasUsed"], 16)
+                receipts.append(receipt)
+                included.append(tx)
+
+                following = by_sender[tx.sender].get(tx.nonce + 1)
+                if following is not None:
+                    heapq.heappush(ready, (-effective_tip(following), following.hash, following))
+
+            tips = sorted(effective_tip(tx) for tx in included if not tx.impersonated)
+            self._seal_block(included, next_base_fee, receipts, gas_used, tips)
+            return len(self.blocks) - 1
+
+    def _next_base_fee(self, base_fee, parent_gas_used):
+        """EIP-1559: +-12.5% at most, depending on how full the parent block was."""
+        target = self.gas_limit // 2
+        if parent_gas_used == target:
+            return base_fee
+        delta = base_fee * (parent_gas_used - target) // target // 8
+        if parent_gas_used > target:
+            delta = max(delta, 1)
+        return max(7, base_fee + delta)
+
+    def _seal_block(self, included, base_fee, receipts, gas_used, tips=()):
+        number = len(self.blocks)
+        parent_hash = self.blocks[-1]["hash"] if self.blocks else "0x" + "00" * 32
+        timestamp = int(time.time())
+        block_hash = "0x" + keccak(bytes.fromhex(parent_hash[2:]) + number.to_bytes(8, "big")
+                                   + timestamp.to_bytes(8, "big")).hex()
+        for log_index, log in enumerate(l for r in receipts for l in r["logs"]):
+            log["logIndex"] = _quantity(log_index)
+        for receipt in receipts:
+            receipt["blockHash"] = block_hash
+            for log in receipt["logs"]:
+                log["blockHash"] = block_hash
+                self.logs.append(log)
+            self.receipts[receipt["transactionHash"]] = receipt
+        for tx in included:
+            tx.block = number
+
+        self.blocks.append({
+            "number": _quantity(number),
+            "hash": block_hash,
+            "parentHash": parent_hash,
+            "timestamp": _quantity(timestamp),
+            "baseFeePerGas": _quantity(base_fee),
+            "gasLimit": _quantity(self.gas_limit),
+            "gasUsed": _quantity(gas_used),
+            "miner": "0x" + "00" * 20,
+            "transactions": [tx.hash for tx in included],
+            "_tips": list(tips),
+        })
+        if included:
+            logger.debug(f"🧪 Block {number}: {len(included)} tx, {gas_used} gas")
+
+    # ---------------- TRANSACTIONS ----------------
+    def send_raw_transaction(self, raw):
+        fields = decode_raw_transaction(raw)
+        if fields["chain_id"] is not None and fields["chain_id"] != self.chain_id:
+            raise SimulatedRPCError(f"invalid chain id {fields['chain_id']} (expected {self.chain_id})")
+        tx = _Tx("0x" + keccak(raw).hex(), fields["sender"], fields["nonce"], fields["to"], fields["value"],
+                 fields["data"], fields["gas"], fields["max_fee"], fields["tip"], fields["type"])
+        with self._lock:
+            self._accept(tx)
+        return tx.hash
+
+    def _accept(self, tx):
+        if tx.hash in self.transactions:
+            raise SimulatedRPCError("already known")
+        if tx.nonce < self.nonces[tx.sender]:
+            raise SimulatedRPCError(f"nonce too low: next nonce {self.nonces[tx.sender]}, tx nonce {tx.nonce}")
+        if tx.gas < GAS_TRANSFER and not tx.impersonated:
+            raise SimulatedRPCError("intrinsic gas too low")
+
+        replaced = self.mempool.get((tx.sender, tx.nonce))
+        if replaced is not None:
+            if tx.max_fee < replaced.max_fee * 1.1 or tx.tip < replaced.tip * 1.1:
+                raise SimulatedRPCError("replacement transaction underpriced")
+            del self.transactions[replaced.hash]
+
+        if not tx.impersonated:
+            # Cost of everything this sender already has queued counts against the balance
+            queued = sum(t.gas * t.max_fee + t.value for t in self.mempool.values()
+                         if t.sender == tx.sender and t is not replaced)
+            cost = tx.gas * tx.max_fee + tx.value
+            if self.balances[tx.sender] < queued + cost:
+                raise SimulatedRPCError(
+                    f"insufficient funds for gas * price + value: balance {self.balances[tx.sender]}, "
+                    f"tx cost {cost}, overshot {queued + cost - self.balances[tx.sender]}"
+                )
+
+        self.mempool[(tx.sender, tx.nonce)] = tx
+        self.transactions[tx.hash] = tx
+        if self.block_time <= 0:
+            self.mine_block()
+
+    def _execute(self, tx, base_fee, block_number, index, cumulative_gas):
+        """Applies one transaction and returns its receipt."""
+        status, logs, gas_used = 1, [], GAS_TRANSFER
+        if tx.to == self.contract_address and tx.data:
+            try:
+                if tx.value:
+                    raise Revert("Election does not accept Ether")
+                gas, events, commit = self._call(tx.sender, tx.data)
+                gas_used = gas
+                if gas_used > tx.gas:
+                    raise Revert("out of gas")
+                if self.revert_rate and self._random.random() < self.revert_rate:
+                    raise Revert("simulated revert")
+                commit()
+                logs = [self._log(tx, index, topics, data) for topics, data in events]
+            except Revert as e:
+                status = 0
+                gas_used = min(tx.gas, max(gas_used, GAS_CALL))
+                logger.debug(f"🧪 {tx.hash} reverted: {e.reason}")
+        elif tx.to == self.contract_address and tx.value:
+            status, gas_used = 0, tx.gas   # No receive() function
+
+        price = 0 if tx.impersonated else base_fee + min(tx.tip, tx.max_fee - base_fee)
+        self.balances[tx.sender] -= gas_used * price
+        if status == 1 and tx.value and tx.to:
+            self.balances[tx.sender] -= tx.value
+            self.balances[tx.to] += tx.value
+        self.nonces[tx.sender] += 1
+
+        return {
+            "transactionHash": tx.hash,
+            "transactionIndex": _quantity(index),
+            "blockNumber": _quantity(block_number),
+            "blockHash": None,
+            "from": tx.sender,
+            "to": tx.to,
+            "contractAddress": None,
+            "cumulativeGasUsed": _quantity(cumulative_gas + gas_used),
+            "gasUsed": _quantity(gas_used),
+            "effectiveGasPrice": _quantity(price),
+            "logs": logs,
+            "logsBloom": "0x" + "00" * 256,
+            "status": _quantity(status),
+            "type": _quantity(tx.type),
+        }
+
+    def _log(self, tx, index, topics, data):
+        return {
+            "address": self.contract_address,
+            "topics": topics,
+            "data": "0x" + data.hex(),
+            "blockNumber": _quantity(len(self.blocks)),
+            "blockHash": None,
+            "transactionHash": tx.hash,
+            "transactionIndex": _quantity(index),
+            "logIndex": "0x0",
+            "removed": False,
+        }
+
+    def _pending_nonce(self, address):
+        nonce = self.nonces[address]
+        while (address, nonce) in self.mempool:
+            nonce += 1
+        return nonce
+
+    # ---------------- CONTRACT ----------------
+    def _encode_call(self, function, args):
+        inputs, _ = ELECTION_FUNCTIONS[function]
+        selector = keccak(text=f"{function}({','.join(inputs)})")[:4]
+        try:
+            return selector + encode(inputs, list(args))
+        except Exception as e:
+            raise ValueError(f"cannot encode {function}{tuple(args)}: {e}") from e
+
+    def _decode_call(self, data):
+        function = SELECTORS.get(bytes(data[:4]))
+        if function is None:
+            raise Revert("unknown function selector")
+        inputs, _ = ELECTION_FUNCTIONS[function]
+        try:
+            return function, decode(inputs, bytes(data[4:]))
+        except Exception:
+            raise Revert(f"bad calldata for {function}")
+
+    def call(self, sender, data):
+        """eth_call: view results are ABI-encoded, state-changing calls are only checked."""
+        with self._lock:
+            function, args = self._decode_call(data)
+            if function in VIEW_FUNCTIONS:
+                _, outputs = ELECTION_FUNCTIONS[function]
+                return encode(outputs, [self._view(function, args)])
+            self._call(sender, data)
+            return b""
+
+    def estimate_gas(self, sender, to, data, value=0):
+        with self._lock:
+            if to != self.contract_address or not data:
+                return GAS_TRANSFER
+            if value:
+                raise Revert("Election does not accept Ether")
+            function, _ = self._decode_call(data)
+            if function in VIEW_FUNCTIONS:
+                return GAS_CALL
+            return self._call(sender, data)[0]
+
+    def _view(self, function, args):
+        if function in ("getVotes", "votes"):
+            return self.votes[args[0]]
+        if function == "getVotesBatch":
+            return [self.votes[cid] for cid in args[0]]
+        if function == "getAllVotes":
+            return [self.votes[cid] for cid in range(1, self.candidate_count + 1)]
+        if function == "nonces":
+            return self.ballot_nonces[to_checksum_address(args[0])]
+        if function == "relayers":
+            return to_checksum_address(args[0]) in self.relayers
+        if function == "anchoredAt":
+            return self.anchored_at.get(bytes(args[0]), 0)
+        return {
+            "totalVotes": self.total_votes,
+            "candidateCount": self.candidate_count,
+            "anchoredBallots": self.anchored_ballots,
+            "owner": self.owner or "0x" + "00" * 20,
+        }[function]
+
+    def _call(self, sender, data):
+        """Checks a state-changing call like the contract would. Returns (gas, events, commit)."""
+        function, args = self._decode_call(data)
+        handler = getattr(self, f"_fn_{function}", None)
+        if handler is None:
+            raise Revert(f"{function} is read-only")
+        return handler(sender, *args)
+
+    @staticmethod
+    def _require(condition, reason):
+        if not condition:
+            raise Revert(reason)
+
+    def _only_owner(self, sender):
+        self._require(sender == self.owner, "Only owner")
+
+    def _only_relayer(self, sender):
+        self._require(sender in self.relayers, "Only relayer")
+
+    def _records(self, candidate_ids):
+        """Events + commit for `_record()` of every candidate."""
+        for cid in candidate_ids:
+            self._require(cid > 0, "Invalid Candidate ID")
+        events = [([VOTED_TOPIC, "0x" + cid.to_bytes(32, "big").hex()], b"") for cid in candidate_ids]
+
+        def commit():
+            for cid in candidate_ids:
+                self.votes[cid] += 1
+                self.total_votes += 1
+
+        gas = GAS_CALL + GAS_PER_RECORD * len(candidate_ids)
+        return gas, events, commit
+
+    def _signed_voter(self, typed_data, nonce, signature):
+        try:
+            voter = recover_typed_data_signer(typed_data, bytes(signature)) if len(signature) == 65 else None
+        except Exception:
+            voter = None
+        self._require(voter is not None, "Invalid signature")
+        self._require(self.ballot_nonces[voter] == nonce, "Invalid nonce")
+        return voter
+
+    def _with_nonce(self, voter, nonce, result):
+        gas, events, commit = result
+
+        def commit_all():
+            self.ballot_nonces[voter] = nonce + 1
+            commit()
+
+        return gas + GAS_SIGNATURE, events, commit_all
+
+    def _fn_vote(self, sender, candidate_id):
+        return self._records([candidate_id])
+
+    def _fn_voteBallot(self, sender, candidate_ids):
+        self._require(len(candidate_ids) > 0, "Empty ballot")
+        return self._records(list(candidate_ids))
+
+    def _fn_voteFor(self, sender, candidate_id, nonce, signature):
+        self._only_relayer(sender)
+        typed_data = ballot_typed_data(candidate_id, nonce, self.chain_id, self.contract_address)
+        voter = self._signed_voter(typed_data, nonce, signature)
+        return self._with_nonce(voter, nonce, self._records([candidate_id]))
+
+    def _fn_voteBallotFor(self, sender, candidate_ids, nonce, signature):
+        self._only_relayer(sender)
+        self._require(len(candidate_ids) > 0, "Empty ballot")
+        typed_data = multi_ballot_typed_data(list(candidate_ids), nonce, self.chain_id, self.contract_address)
+        voter = self._signed_voter(typed_data, nonce, signature)
+        return self._with_nonce(voter, nonce, self._records(list(candidate_ids)))
+
+    def _fn_voteBatch(self, sender, candidate_ids, counts):
+        self._only_relayer(sender)
+        self._require(len(candidate_ids) == len(counts), "Length mismatch")
+        expanded = [cid for cid, n in zip(candidate_ids, counts) for _ in range(n)]
+        for cid in candidate_ids:
+            self._require(cid > 0, "Invalid Candidate ID")
+        _, events, commit = self._records(expanded)
+        gas = GAS_CALL + GAS_PER_RECORD * len(candidate_ids) + GAS_PER_EXTRA_EVENT * len(expanded)
+        return gas, events, commit
+
+    def _fn_anchorRoot(self, sender, root, count):
+        self._only_relayer(sender)
+        root = bytes(root)
+        self._require(root != b"\x00" * 32, "Empty root")
+        self._require(root not in self.anchored_at, "Root already anchored")
+
+        def commit():
+            self.anchored_at[root] = len(self.blocks)
+            self.anchored_ballots += count
+
+        events = [([ROOT_ANCHORED_TOPIC, "0x" + root.hex()], encode(["uint256"], [count]))]
+        return GAS_CALL + 45000, events, commit
+
+    def _fn_setRelayer(self, sender, relayer, allowed):
+        self._only_owner(sender)
+        relayer = to_checksum_address(relayer)
+        return GAS_CALL + 20000, [], lambda: (self.relayers.add if allowed else self.relayers.discard)(relayer)
+
+    def _fn_setCandidateCount(self, sender, count):
+        self._only_owner(sender)
+        return GAS_CALL + 5000, [], lambda: setattr(self, "candidate_count", count)
+
+    # ---------------- JSON-RPC ----------------
+    def _block(self, tag):
+        if tag in (None, "latest", "pending", "safe", "finalized"):
+            return self.blocks[-1]
+        if tag == "earliest":
+            return self.blocks[0]
+        number = int(tag, 16) if isinstance(tag, str) else int(tag)
+        return self.blocks[number] if 0 <= number < len(self.blocks) else None
+
+    def _public_block(self, block, full=False):
+        if block is None:
+            return None
+        public = {k: v for k, v in block.items() if not k.startswith("_")}
+        if full:
+            public["transactions"] = [self.transactions[h].as_json() for h in block["transactions"]]
+        return public
+
+    def fee_history(self, count, newest, percentiles):
+        newest = int(self._block(newest)["number"], 16)
+        oldest = max(0, newest - int(count) + 1)
+        blocks = self.blocks[oldest:newest + 1]
+        rewards = []
+        for block in blocks:
+            tips = block["_tips"]
+            rewards.append([_quantity(tips[min(len(tips) - 1, int(len(tips) * p / 100))] if tips else 0)
+                            for p in percentiles])
+        head = self.blocks[newest]
+        next_base_fee = self._next_base_fee(int(head["baseFeePerGas"], 16), int(head["gasUsed"], 16))
+        return {
+            "oldestBlock": _quantity(oldest),
+            "baseFeePerGas": [b["baseFeePerGas"] for b in blocks] + [_quantity(next_base_fee)],
+            "gasUsedRatio": [int(b["gasUsed"], 16) / self.gas_limit for b in blocks],
+            "reward": rewards,
+        }
+
+    def get_logs(self, flt):
+        from_block = int(self._block(flt.get("fromBlock", "latest"))["number"], 16)
+        to_block = int(self._block(flt.get("toBlock", "latest"))["number"], 16)
+        addresses = flt.get("address")
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        addresses = {a.lower() for a in addresses} if addresses else None
+        topics = flt.get("topics") or []
+
+        def matches(log):
+            if addresses and log["address"].lower() not in addresses:
+                return False
+            for wanted, actual in zip(topics, log["topics"]):
+                if wanted is None:
+                    continue
+                wanted = [wanted] if isinstance(wanted, str) else wanted
+                if actual.lower() not in {w.lower() for w in wanted}:
+                    return False
+            return len(topics) <= len(log["topics"])
+
+        return [log for log in self.logs
+                if from_block <= int(log["blockNumber"], 16) <= to_block and matches(log)]
+
+    def rpc(self, method, params):
+        """Answers one JSON-RPC call (raises SimulatedRPCError)."""
+        with self._lock:
+            if method == "eth_chainId":
+                return _quantity(self.chain_id)
+            if method == "net_version":
+                return str(self.chain_id)
+            if method == "web3_clientVersion":
+                return "SimulatedChain/1.0"
+            if method == "eth_syncing":
+                return False
+            if method == "eth_blockNumber":
+                return _quantity(len(self.blocks) - 1)
+            if method == "eth_getBalance":
+                return _quantity(self.balances[to_checksum_address(params[0])])
+            if method == "eth_getTransactionCount":
+                address = to_checksum_address(params[0])
+                pending = len(params) > 1 and params[1] == "pending"
+                return _quantity(self._pending_nonce(address) if pending else self.nonces[address])
+            if method == "eth_getCode":
+                return "0x6080" if to_checksum_address(params[0]) == self.contract_address else "0x"
+            if method in ("eth_gasPrice", "eth_maxPriorityFeePerGas"):
+                tips = [t for b in self.blocks[-20:] for t in b["_tips"]]
+                tip = sorted(tips)[len(tips) // 2] if tips else 10**9
+                if method == "eth_maxPriorityFeePerGas":
+                    return _quantity(tip)
+                return _quantity(int(self.blocks[-1]["baseFeePerGas"], 16) + tip)
+            if method == "eth_feeHistory":
+                return self.fee_history(int(params[0], 16) if isinstance(params[0], str) else params[0],
+                                        params[1], params[2] if len(params) > 2 else [])
+            if method == "eth_getBlockByNumber":
+                return self._public_block(self._block(params[0]), len(params) > 1 and params[1])
+            if method == "eth_getBlockByHash":
+                block = next((b for b in reversed(self.blocks) if b["hash"] == params[0].lower()), None)
+                return self._public_block(block, len(params) > 1 and params[1])
+            if method == "eth_sendRawTransaction":
+                return self.send_raw_transaction(bytes.fromhex(params[0][2:]))
+            if method == "eth_getTransactionReceipt":
+                return self.receipts.get(params[0].lower())
+            if method == "eth_getTransactionByHash":
+                tx = self.transactions.get(params[0].lower())
+                return tx.as_json() if tx else None
+            if method in ("eth_call", "eth_estimateGas"):
+                tx = params[0]
+                sender = to_checksum_address(tx["from"]) if tx.get("from") else None
+                to = to_checksum_address(tx["to"]) if tx.get("to") else None
+                data = bytes.fromhex((tx.get("data") or tx.get("input") or "0x")[2:])
+                if method == "eth_estimateGas":
+                    return _quantity(self.estimate_gas(sender, to, data, int(tx.get("value", "0x0"), 16)))
+                if to != self.contract_address:
+                    return "0x"
+                return "0x" + self.call(sender, data).hex()
+            if method == "eth_getLogs":
+                return self.get_logs(params[0])
+        raise SimulatedRPCError(f"the method {method} does not exist/is not available", code=-32601)
+
+    def status(self):
+        """Snapshot for the admin dashboard."""
+        with self._lock:
+            return {
+                "chain_id": self.chain_id,
+                "block": len(self.blocks) - 1,
+                "base_fee": int(self.blocks[-1]["baseFeePerGas"], 16),
+                "block_time": self.block_time,
+                "mempool": len(self.mempool),
+                "transactions": len(self.transactions),
+                "total_votes": self.total_votes,
+            }
+
+
+# ==========================================================
+# 🔌 SIMULATED PROVIDER (web3 provider with latency + failure injection)
+# ==========================================================
+class SimulatedProvider(JSONBaseProvider):
+    """web3 provider answering from a SimulatedChain.
+
+    Every HTTP-equivalent request (a single call or a whole batch) waits `latency`
+    +- `jitter` seconds, and `failure_rate` of them fail like an overloaded public
+    node (HTTP 429 / rate-limit error) before reaching the chain.
+    """
+
+    endpoint_uri = None
+
+    def __init__(self, chain, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None, **kwargs):
+        super().__init__(**kwargs)
+        self.chain = chain
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+
+    def __str__(self):
+        return f"SimulatedProvider(chain {self.chain.chain_id})"
+
+    def _round_trip(self):
+        """Returns an error object when this request is chosen to fail."""
+        self.requests += 1
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            self.failures += 1
+            return {"code": -32005, "message": "rate limit exceeded (simulated)"}
+        return None
+
+    def _answer(self, call):
+        answer = {"jsonrpc": "2.0", "id": call.get("id")}
+        try:
+            answer["result"] = self.chain.rpc(call["method"], list(call.get("params") or []))
+        except SimulatedRPCError as e:
+            answer["error"] = e.to_json()
+        except Exception as e:
+            answer["error"] = {"code": -32603, "message": f"internal error: {e}"}
+        return answer
+
+    # ---------------- web3 PROVIDER API ----------------
+    def make_request(self, method, params):
+        call = {"jsonrpc": "2.0", "method": method, "params": list(params or []), "id": next(self._ids)}
+        error = self._round_trip()
+        if error:
+            return {"jsonrpc": "2.0", "id": call["id"], "error": error}
+        return self._answer(call)
+
+    def is_connected(self, show_traceback=False):
+        return True
+
+    def post_json(self, payload, hedge=False):
+        """Same contract as PooledHTTPProvider.post_json, so rpc_batch() sends real batches."""
+        error = self._round_trip()
+        if error:
+            return {"jsonrpc": "2.0", "id": None, "error": error}
+        if isinstance(payload, list):
+            return [self._answer(call) for call in payload]
+        return self._answer(payload)
+
+    def status(self):
+        return {"requests": self.requests, "failures": self.failures, **self.chain.status()}
+
+
+# ==========================================================
+# 🖧 JSON-RPC SERVER (one chain shared by several app workers)
+# ==========================================================
+def serve(provider, host="127.0.0.1", port=8545):
+    """Serves `provider` over HTTP JSON-RPC (blocking)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            answer = provider.post_json(body)
+            status = 429 if isinstance(answer, dict) and answer.get("id") is None and "error" in answer else 200
+            data = json.dumps(answer).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    logger.info(f"🧪 Simulated chain {provider.chain.chain_id} listening on http://{host}:{port}")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--chain-id", type=int, default=DEFAULT_CHAIN_ID)
+    parser.add_argument("--contract", default=DEFAULT_CONTRACT_ADDRESS)
+    parser.add_argument("--block-time", type=float, default=12.0)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--revert-rate", type=float, default=0.0)
+    parser.add_argument("--accounts", default="", help="comma-separated funded relayer addresses (first = owner)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    chain = SimulatedChain(args.contract, chain_id=args.chain_id, block_time=args.block_time,
+                           accounts=[a.strip() for a in args.accounts.split(",") if a.strip()],
+                           revert_rate=args.revert_rate)
+    chain.start()
+    serve(SimulatedProvider(chain, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                            failure_rate=args.failure_rate), args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
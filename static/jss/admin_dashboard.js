@@ -91,6 +91,13 @@ async function loadElectionStatus() {
                 deadlineDiv.textContent = 'No deadline set';
                 deadlineDiv.style.color = 'var(--text-muted)';
             }
+
+            // Update wallet pool depth
+            if (data.wallet_pool) {
+                document.getElementById('walletPoolReady').textContent = data.wallet_pool.ready;
+                document.getElementById('walletPoolDetail').textContent =
+                    `${data.wallet_pool.funding} funding · target ${data.wallet_pool_settings.size}`;
+            }
         }
     } catch (err) {
         console.error("Failed to load election status:", err);
@@ -159,8 +166,36 @@ async function setDeadline() {
     }
 }
 
-// Load status on page load
-window.addEventListener('DOMContentLoaded', loadElectionStatus);
+async function saveWalletPool() {
+    const settings = {
+        size: parseInt(document.getElementById('poolSizeInput').value),
+        low_water: parseInt(document.getElementById('poolLowWaterInput').value),
+        refill_rate: parseInt(document.getElementById('poolRefillInput').value)
+    };
+
+    try {
+        const response = await fetch('/admin/election/wallet-pool', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(settings)
+        });
+        const data = await response.json();
+        if (data.status === 'success') {
+            alert("👛 Wallet pool updated!");
+            loadElectionStatus();
+        } else {
+            alert("Error: " + data.message);
+        }
+    } catch (err) {
+        alert("Request failed: " + err);
+    }
+}
+
+// Load status on page load (and keep the pool depth fresh)
+window.addEventListener('DOMContentLoaded', () => {
+    loadElectionStatus();
+    setInterval(loadElectionStatus, 15000);
+});
 
 async function deleteCandidate(id) {
     if (!confirm("Are you sure you want to delete this candidate?")) return;
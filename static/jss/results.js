@@ -1,21 +1,3 @@
-// =====================================================
-// PROVIDER (PUBLIC SEPOLIA RPC)
-// =====================================================
-const RPC_URL = "https://ethereum-sepolia.publicnode.com";
-let provider;
-
-try {
-    if (ethers.JsonRpcProvider) {
-        provider = new ethers.JsonRpcProvider(RPC_URL);
-    } else if (ethers.providers && ethers.providers.JsonRpcProvider) {
-        provider = new ethers.providers.JsonRpcProvider(RPC_URL);
-    } else {
-        console.error("Ethers.js not loaded.");
-    }
-} catch (e) {
-    console.error("Provider Init Error:", e);
-}
-
 // =====================================================
 // CHART JS SETUP
 // =====================================================
@@ -62,48 +44,24 @@ function initChart(candidates) {
 }
 
 // =====================================================
-// FETCH VOTES (DYNAMIC)
+// FETCH VOTES (SERVER-SIDE TALLIES)
 // =====================================================
+// The backend batches the blockchain reads and caches them for every viewer,
+// so the browser never talks to the RPC node directly.
 async function fetchVotes() {
     try {
         const candidates = window.ALL_CANDIDATES || [];
         if (candidates.length === 0) return null;
 
-        // 1. Get Offsets
-        const offsetRes = await fetch('/api/offsets');
-        const offsetData = await offsetRes.json();
-        // Assuming offsets are stored by ID or index. 
-        // Backend `get_current_offsets` logic returns array [0,0,0,0,0,0] (fixed size 6 currently).
-        // WARNING: If we have >6 candidates, offsets logic in backend needs fix.
-        // For now, we'll map offsets safely.
-        const offsets = offsetData.offsets || [];
-
-        // 2. Blockchain Call
-        const contract = new ethers.Contract(window.CONTRACT_ADDRESS, window.CONTRACT_ABI, provider);
-
-        // Map candidates to promises with error handling
-        const votePromises = candidates.map(async c => {
-            try {
-                const v = await contract.getVotes(c.id);
-                return v;
-            } catch (e) {
-                console.warn(`Failed to fetch votes for candidate ${c.id} (likely contract limit):`, e);
-                return 0; // Return 0 if contract doesn't recognize ID
-            }
-        });
+        const res = await fetch('/api/results');
+        if (!res.ok) throw new Error(`Results API returned ${res.status}`);
+        const data = await res.json();
 
-        const rawVotes = await Promise.all(votePromises);
-
-        // 3. Process Votes
-        return candidates.map((c, i) => {
-            const raw = Number(rawVotes[i]);
-            const offset = offsets[i] || 0;
-            const final = raw - offset;
-            return Math.max(0, final);
-        });
+        const votes = data.votes || {};
+        return candidates.map(c => Number(votes[c.id] || 0));
 
     } catch (err) {
-        console.error("Blockchain Fetch Error:", err);
+        console.error("Results Fetch Error:", err);
         return null; // Keep OLD data on error
     }
 }
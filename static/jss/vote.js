@@ -11,7 +11,7 @@ const submitVoteBtn = document.getElementById("submitVoteBtn");
 // =====================================================================
 // POPUP SYSTEM
 // =====================================================================
-function showPopup(title, msg, link = null, actionBtn = null) {
+function showPopup(title, msg, link = null, actionBtn = null, linkText = "View on Etherscan ↗️") {
     const overlay = document.getElementById("popupOverlay");
     const container = document.querySelector(".popup-content");
 
@@ -29,7 +29,7 @@ function showPopup(title, msg, link = null, actionBtn = null) {
             const a = document.createElement("a");
             a.href = link;
             a.target = "_blank";
-            a.textContent = "View on Etherscan ↗️";
+            a.textContent = linkText;
             a.className = "etherscan-link";
             linkContainer.appendChild(a);
             linkContainer.appendChild(document.createElement("br")); // Spacing
@@ -78,7 +78,9 @@ window.addEventListener('DOMContentLoaded', () => {
 // =====================================================================
 document.querySelectorAll(".candidate-card").forEach(card => {
     card.addEventListener("click", () => {
+        // One choice per position: only clear cards competing for the same position
         document.querySelectorAll(".candidate-card").forEach(c => {
+            if (c.dataset.position !== card.dataset.position) return;
             c.classList.remove("selected");
             const ind = c.querySelector(".selection-indicator");
             if (ind) ind.innerHTML = '<span class="circle"></span> Select';
@@ -93,34 +95,96 @@ document.querySelectorAll(".candidate-card").forEach(card => {
     });
 });
 
+// =====================================================================
+// VOTE JOB POLLING
+// =====================================================================
+const STAGE_LABELS = {
+    funding: "Preparing Secure Wallet...",
+    batched: "Waiting for Next Batch...",
+    voting: "Casting Vote...",
+    confirming: "Confirming on Blockchain..."
+};
+
+async function waitForVoteJob(statusUrl) {
+    // Resolves with the same { status, tx_hash, message } shape as a direct response
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+
+        let job;
+        try {
+            const res = await fetch(statusUrl);
+            job = await res.json();
+        } catch (e) {
+            console.warn("Status poll failed, retrying:", e);
+            continue;
+        }
+
+        if (job.status !== "success") {
+            return { status: "error", message: job.message || "Could not read vote status" };
+        }
+        if (job.done) {
+            return job.state === "confirmed"
+                ? { status: "success", tx_hash: job.tx_hash }
+                : { status: "error", message: job.message || "Vote failed" };
+        }
+        if (STAGE_LABELS[job.stage]) submitVoteBtn.textContent = STAGE_LABELS[job.stage];
+    }
+}
+
 // =====================================================================
 // SUBMIT VOTE (SMART POPUPS)
 // =====================================================================
 submitVoteBtn.addEventListener("click", async () => {
 
-    const selected = document.querySelector('input[name="candidate"]:checked');
+    const selected = [...document.querySelectorAll('.hidden-radio:checked')];
 
-    if (!selected) {
+    if (selected.length === 0) {
         showPopup("No Selection", "Please select a candidate.");
         return;
     }
 
-    const candidateId = parseInt(selected.value);
+    // Several positions -> one full ballot (single transaction), otherwise the classic single vote
+    const candidateIds = selected.map(radio => parseInt(radio.value));
+    const endpoint = candidateIds.length > 1 ? '/submit_ballot' : '/submit_vote';
+    const payload = candidateIds.length > 1 ? { candidateIds: candidateIds } : { candidateId: candidateIds[0] };
 
     // UI Feedback
     submitVoteBtn.textContent = "Encrypting & Submitting...";
     submitVoteBtn.disabled = true;
 
     try {
-        const response = await fetch('/submit_vote', {
+        const response = await fetch(endpoint, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ candidateId: candidateId })
+            body: JSON.stringify(payload)
         });
 
-        const data = await response.json();
+        let data = await response.json();
+
+        // ⏳ Vote accepted into the queue -> poll until the blockchain confirms it
+        if (data.status === "queued") {
+            submitVoteBtn.textContent = "Waiting for Blockchain...";
+            data = await waitForVoteJob(data.status_url || `/vote_status/${data.job_id}`);
+        }
+
+        if (data.status === "success" && data.receipt) {
+            // 📒 LEDGER MODE: show the voter's receipt + link to the inclusion proof
+            showPopup(
+                "Vote Recorded 🎉",
+                `Ballot #${data.receipt.seq} recorded. Keep your receipt: ` +
+                    (data.receipts || [data.receipt]).map(r => r.leaf).join(", "),
+                data.proof_url,
+                {
+                    text: "Go to Results →",
+                    onClick: () => {
+                        window.location.href = "/results";
+                    }
+                },
+                "View Inclusion Proof ↗️"
+            );
+            document.getElementById("popupClose").style.display = 'none';
 
-        if (data.status === "success") {
+        } else if (data.status === "success") {
             // ✅ SUCCESS POPUP (UPDATED FLOW)
             const txHash = data.tx_hash;
             const etherscanLink = `https://sepolia.etherscan.io/tx/${txHash}`;
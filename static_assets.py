@@ -0,0 +1,146 @@
+"""Fingerprinted, precompressed static assets.
+
+    python -m static_assets [--static static]
+
+Copies every asset under static/css, static/jss, static/vendor and static/images
+to static/dist/ under a content-hashed name (css/vote.css -> css/vote.1a2b3c4d5e.css),
+writes .gz and .br variants of the text assets next to them and records the
+mapping in static/dist/manifest.json. The app serves static/dist/ under /assets/
+with immutable one-year cache headers (see app.py).
+"""
+import os
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import argparse
+import mimetypes
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped, gzip still works
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DIRS = ("css", "jss", "vendor", "images")
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".map")
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 10
+
+# Accept-Encoding token -> file suffix, best first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(rel_path, digest):
+    """css/vote.css + 1a2b3c4d5e -> css/vote.1a2b3c4d5e.css"""
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest}{ext}"
+
+
+# ==========================================================
+# 🏗️ BUILD (Run once per deploy, before gunicorn starts)
+# ==========================================================
+def build_assets(static_dir):
+    """Rebuilds static/dist/ and returns the manifest ({source path: hashed path})."""
+    dist = os.path.join(static_dir, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    saved = {"raw": 0, "gzip": 0, "br": 0}
+
+    for source_dir in SOURCE_DIRS:
+        base = os.path.join(static_dir, source_dir)
+        for root, dirs, files in os.walk(base):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                rel_path = os.path.relpath(path, static_dir).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    data = f.read()
+
+                target_rel = hashed_name(rel_path, fingerprint(data))
+                target = os.path.join(dist, target_rel)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    f.write(data)
+                manifest[rel_path] = target_rel
+
+                if name.lower().endswith(COMPRESSIBLE):
+                    saved["raw"] += len(data)
+                    # mtime=0 keeps the .gz byte-identical between builds of the same file
+                    packed = gzip.compress(data, compresslevel=9, mtime=0)
+                    with open(target + ".gz", "wb") as f:
+                        f.write(packed)
+                    saved["gzip"] += len(packed)
+                    if brotli is not None:
+                        packed = brotli.compress(data, quality=11)
+                        with open(target + ".br", "wb") as f:
+                            f.write(packed)
+                        saved["br"] += len(packed)
+
+    with open(os.path.join(dist, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if brotli is None:
+        logger.warning("⚠️ brotli is not installed, only .gz variants were written")
+    logger.info(
+        f"📦 {len(manifest)} assets fingerprinted into {dist} "
+        f"(text: {saved['raw'] // 1024} KB -> gzip {saved['gzip'] // 1024} KB, br {saved['br'] // 1024} KB)"
+    )
+    return manifest
+
+
+# ==========================================================
+# 🔗 RUNTIME (Manifest lookups and precompressed responses)
+# ==========================================================
+class AssetManifest:
+    """Maps source paths to fingerprinted ones; empty (plain /static URLs) until a build exists."""
+
+    def __init__(self, static_dir):
+        self.dist_dir = os.path.join(static_dir, DIST_DIR)
+        self.paths = {}
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST_NAME)) as f:
+                self.paths = json.load(f)
+            logger.info(f"📦 Asset manifest loaded: {len(self.paths)} fingerprinted assets")
+        except FileNotFoundError:
+            logger.info("📦 No asset manifest (run `python -m static_assets`), serving plain /static files")
+        except Exception as e:
+            logger.error(f"⚠️ Could not read asset manifest, serving plain /static files: {e}")
+
+    def lookup(self, rel_path):
+        """Fingerprinted path for `rel_path`, None if it was not part of the build."""
+        return self.paths.get(rel_path)
+
+    def pick_encoding(self, hashed_path, accept_encodings):
+        """(file to send, Content-Encoding or None) for a client's Accept-Encoding."""
+        for encoding, suffix in ENCODINGS:
+            if accept_encodings[encoding] and os.path.isfile(os.path.join(self.dist_dir, hashed_path + suffix)):
+                return hashed_path + suffix, encoding
+        return hashed_path, None
+
+    @staticmethod
+    def mimetype(hashed_path):
+        return mimetypes.guess_type(hashed_path)[0] or "application/octet-stream"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static assets")
+    parser.add_argument("--static", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"),
+                        help="static directory to build from")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    build_assets(args.static)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
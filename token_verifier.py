@@ -0,0 +1,286 @@
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import requests
+from google.auth import jwt
+
+import db
+
+logger = logging.getLogger(__name__)
+
+# Public x509 certs that sign Firebase ID tokens (rotated every few hours)
+GOOGLE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+CERTS_KEY = "google_certs"
+
+
+class TokenRevokedError(Exception):
+    """The token was issued before the user's refresh tokens were revoked (or the user is gone/disabled)."""
+
+
+def firebase_user_states(uids):
+    """Revocation state per UID with one `get_users` call per 100 users."""
+    from firebase_admin import auth
+
+    states = {}
+    for i in range(0, len(uids), 100):
+        result = auth.get_users([auth.UidIdentifier(uid) for uid in uids[i:i + 100]])
+        for user in result.users:
+            states[user.uid] = {
+                "valid_after": (user.tokens_valid_after_timestamp or 0) / 1000,
+                "disabled": user.disabled,
+            }
+    return states
+
+
+def http_user_states(url, timeout=10):
+    """`lookup_users` that POSTs {"uids": [...]} to `url` (e.g. benchmarks/auth_stub.py) instead of Firebase."""
+    def lookup(uids):
+        response = requests.post(url, json={"uids": list(uids)}, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    return lookup
+
+
+def _max_age(cache_control, default=3600):
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else default
+
+
+class _Batch:
+    __slots__ = ("uids", "done", "states", "error")
+
+    def __init__(self):
+        self.uids = set()
+        self.done = threading.Event()
+        self.states = {}
+        self.error = None
+
+
+# ==========================================================
+# 🔐 FIREBASE ID-TOKEN VERIFIER (Cached signatures + bounded revocation checks)
+# ==========================================================
+class FirebaseTokenVerifier:
+    """Drop-in for `auth.verify_id_token(token, check_revoked=True)` that survives a login rush.
+
+    - Verified claims are kept in an LRU keyed by the token's SHA-256 until the
+      token expires or `cache_ttl` passes.
+    - Google's signing certs are shared by all workers through the `auth_cache`
+      table, for as long as their Cache-Control max-age allows. An unknown `kid`
+      triggers at most one re-fetch per `refetch_interval` seconds.
+    - Revocation state per user is reused for `revocation_window` seconds, and
+      concurrent lookups are coalesced into one `get_users` call.
+    """
+
+    def __init__(self, project_id, db_path, cache_size=10000, cache_ttl=300, revocation_window=300,
+                 certs_url=GOOGLE_CERTS_URL, lookup_users=firebase_user_states, batch_window=0.05,
+                 clock_skew=60, refetch_interval=60):
+        self.project_id = project_id
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.revocation_window = revocation_window
+        self.certs_url = certs_url
+        self.lookup_users = lookup_users
+        self.batch_window = batch_window
+        self.clock_skew = clock_skew
+        self.refetch_interval = refetch_interval
+
+        self._tokens = OrderedDict()    # sha256 -> (claims, expires_at)
+        self._users = OrderedDict()     # uid -> (state, fetched_at)
+        self._certs = None              # (certs, expires_at)
+        self._refetched_at = 0.0        # last forced cert fetch (monotonic)
+        self._lock = threading.Lock()
+        self._certs_lock = threading.Lock()
+        self._batch = None
+        self._batch_lock = threading.Lock()
+
+    def _connect(self):
+        return db.connect(self.db_path)
+
+    # ---------------- PUBLIC ----------------
+    def verify(self, id_token, fresh=False):
+        """Returns the decoded claims or raises. `fresh=True` skips the revocation staleness window."""
+        key = hashlib.sha256(id_token.encode()).hexdigest()
+        claims = self._cached_claims(key)
+        if claims is None:
+            claims = self._verify_signature(id_token)
+            expires_at = min(claims["exp"], time.time() + self.cache_ttl)
+            with self._lock:
+                self._tokens[key] = (claims, expires_at)
+                self._tokens.move_to_end(key)
+                while len(self._tokens) > self.cache_size:
+                    self._tokens.popitem(last=False)
+
+        try:
+            self._check_revoked(claims, fresh)
+        except TokenRevokedError:
+            with self._lock:
+                self._tokens.pop(key, None)
+            raise
+        return claims
+
+    def stats(self):
+        return {"tokens": len(self._tokens), "users": len(self._users)}
+
+    # ---------------- TOKEN CACHE ----------------
+    def _cached_claims(self, key):
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._tokens[key]
+                return None
+            self._tokens.move_to_end(key)
+            return entry[0]
+
+    # ---------------- SIGNATURE ----------------
+    def _verify_signature(self, id_token):
+        if not self.project_id:
+            raise ValueError("Firebase project ID is unknown (set FIREBASE_PROJECT_ID)")
+
+        kid = jwt.decode_header(id_token).get("kid")
+        certs = self._google_certs()
+        if kid not in certs:
+            # Google rotated its keys before our cached copy expired (or the kid is bogus)
+            certs = self._google_certs(force=True)
+            if kid not in certs:
+                raise ValueError(f"Unknown token signing key: {kid}")
+
+        claims = jwt.decode(id_token, certs=certs, audience=self.project_id,
+                            clock_skew_in_seconds=self.clock_skew)
+        if claims.get("iss") != f"https://securetoken.google.com/{self.project_id}":
+            raise ValueError(f"Invalid token issuer: {claims.get('iss')}")
+        if not isinstance(claims.get("sub"), str) or not claims["sub"] or len(claims["sub"]) > 128:
+            raise ValueError("Invalid token subject")
+        if claims.get("auth_time", 0) > time.time() + self.clock_skew:
+            raise ValueError("Token auth_time is in the future")
+        claims["uid"] = claims["sub"]
+        return claims
+
+    def _google_certs(self, force=False):
+        """Current certs. `force` re-fetches them, at most once per `refetch_interval` per worker."""
+        certs = self._certs
+        if certs and certs[1] > time.time() and not force:
+            return certs[0]
+
+        with self._certs_lock:
+            if not force and self._certs and self._certs[1] > time.time():
+                return self._certs[0]
+            if force and self._certs and time.monotonic() - self._refetched_at < self.refetch_interval:
+                return self._certs[0]
+
+            # Another worker may have fetched them already (or just re-fetched them)
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT payload, expires_at FROM auth_cache WHERE name = ?", (CERTS_KEY,)).fetchone()
+            finally:
+                conn.close()
+            if row and row["expires_at"] > time.time():
+                shared = json.loads(row["payload"])
+                if not force or self._certs is None or shared != self._certs[0]:
+                    self._certs = (shared, row["expires_at"])
+                    return shared
+
+            if force:
+                self._refetched_at = time.monotonic()
+            response = requests.get(self.certs_url, timeout=10)
+            response.raise_for_status()
+            fetched = response.json()
+            expires_at = time.time() + _max_age(response.headers.get("Cache-Control"))
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO auth_cache (name, payload, expires_at) VALUES (?, ?, ?)",
+                    (CERTS_KEY, json.dumps(fetched), expires_at)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            self._certs = (fetched, expires_at)
+            logger.info(f"🔐 Fetched {len(fetched)} Google signing cert(s), valid for {int(expires_at - time.time())}s")
+            return fetched
+
+    # ---------------- REVOCATION ----------------
+    def _check_revoked(self, claims, fresh=False):
+        state = self._user_state(claims["uid"], fresh)
+        if state is None:
+            raise TokenRevokedError(f"User {claims['uid']} no longer exists")
+        if state["disabled"]:
+            raise TokenRevokedError(f"User {claims['uid']} is disabled")
+        if claims["iat"] < state["valid_after"]:
+            raise TokenRevokedError(f"Token of {claims['uid']} was revoked")
+
+    def _remember_user(self, uid, state):
+        with self._lock:
+            self._users[uid] = (state, time.time())
+            self._users.move_to_end(uid)
+            while len(self._users) > self.cache_size:
+                self._users.popitem(last=False)
+
+    def _user_state(self, uid, fresh):
+        with self._lock:
+            cached = self._users.get(uid)
+            if cached and not fresh and time.time() - cached[1] < self.revocation_window:
+                self._users.move_to_end(uid)
+                return cached[0]
+
+        if not fresh:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT payload FROM auth_cache WHERE name = ? AND expires_at > ?",
+                    (f"user:{uid}", time.time())
+                ).fetchone()
+            finally:
+                conn.close()
+            if row:
+                state = json.loads(row["payload"])
+                self._remember_user(uid, state)
+                return state
+
+        state = self._fetch_user_state(uid)
+        self._remember_user(uid, state)
+        conn = self._connect()
+        try:
+            now = time.time()
+            # Expired user rows are dropped as new ones come in, so the table holds about one window of users
+            conn.execute("DELETE FROM auth_cache WHERE name LIKE 'user:%' AND expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO auth_cache (name, payload, expires_at) VALUES (?, ?, ?)",
+                (f"user:{uid}", json.dumps(state), now + self.revocation_window)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return state
+
+    def _fetch_user_state(self, uid):
+        """Joins (or opens) the current lookup batch; the opener waits `batch_window` then fetches all."""
+        with self._batch_lock:
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = _Batch()
+            batch.uids.add(uid)
+
+        if leader:
+            time.sleep(self.batch_window)
+            with self._batch_lock:
+                self._batch = None
+            try:
+                batch.states = self.lookup_users(sorted(batch.uids))
+            except Exception as e:
+                batch.error = e
+            batch.done.set()
+        elif not batch.done.wait(30):
+            raise TimeoutError("Revocation lookup timed out")
+
+        if batch.error:
+            raise batch.error
+        return batch.states.get(uid)
@@ -0,0 +1,76 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# 📦 VOTE BATCHER (Many ballots -> one voteBatch transaction)
+# ==========================================================
+class VoteBatcher:
+    """Collects accepted ballots and flushes them every `max_votes` ballots or `max_wait_ms`.
+
+    `flush(batch)` receives the list of items added since the last flush and runs
+    on a small thread pool, so the next batch keeps filling while the previous
+    transaction waits for its receipt.
+    """
+
+    def __init__(self, flush, max_votes=50, max_wait_ms=2000, flush_workers=2):
+        self.flush = flush
+        self.max_votes = max_votes
+        self.max_wait = max_wait_ms / 1000.0
+        self._items = []
+        self._first_at = None
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=flush_workers, thread_name_prefix="vote-batch-flush")
+        self._stop = threading.Event()
+
+    def add(self, item):
+        """Queues one ballot for the next batch."""
+        with self._cond:
+            if not self._items:
+                self._first_at = time.monotonic()
+            self._items.append(item)
+            if len(self._items) >= self.max_votes:
+                self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._items)
+
+    def start(self):
+        threading.Thread(target=self._run, name="vote-batcher", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+
+    def _take(self):
+        batch, self._items = self._items[:self.max_votes], self._items[self.max_votes:]
+        # Leftovers start a fresh window
+        self._first_at = time.monotonic() if self._items else None
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                if not self._items:
+                    self._cond.wait(self.max_wait)
+                    continue
+                remaining = self.max_wait - (time.monotonic() - self._first_at)
+                if len(self._items) < self.max_votes and remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                batch = self._take()
+
+            logger.info(f"📦 Flushing vote batch of {len(batch)}")
+            self._executor.submit(self._flush_safely, batch)
+
+    def _flush_safely(self, batch):
+        try:
+            self.flush(batch)
+        except Exception as e:
+            logger.error(f"❌ Vote batch flush crashed: {e}")
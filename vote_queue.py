@@ -0,0 +1,203 @@
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+
+import db
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# 📬 DURABLE VOTE JOB QUEUE (SQLite, shared by all workers)
+# ==========================================================
+# Job lifecycle:  queued -> processing (stage: funding/voting/confirming) -> confirmed | failed
+STATUS_QUEUED = "queued"
+STATUS_PROCESSING = "processing"
+STATUS_CONFIRMED = "confirmed"
+STATUS_FAILED = "failed"
+
+FINAL_STATUSES = (STATUS_CONFIRMED, STATUS_FAILED)
+
+# Columns a handler is allowed to update while a job is in flight
+_UPDATABLE = ("stage", "fund_tx_hash", "vote_tx_hash", "vote_raw_tx", "error")
+
+
+class VoteQueue:
+    """Vote jobs stored in the `vote_jobs` table so any gunicorn worker can pick them up."""
+
+    def __init__(self, db_path, lease_seconds=600, max_attempts=3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Wakes local workers immediately instead of waiting for the next poll
+        self.new_job = threading.Event()
+
+    def _connect(self):
+        return db.connect(self.db_path)
+
+    def enqueue(self, student_id, election_id, candidate_id, candidate_ids=None):
+        """Stores a new job and returns its ID (`candidate_ids` = whole multi-position ballot)."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        ballot = json.dumps(list(candidate_ids)) if candidate_ids else None
+        conn = self._connect()
+        try:
+            conn.execute(
+                """INSERT INTO vote_jobs (id, student_id, election_id, candidate_id, candidate_ids, status, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (job_id, student_id, election_id, candidate_id, ballot, STATUS_QUEUED, now, now)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self.new_job.set()
+        return job_id
+
+    def get(self, job_id):
+        """Fetches a job by ID (None if unknown)."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM vote_jobs WHERE id = ?", (job_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def claim(self, worker_name):
+        """Atomically takes the oldest queued job (or one whose worker died mid-flight)."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                """UPDATE vote_jobs
+                   SET status = ?, worker = ?, attempts = attempts + 1, lease_until = ?, updated_at = ?
+                   WHERE id = (
+                       SELECT id FROM vote_jobs
+                       WHERE status = ? OR (status = ? AND lease_until < ?)
+                       ORDER BY created_at LIMIT 1
+                   )
+                   RETURNING *""",
+                (STATUS_PROCESSING, worker_name, now + self.lease_seconds, now,
+                 STATUS_QUEUED, STATUS_PROCESSING, now)
+            ).fetchone()
+            conn.commit()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def update(self, job_id, **fields):
+        """Records pipeline progress and renews the job's lease."""
+        cols = [c for c in fields if c in _UPDATABLE]
+        now = time.time()
+        assignments = ", ".join(f"{c} = ?" for c in cols)
+        if assignments:
+            assignments += ", "
+        conn = self._connect()
+        try:
+            conn.execute(
+                f"UPDATE vote_jobs SET {assignments}lease_until = ?, updated_at = ? WHERE id = ?",
+                [fields[c] for c in cols] + [now + self.lease_seconds, now, job_id]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _finish(self, job_id, status, tx_hash=None, error=None):
+        conn = self._connect()
+        try:
+            conn.execute(
+                """UPDATE vote_jobs
+                   SET status = ?, vote_tx_hash = COALESCE(?, vote_tx_hash), error = ?,
+                       stage = NULL, lease_until = NULL, updated_at = ?
+                   WHERE id = ?""",
+                (status, tx_hash, error, time.time(), job_id)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def complete(self, job_id, tx_hash):
+        """Marks a job as confirmed on chain."""
+        self._finish(job_id, STATUS_CONFIRMED, tx_hash=tx_hash)
+
+    def fail(self, job_id, error):
+        """Marks a job as permanently failed."""
+        self._finish(job_id, STATUS_FAILED, error=str(error))
+
+    def depth(self):
+        """Returns the number of jobs waiting or in flight."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM vote_jobs WHERE status IN (?, ?)",
+                (STATUS_QUEUED, STATUS_PROCESSING)
+            ).fetchone()
+            return row[0]
+        finally:
+            conn.close()
+
+
+def job_choices(job):
+    """Candidate IDs a job votes for (one for classic jobs, one per position for ballots)."""
+    if job.get("candidate_ids"):
+        return json.loads(job["candidate_ids"])
+    return [job["candidate_id"]]
+
+
+# ==========================================================
+# 👷 BACKGROUND WORKERS
+# ==========================================================
+class VoteWorkerPool:
+    """Runs `handler(job)` for queued jobs on a few daemon threads in this process."""
+
+    def __init__(self, queue, handler, workers=4, poll_interval=1.0, on_failure=None):
+        self.queue = queue
+        self.handler = handler
+        self.on_failure = on_failure
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._threads = []
+        self._stop = threading.Event()
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"vote-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info(f"👷 Started {self.workers} vote worker(s)")
+
+    def stop(self):
+        self._stop.set()
+        self.queue.new_job.set()
+
+    def _run(self):
+        worker_name = f"{threading.current_thread().name}@{uuid.uuid4().hex[:8]}"
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(worker_name)
+            except sqlite3.Error as e:
+                logger.error(f"⚠️ Vote queue claim failed: {e}")
+                job = None
+
+            if job is None:
+                self.queue.new_job.wait(self.poll_interval)
+                self.queue.new_job.clear()
+                continue
+
+            if job["attempts"] > self.queue.max_attempts:
+                logger.error(f"❌ Job {job['id']} exceeded {self.queue.max_attempts} attempts")
+                self._give_up(job, "Too many attempts")
+                continue
+
+            try:
+                self.handler(job)
+            except Exception as e:
+                # Handlers report their own failures; this is only a safety net
+                logger.error(f"❌ Unhandled error in vote job {job['id']}: {e}")
+                self._give_up(job, e)
+
+    def _give_up(self, job, error):
+        self.queue.fail(job["id"], error)
+        if self.on_failure:
+            self.on_failure(job)
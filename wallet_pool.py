@@ -0,0 +1,182 @@
+import json
+import time
+import logging
+import threading
+from eth_account import Account
+
+import db
+from leases import try_acquire_lease
+
+logger = logging.getLogger(__name__)
+
+# Wallet lifecycle:  funding -> ready -> claimed   (or failed)
+WALLET_FUNDING = "funding"
+WALLET_READY = "ready"
+WALLET_CLAIMED = "claimed"
+WALLET_FAILED = "failed"
+
+# A funding row with no transaction hash after this long was abandoned mid-insert
+STALE_FUNDING_SECONDS = 600
+
+
+# ==========================================================
+# 👛 PRE-FUNDED EPHEMERAL VOTER WALLETS
+# ==========================================================
+class WalletPool:
+    """Temporary voter wallets that were funded ahead of time (keys stored encrypted)."""
+
+    def __init__(self, chain, db_path, secret, kdf_iterations=10000):
+        self.chain = chain
+        self.db_path = db_path
+        self.secret = secret
+        self.kdf_iterations = kdf_iterations
+
+    def _connect(self):
+        return db.connect(self.db_path)
+
+    def add(self, fund):
+        """Creates a wallet, stores its encrypted key, then funds it via `fund(address) -> tx hash`."""
+        account = Account.create()
+        keystore = Account.encrypt(account.key, self.secret, kdf="pbkdf2", iterations=self.kdf_iterations)
+        now = time.time()
+
+        # Persist the key BEFORE sending ETH to it so the funds can never be orphaned
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO wallet_pool (address, encrypted_key, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (account.address, json.dumps(keystore), WALLET_FUNDING, now, now)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        try:
+            tx_hash = fund(account.address)
+            self._set(account.address, fund_tx_hash=tx_hash)
+            logger.info(f"👛 Funding pool wallet {account.address} (Tx: {tx_hash})")
+        except Exception as e:
+            logger.error(f"❌ Could not fund pool wallet {account.address}: {e}")
+            self._set(account.address, status=WALLET_FAILED)
+
+    def _set(self, address, **fields):
+        assignments = ", ".join(f"{c} = ?" for c in fields)
+        conn = self._connect()
+        try:
+            conn.execute(
+                f"UPDATE wallet_pool SET {assignments}, updated_at = ? WHERE address = ?",
+                list(fields.values()) + [time.time(), address]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def promote_funded(self):
+        """Moves wallets whose funding transaction confirmed into the ready state (one receipt lookup for all)."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT address, fund_tx_hash, created_at FROM wallet_pool WHERE status = ?",
+                (WALLET_FUNDING,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        sent = [row for row in rows if row["fund_tx_hash"]]
+        for row in rows:
+            if not row["fund_tx_hash"] and time.time() - row["created_at"] > STALE_FUNDING_SECONDS:
+                self._set(row["address"], status=WALLET_FAILED)
+        if not sent:
+            return
+
+        receipts = self.chain.get_receipts([row["fund_tx_hash"] for row in sent])
+        for row, receipt in zip(sent, receipts):
+            if receipt is None:
+                continue  # Still pending
+            self._set(row["address"], status=WALLET_READY if receipt.status == 1 else WALLET_FAILED)
+
+    def pop(self):
+        """Claims one ready wallet and returns its account, or None if the pool is empty."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                """UPDATE wallet_pool SET status = ?, updated_at = ?
+                   WHERE id = (SELECT id FROM wallet_pool WHERE status = ? ORDER BY id LIMIT 1)
+                   RETURNING address, encrypted_key""",
+                (WALLET_CLAIMED, time.time(), WALLET_READY)
+            ).fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+        try:
+            key = Account.decrypt(json.loads(row["encrypted_key"]), self.secret)
+            return Account.from_key(key)
+        except Exception as e:
+            # Usually means the pool secret changed since the wallet was created
+            logger.error(f"❌ Could not decrypt pool wallet {row['address']}: {e}")
+            self._set(row["address"], status=WALLET_FAILED)
+            return None
+
+    def depth(self):
+        """Returns wallet counts per status (for the admin dashboard)."""
+        counts = {WALLET_FUNDING: 0, WALLET_READY: 0, WALLET_CLAIMED: 0, WALLET_FAILED: 0}
+        conn = self._connect()
+        try:
+            for row in conn.execute("SELECT status, COUNT(*) AS n FROM wallet_pool GROUP BY status"):
+                counts[row["status"]] = row["n"]
+        finally:
+            conn.close()
+        return counts
+
+
+# ==========================================================
+# 🔁 BACKGROUND REPLENISHER
+# ==========================================================
+class WalletPoolReplenisher:
+    """Keeps the pool topped up. Only the worker holding the lease funds wallets."""
+
+    LEASE_NAME = "wallet_pool_replenisher"
+
+    def __init__(self, pool, fund, settings_provider, interval=10.0):
+        self.pool = pool
+        self.fund = fund
+        # Returns {"size", "low_water", "refill_rate"} for the current election
+        self.settings_provider = settings_provider
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="wallet-pool-replenisher", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"⚠️ Wallet pool replenish failed: {e}")
+            self._stop.wait(self.interval)
+
+    def run_once(self):
+        if not try_acquire_lease(self.pool.db_path, self.LEASE_NAME, ttl=self.interval * 3):
+            return
+
+        self.pool.promote_funded()
+
+        settings = self.settings_provider()
+        counts = self.pool.depth()
+        available = counts[WALLET_READY] + counts[WALLET_FUNDING]
+        if available >= settings["low_water"]:
+            return
+
+        # Refill towards the target size, at most `refill_rate` wallets per cycle
+        to_create = min(settings["refill_rate"], settings["size"] - available)
+        if to_create > 0:
+            logger.info(f"🔁 Wallet pool low ({available}/{settings['size']}), funding {to_create} more")
+        for _ in range(to_create):
+            self.pool.add(self.fund)